@@ -0,0 +1,64 @@
+"""
+Per-property aggregates of the property list, computed in the same query as correlated subqueries.
+
+- ``active_rule_count``: pricing rules that can still apply to a night from today on.
+- ``next_booked_date``: first night from today on covered by a booking.
+- ``min_nightly_price``: lowest nightly price the base price or an active rule sets. A cheaper rule
+  can lose to a more relevant one on every night it applies to, so this is a lower bound of the
+  price of the upcoming nights rather than the price of one of them.
+
+Each aggregate reads the rows of one property through the ``property`` indexes of
+``core_pricingrule`` and ``core_booking``, so the cost of a list grows with its
+rows, not with the size of those tables.
+"""
+from datetime import date
+from typing import Dict, Optional
+
+from django.db.models import Count, Expression, F, FloatField, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from core.models import Booking, PricingRule
+
+
+PROPERTY_AGGREGATES = ('active_rule_count', 'next_booked_date', 'min_nightly_price')
+
+
+def active_rules(today: date) -> Q:
+    """
+    Match the rules that can apply to a night from ``today`` on.
+
+    Rules without a day, a season, weekdays or a min stay length never apply.
+    """
+    return (
+        Q(specific_day__gte=today)
+        | Q(date_end__gte=today)
+        | Q(specific_day__isnull=True, date_end__isnull=True) & (
+            Q(weekdays__isnull=False) | Q(min_stay_length__isnull=False)
+        )
+    )
+
+
+def property_aggregates(today: Optional[date] = None) -> Dict[str, Expression]:
+    """
+    Return the expressions of the aggregates, for ``annotate`` on a Property queryset.
+    """
+    today = today or date.today()
+    rules = PricingRule.objects.filter(active_rules(today), property=OuterRef('pk')).order_by().values('property')
+    # Rules without a fixed price or a modifier leave the base price, which is already a candidate.
+    rule_price = Coalesce(
+        'fixed_price', OuterRef('base_price') * (1 + F('price_modifier') / 100.0), output_field=FloatField(),
+    )
+    min_rule_price = Subquery(rules.annotate(price=Min(rule_price)).values('price'))
+    next_booking = Booking.objects.filter(property=OuterRef('pk'), date_end__gte=today).order_by('date_start')
+
+    return {
+        'active_rule_count': Coalesce(Subquery(rules.annotate(count=Count('pk')).values('count')), 0),
+        'next_booked_date': Subquery(
+            next_booking.annotate(night=Greatest('date_start', Value(today))).values('night')[:1]
+        ),
+        # LEAST ignores NULLs on PostgreSQL but not on SQLite: both sides fall back to the other one.
+        'min_nightly_price': Least(
+            Coalesce('base_price', min_rule_price), Coalesce(min_rule_price, 'base_price'),
+            output_field=FloatField(),
+        ),
+    }
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished
 
 
 class BookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking'
+
+    def ready(self):
+        from booking.price_index import build_pending_indexes
+        request_finished.connect(build_pending_indexes)
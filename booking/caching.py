@@ -0,0 +1,84 @@
+"""
+HTTP caching of the property and pricing rule read endpoints.
+
+Responses are marked ``Cache-Control: public, max-age=API_CACHE_MAX_AGE`` so
+the nginx proxy can micro-cache them. Their ETag is derived from a catalog
+version kept in the Django cache, which every write to a property or pricing
+rule replaces. Once the short TTL is over, nginx revalidates its copy with
+``If-None-Match``: an unchanged catalog is answered with a 304 without touching
+the database, a changed one gets a fresh response.
+"""
+import hashlib
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+
+def get_catalog_version() -> int:
+    return cache.get_or_set(CATALOG_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_catalog_version(using: Optional[str] = None) -> None:
+    """
+    Replace the catalog version once the current transaction (on database ``using``) commits, so no
+    response built from the old data is cached under the new version.
+    """
+    transaction.on_commit(lambda: cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None), using=using)
+
+
+class CatalogCacheMixin:
+    """
+    Make the list and retrieve actions cacheable and invalidate them on writes.
+
+    ``read_only_actions`` lists the actions that do not write despite their method.
+    """
+    cached_actions = ('list', 'retrieve')
+    read_only_actions = ()
+
+    def get_etag(self, request) -> str:
+        variant = f'{request.get_full_path()}|{request.headers.get("Accept", "")}'
+        return f'"{get_catalog_version()}-{hashlib.sha1(variant.encode()).hexdigest()[:16]}"'
+
+    def is_cached_request(self, request) -> bool:
+        return request.method in ('GET', 'HEAD') and self.action in self.cached_actions
+
+    def list(self, request, *args, **kwargs):
+        return self.not_modified_response(request) or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.not_modified_response(request) or super().retrieve(request, *args, **kwargs)
+
+    def not_modified_response(self, request):
+        """
+        Return a 304 when the client's copy still has the current ETag.
+
+        The ETag is taken before the data is read, so a write committed meanwhile
+        can only label fresh data with an old version, never the other way round.
+        """
+        if not self.is_cached_request(request):
+            return None
+        self.etag = self.get_etag(request)
+        if self.etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cacheable = response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED)
+        if self.is_cached_request(request) and cacheable and getattr(self, 'etag', None):
+            response['ETag'] = self.etag
+            patch_cache_control(response, public=True, max_age=settings.API_CACHE_MAX_AGE)
+            patch_vary_headers(response, ('Accept',))
+        elif (request.method not in ('GET', 'HEAD') and response.status_code < 400
+              and getattr(self, 'action', None) not in self.read_only_actions):
+            bump_catalog_version()
+        return response
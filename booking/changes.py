@@ -0,0 +1,180 @@
+"""
+Incremental change feed of properties, pricing rules and bookings.
+
+A consumer syncs a model by following ``next_cursor`` from page to page: each
+page lists the rows written and deleted after the cursor, oldest first, so a
+sync reads only what changed since the previous one. The cursor is the
+``(updated_at, id)`` of the last change returned, encoded as an opaque token,
+and pages are read from the ``(updated_at, id)`` index of the model and the
+``(model, deleted_at, object_id)`` index of the tombstones, on every shard.
+
+``updated_at`` is set when a row is written, not when its transaction commits,
+so a row can become visible with a timestamp older than rows already served.
+Changes more recent than ``CHANGE_FEED_LAG_SECONDS`` are held back for that
+reason, which assumes write transactions (and the clock skew between the web
+servers) stay below the lag.
+
+Deletions are only reported while their tombstone is kept, i.e. for
+``CHANGE_FEED_TOMBSTONE_TTL``: a cursor older than that is rejected and the
+consumer has to sync from the start again.
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+from heapq import merge
+from itertools import islice
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Model, Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.models import Booking, PricingRule, Property, Tombstone
+
+
+CHANGE_FEED_MODELS = (Property, PricingRule, Booking)
+
+Cursor = Tuple[datetime, int]
+
+
+class Change(NamedTuple):
+    changed_at: datetime
+    id: int
+    deleted: bool
+    instance: Optional[Model]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    changed_at, object_id = cursor
+    return base64.urlsafe_b64encode(f'{changed_at.isoformat()}|{object_id}'.encode()).decode()
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Return the ``(changed_at, id)`` of a cursor token, raising ValueError if it is not one.
+    """
+    try:
+        changed_at, object_id = base64.urlsafe_b64decode(token.encode()).decode().split('|')
+        changed_at = datetime.fromisoformat(changed_at)
+    except (binascii.Error, UnicodeError, ValueError) as error:
+        raise ValueError('Invalid cursor.') from error
+    if timezone.is_naive(changed_at):
+        raise ValueError('Invalid cursor.')
+    return changed_at, int(object_id)
+
+
+def record_deletions(model, ids: Iterable[int], using: Optional[str] = None) -> None:
+    """
+    Record tombstones for the rows of ``model`` deleted in the current transaction, on their shard ``using``.
+    """
+    deleted_at = timezone.now()
+    Tombstone.objects.using(using).bulk_create(
+        Tombstone(model=model._meta.label, object_id=object_id, deleted_at=deleted_at) for object_id in ids
+    )
+
+
+def after(cursor: Optional[Cursor], time_field: str, id_field: str) -> Q:
+    """
+    Match the rows whose ``(time_field, id_field)`` comes after the cursor.
+
+    Written as a range on ``time_field`` so the index is scanned from the cursor on.
+    """
+    if cursor is None:
+        return Q()
+    changed_at, object_id = cursor
+    return Q(**{f'{time_field}__gte': changed_at}) & (
+        Q(**{f'{time_field}__gt': changed_at}) | Q(**{f'{id_field}__gt': object_id})
+    )
+
+
+def get_changes(queryset, cursor: Optional[Cursor], limit: int) -> Tuple[List[Change], Cursor, bool]:
+    """
+    Return the first ``limit`` changes of the rows of ``queryset`` after the cursor, the cursor to continue
+    from and whether more changes are already available.
+
+    Without a cursor the feed starts with the rows that exist, and deletions are left out.
+    Unless ``queryset`` is routed to a shard, the changes of every shard are merged.
+    """
+    horizon = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_LAG_SECONDS)
+    sources = []
+    for shard_queryset in queryset.shard_querysets():
+        rows = shard_queryset.filter(
+            after(cursor, 'updated_at', 'id'), updated_at__lt=horizon,
+        ).order_by('updated_at', 'id')
+        sources.append(Change(row.updated_at, row.id, False, row) for row in rows[:limit + 1])
+        if cursor is not None:
+            tombstones = Tombstone.objects.using(shard_queryset.db).filter(
+                after(cursor, 'deleted_at', 'object_id'), model=queryset.model._meta.label, deleted_at__lt=horizon,
+            ).order_by('deleted_at', 'object_id').values_list('deleted_at', 'object_id')
+            sources.append(
+                Change(deleted_at, object_id, True, None) for deleted_at, object_id in tombstones[:limit + 1]
+            )
+
+    changes = list(islice(merge(*sources, key=lambda change: change[:3]), limit + 1))
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        next_cursor = (changes[-1].changed_at, changes[-1].id)
+    else:
+        # Everything before the horizon has been read: the next sync starts there, so idle consumers'
+        # cursors do not age past the tombstone retention.
+        next_cursor = (horizon, 0) if cursor is None or horizon > cursor[0] else cursor
+    return changes, next_cursor, has_more
+
+
+class ChangeFeedParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of the change feed.
+    """
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, default=100, min_value=1)
+
+    def validate_cursor(self, value):
+        try:
+            cursor = decode_cursor(value)
+        except ValueError:
+            raise serializers.ValidationError("Invalid cursor.")
+        if cursor[0] < timezone.now() - timedelta(seconds=settings.CHANGE_FEED_TOMBSTONE_TTL):
+            raise serializers.ValidationError("Cursor expired, the feed must be read again from the start.")
+        return cursor
+
+    def validate_limit(self, value):
+        if value > settings.CHANGE_FEED_MAX_LIMIT:
+            raise serializers.ValidationError(f"Limit cannot be above {settings.CHANGE_FEED_MAX_LIMIT}.")
+        return value
+
+
+class ChangeFeedMixin:
+    """
+    Add a ``changes`` list route with the change feed of the viewset's model.
+    """
+
+    @action(detail=False, methods=['get'], filter_backends=())
+    def changes(self, request):
+        """
+        List the objects written or deleted after ?cursor=, oldest change first.
+
+        Follow next_cursor until has_more is false, then poll with the last next_cursor.
+        """
+        params = ChangeFeedParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        changes, next_cursor, has_more = get_changes(
+            self.queryset.model.objects.all(), params.validated_data.get('cursor'), params.validated_data['limit']
+        )
+        serializer_class = self.get_serializer_class()
+        return Response({
+            'results': [
+                {
+                    'id': change.id,
+                    'deleted': change.deleted,
+                    'changed_at': change.changed_at,
+                    'data': None if change.deleted else serializer_class(change.instance).data,
+                }
+                for change in changes
+            ],
+            'next_cursor': encode_cursor(next_cursor),
+            'has_more': has_more,
+        })
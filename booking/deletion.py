@@ -0,0 +1,64 @@
+"""
+Set-based, chunked deletion of properties and everything that belongs to them.
+
+Deleting a property with ``Property.delete()`` removes its bookings, pricing
+rules and rollups in one transaction, which for a long booking history holds
+row locks for seconds. Here the children are deleted first, ``chunk_size``
+rows per transaction, so each lock is short and memory stays bounded.
+
+Each chunk goes through ``QuerySet.delete()``: while no ``pre_delete`` or
+``post_delete`` receivers are connected for a model, Django deletes the chunk
+with a single ``DELETE`` without loading it; if receivers are connected, the
+chunk is loaded and its signals are sent as usual.
+
+Deleted properties, pricing rules and bookings get a tombstone for the change
+feed in the same transaction as their chunk.
+"""
+from typing import Dict
+
+from django.db import transaction
+
+from booking.caching import bump_catalog_version
+from booking.changes import CHANGE_FEED_MODELS, record_deletions
+from core.models import Booking, BookingRollup, PricingRule, Property
+
+
+CHILD_MODELS = (Booking, PricingRule, BookingRollup)
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def delete_in_chunks(queryset, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Delete the rows of ``queryset`` in transactions of at most ``chunk_size`` rows and return how many were deleted.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic(using=queryset.db):
+            ids = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                return deleted
+            if queryset.model in CHANGE_FEED_MODELS:
+                record_deletions(queryset.model, ids, using=queryset.db)
+            queryset.model.objects.filter(pk__in=ids).delete()
+            deleted += len(ids)
+
+
+def delete_property(property_obj: Property, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Delete a property after deleting its related rows in chunks, and return the number of deleted rows per model.
+    """
+    counts = {}
+    for model in CHILD_MODELS:
+        counts[model._meta.label] = delete_in_chunks(model.objects.filter(property=property_obj), chunk_size)
+    shard = property_obj._state.db
+    with transaction.atomic(using=shard):
+        # Rows added while the chunks were deleted are cascaded here.
+        for model in (Booking, PricingRule):
+            ids = model.objects.filter(property=property_obj).values_list('pk', flat=True)
+            record_deletions(model, ids, using=shard)
+        record_deletions(Property, [property_obj.pk], using=shard)
+        _, deleted = property_obj.delete()
+        bump_catalog_version(using=shard)
+    for label, count in deleted.items():
+        counts[label] = counts.get(label, 0) + count
+    return counts
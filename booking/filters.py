@@ -1,19 +1,94 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.validators import EMPTY_VALUES
+from django.db import connections
+from django.db.backends.postgresql.psycopg_any import DateRange as DateRangeValue
+from django.db.models import F, Q, Value
+from django.db.models.functions import Upper
 from django_filters import rest_framework as filters
 
-from core.models import Property, PricingRule, Booking
+from booking.aggregates import PROPERTY_AGGREGATES, property_aggregates
+from core.expressions import DateRange
+from core.models import Property, PricingRule, Booking, BookingRollup
 from reservations.settings import DATE_INPUT_FORMATS
 
 
+def has_applied_filter(filterset) -> bool:
+    """
+    Whether a valid filterset restricts the queryset: django-filter skips the filters left blank.
+    """
+    for value in filterset.form.cleaned_data.values():
+        if isinstance(value, slice):
+            if value.start is not None or value.stop is not None:
+                return True
+        elif value not in EMPTY_VALUES:
+            return True
+    return False
+
+
+class DateRangeCSVFilter(filters.BaseRangeFilter, filters.DateFilter):
+    """
+    Filter taking a comma-separated pair of dates, e.g. ``03-01-2024,03-31-2024``.
+    """
+
+
 class PropertyFilter(filters.FilterSet):
 
     name = filters.CharFilter(field_name='name', lookup_expr='icontains')
     base_price__gte = filters.NumberFilter(field_name='base_price', lookup_expr='gte')
     base_price__lte = filters.NumberFilter(field_name='base_price', lookup_expr='lte')
+    search = filters.CharFilter(method='filter_search')
+    active_rule_count__gte = filters.NumberFilter(field_name='active_rule_count', lookup_expr='gte')
+    active_rule_count__lte = filters.NumberFilter(field_name='active_rule_count', lookup_expr='lte')
+    next_booked_date__gte = filters.DateFilter(
+        field_name='next_booked_date', lookup_expr='gte', input_formats=DATE_INPUT_FORMATS
+    )
+    next_booked_date__lte = filters.DateFilter(
+        field_name='next_booked_date', lookup_expr='lte', input_formats=DATE_INPUT_FORMATS
+    )
+    min_nightly_price__gte = filters.NumberFilter(field_name='min_nightly_price', lookup_expr='gte')
+    min_nightly_price__lte = filters.NumberFilter(field_name='min_nightly_price', lookup_expr='lte')
+    ordering = filters.OrderingFilter(fields=('name', 'base_price', 'created_at', *PROPERTY_AGGREGATES))
 
     class Meta:
         model = Property
         fields = ['name', 'base_price']
 
+    @classmethod
+    def uses_aggregates(cls, query_params) -> bool:
+        """
+        Whether the query parameters filter or order on the aggregates of ``booking.aggregates``.
+        """
+        ordering = ','.join(query_params.getlist('ordering'))
+        return any(
+            name in query_params for name, field in cls.base_filters.items() if field.field_name in PROPERTY_AGGREGATES
+        ) or any(aggregate in ordering for aggregate in PROPERTY_AGGREGATES)
+
+    def filter_queryset(self, queryset):
+        """
+        Annotate the aggregates before filtering or ordering on them, unless the view already did.
+        """
+        if self.uses_aggregates(self.data) and not set(PROPERTY_AGGREGATES) <= set(queryset.query.annotations):
+            queryset = queryset.annotate(**property_aggregates())
+        return super().filter_queryset(queryset)
+
+    def filter_search(self, queryset, name, value):
+        """
+        Search properties by name, matching substrings and similar names ranked by similarity.
+
+        On PostgreSQL both conditions are served by the pg_trgm index on UPPER(name).
+        Other backends fall back to a plain substring match.
+        """
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset.filter(name__icontains=value)
+
+        term = value.upper()
+        return queryset.annotate(
+            name_upper=Upper('name'),
+            similarity=TrigramSimilarity(Upper('name'), term),
+        ).filter(
+            Q(name_upper__contains=term) | Q(name_upper__trigram_similar=term)
+        ).order_by('-similarity', '-created_at')
+
 
 class PricingRuleFilter(filters.FilterSet):
 
@@ -21,12 +96,37 @@ class PricingRuleFilter(filters.FilterSet):
     specific_day__lte = filters.DateFilter('specific_day', lookup_expr='lte', input_formats=DATE_INPUT_FORMATS)
     specific_day_range = filters.DateRangeFilter(field_name='specific_day', lookup_expr='exact')
     min_stay_length = filters.NumericRangeFilter(field_name='min_stay_length')
+    date_start__gte = filters.DateFilter('date_start', lookup_expr='gte', input_formats=DATE_INPUT_FORMATS)
+    date_end__lte = filters.DateFilter('date_end', lookup_expr='lte', input_formats=DATE_INPUT_FORMATS)
+    weekday = filters.NumberFilter(method='filter_weekday')
+    active_on = filters.DateFilter(method='filter_active_on', input_formats=DATE_INPUT_FORMATS)
 
     class Meta:
         model = PricingRule
         fields = ['property', 'price_modifier', 'min_stay_length',
                   'fixed_price', 'specific_day']
 
+    def filter_weekday(self, queryset, name, value):
+        """
+        Rules whose weekdays include the given weekday, 0 being Monday.
+        """
+        if not 0 <= value <= 6:
+            return queryset.none()
+        return queryset.alias(weekday_bit=F('weekdays').bitand(1 << int(value))).filter(weekday_bit__gt=0)
+
+    def filter_active_on(self, queryset, name, value):
+        """
+        Rules that can apply to the night of the given date, whatever the stay length.
+        """
+        in_season = Q(date_start__isnull=True) | Q(date_start__lte=value, date_end__gte=value)
+        on_weekday = Q(weekdays__isnull=True) | Q(weekday_bit__gt=0)
+        seasonal = Q(date_start__isnull=False) | Q(weekdays__isnull=False)
+        return queryset.alias(weekday_bit=F('weekdays').bitand(1 << value.weekday())).filter(
+            Q(specific_day=value)
+            | (seasonal & in_season & on_weekday)
+            | Q(specific_day__isnull=True, date_start__isnull=True, weekdays__isnull=True)
+        )
+
 
 class BookingFilter(filters.FilterSet):
 
@@ -34,7 +134,45 @@ class BookingFilter(filters.FilterSet):
     date_start__lte = filters.DateFilter('date_start', lookup_expr='lte', input_formats=DATE_INPUT_FORMATS)
     date_end__gte = filters.DateFilter('date_end', lookup_expr='gte', input_formats=DATE_INPUT_FORMATS)
     date_end__lte = filters.DateFilter('date_end', lookup_expr='lte', input_formats=DATE_INPUT_FORMATS)
+    overlaps = DateRangeCSVFilter(method='filter_overlaps', input_formats=DATE_INPUT_FORMATS)
+    contains_date = filters.DateFilter(method='filter_contains_date', input_formats=DATE_INPUT_FORMATS)
 
     class Meta:
         model = Booking
         fields = ['property', 'date_start', 'date_end', 'final_price']
+
+    def filter_overlaps(self, queryset, name, value):
+        """
+        Bookings with at least one night between the given start and end dates (inclusive).
+
+        On PostgreSQL the stay is compared as a daterange, served by the GiST index.
+        The redundant bound on date_start lets the planner skip the partitions of later months.
+        """
+        date_start, date_end = value
+        if date_start > date_end:
+            return queryset.none()
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset.filter(date_start__lte=date_end, date_end__gte=date_start)
+        return queryset.alias(
+            stay=DateRange('date_start', 'date_end', Value('[]'))
+        ).filter(stay__overlap=DateRangeValue(date_start, date_end, '[]'), date_start__lte=date_end)
+
+    def filter_contains_date(self, queryset, name, value):
+        """
+        Bookings whose stay includes the given date.
+        """
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset.filter(date_start__lte=value, date_end__gte=value)
+        return queryset.alias(
+            stay=DateRange('date_start', 'date_end', Value('[]'))
+        ).filter(stay__contains=value, date_start__lte=value)
+
+
+class BookingRollupFilter(filters.FilterSet):
+
+    month__gte = filters.DateFilter('month', lookup_expr='gte', input_formats=DATE_INPUT_FORMATS)
+    month__lte = filters.DateFilter('month', lookup_expr='lte', input_formats=DATE_INPUT_FORMATS)
+
+    class Meta:
+        model = BookingRollup
+        fields = ['property']
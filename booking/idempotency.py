@@ -0,0 +1,124 @@
+"""
+Idempotency-Key support, so clients can safely retry requests that create objects.
+
+The key is stored with the response in the same transaction as the created
+object. A retry is answered from the stored response with one indexed lookup,
+and a concurrent duplicate blocks on the key's unique index until the first
+request commits, then rolls back its own work and replays the stored response.
+
+Keys are scoped to the client that sent them: the authenticated user, or else
+the client address the booking throttle counts requests by. A key reused by
+another client is a new key rather than a replay of someone else's response.
+
+Keys are stored on the default database. When properties are sharded, the
+request runs in a transaction on every shard, committed just before the
+default database's, so the created object is rolled back with a duplicate key.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import QueryDict
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from booking.throttling import BookingThrottle
+from core.models import IdempotencyKey
+from core.sharding import atomic_on_all_shards
+
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def request_fingerprint(request: Request) -> str:
+    """
+    Hash the method, path and payload of the request.
+    """
+    data = request.data.dict() if isinstance(request.data, QueryDict) else request.data
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def client_scope(request: Request) -> str:
+    """
+    Return the client the keys of the request belong to.
+    """
+    if request.user and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'client:{BookingThrottle().get_ident(request)}'
+
+
+def get_stored_response(scope: str, key: str) -> Optional[IdempotencyKey]:
+    """
+    Return the stored response for ``key`` of the client ``scope``, deleting it if it has expired.
+    """
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+    if record and record.created_at < timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL):
+        record.delete()
+        return None
+    return record
+
+
+def _replay(record: IdempotencyKey, fingerprint: str) -> Response:
+    """
+    Return the stored response, unless the key was used for a different request.
+    """
+    if record.fingerprint != fingerprint:
+        return Response(
+            {'detail': f'{IDEMPOTENCY_KEY_HEADER} was already used for a different request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method: Callable) -> Callable:
+    """
+    Decorate a viewset action so retries with the same Idempotency-Key replay its stored response.
+
+    Requests without the header are processed as usual. Error responses are not
+    stored, so the request can be fixed and retried with the same key.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{IDEMPOTENCY_KEY_HEADER} must be at most {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        scope = client_scope(request)
+        fingerprint = request_fingerprint(request)
+        record = get_stored_response(scope, key)
+        if record:
+            return _replay(record, fingerprint)
+
+        try:
+            with atomic_on_all_shards():
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code < 400:
+                    IdempotencyKey.objects.create(
+                        scope=scope,
+                        key=key,
+                        fingerprint=fingerprint,
+                        status_code=response.status_code,
+                        response=response.data
+                    )
+        except IntegrityError:
+            # A concurrent request with the same key committed first.
+            record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+            if record is None:
+                raise
+            return _replay(record, fingerprint)
+        return response
+
+    return wrapper
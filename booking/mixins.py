@@ -0,0 +1,135 @@
+"""
+Sparse fieldsets, embedded expansion and multi-get for the read endpoints.
+
+- ``?fields=id,final_price`` only serializes (and only selects) those fields.
+- ``?expand=property`` embeds the related object, joined in the same query.
+- ``?ids=1,2,3`` lists only the objects with those ids.
+
+Lists of sharded models are read from every shard (``FanOutListMixin``).
+"""
+from typing import Dict, List, Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.sharding import fan_out, is_sharded
+
+
+def parse_csv_param(request, name: str) -> Optional[List[str]]:
+    """
+    Return the comma-separated values of a query parameter, or None when it is absent.
+    """
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Serializer that can be restricted to a subset of its fields and embed related objects.
+
+    ``expandable_fields`` maps a relation field to the serializer used to embed it.
+    """
+    expandable_fields: Dict[str, type] = {}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsViewSetMixin:
+    """
+    Apply ``fields``, ``expand`` and ``ids`` query parameters to the list and retrieve actions.
+    """
+    sparse_actions = ('list', 'retrieve')
+    max_ids = 100
+
+    def get_sparse_options(self):
+        """
+        Parse and validate the query parameters, once per request.
+        """
+        if not hasattr(self, '_sparse_options'):
+            serializer_class = self.get_serializer_class()
+            fields = parse_csv_param(self.request, 'fields')
+            expand = parse_csv_param(self.request, 'expand') or []
+            ids = parse_csv_param(self.request, 'ids')
+
+            errors = {}
+            available = set(serializer_class().fields)
+            if fields is not None and set(fields) - available:
+                errors['fields'] = f'Unknown fields: {", ".join(sorted(set(fields) - available))}.'
+            expandable = getattr(serializer_class, 'expandable_fields', {})
+            if set(expand) - set(expandable):
+                errors['expand'] = f'Only these fields can be expanded: {", ".join(sorted(expandable)) or "none"}.'
+            if ids is not None:
+                if not all(item.isdigit() for item in ids):
+                    errors['ids'] = 'Ids must be a comma-separated list of integers.'
+                elif len(ids) > self.max_ids:
+                    errors['ids'] = f'At most {self.max_ids} ids can be requested at once.'
+            if errors:
+                raise ValidationError(errors)
+
+            if fields is not None:
+                # Relations not in the requested fields are not embedded.
+                expand = [name for name in expand if name in fields]
+            self._sparse_options = (fields, expand, ids)
+        return self._sparse_options
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.sparse_actions:
+            fields, expand, _ = self.get_sparse_options()
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_selected_columns(self, serializer) -> List[str]:
+        """
+        Return the model fields the serializer reads, for ``QuerySet.only``.
+        """
+        model = self.queryset.model
+        columns = [model._meta.pk.name]
+        for name, field in serializer.fields.items():
+            if hasattr(field, 'fields'):
+                columns += [f'{name}__{nested.source}' for nested in field.fields.values()]
+                continue
+            try:
+                model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            columns.append(field.source)
+        return columns
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in self.sparse_actions:
+            return queryset
+
+        fields, expand, ids = self.get_sparse_options()
+        if ids is not None and self.action == 'list':
+            queryset = queryset.filter(pk__in=[int(item) for item in ids])
+        if expand:
+            queryset = queryset.select_related(*expand)
+        if fields is not None or expand:
+            queryset = queryset.only(*self.get_selected_columns(self.get_serializer()))
+        return queryset
+
+
+class FanOutListMixin:
+    """
+    List from every shard, merging the rows in the queryset's order, unless the filters route it to a single shard.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not is_sharded():
+            return super().list(request, *args, **kwargs)
+        queryset = list(fan_out(self.filter_queryset(self.get_queryset())))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
@@ -0,0 +1,9 @@
+from rest_framework.pagination import LimitOffsetPagination
+
+
+class PropertySearchPagination(LimitOffsetPagination):
+    """
+    Pagination for the property search, which can match every property.
+    """
+    default_limit = 20
+    max_limit = 100
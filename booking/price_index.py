@@ -0,0 +1,251 @@
+"""
+In-memory prefix sums of nightly prices, to price a stay with two lookups.
+
+The price of a night only depends on the stay through the min_stay_length
+thresholds it reaches: all stays between two consecutive thresholds see the
+same rules. For each such tier, a property's index holds the cumulative
+nightly prices over a rolling horizon starting today, so the total of a stay
+is ``prefix[end + 1] - prefix[start]`` in the tier of its length.
+
+Indexes are built one per property and worker, from the same rule evaluation
+as ``BookingViewSet._get_final_price``, and are stale once the property's
+pricing version or base price changes, or the day rolls over. Building one
+prices every night of the horizon in every tier, so requests never wait for
+it: a stay is only priced from an index that is already current, and night by
+night otherwise. Once the stays a worker priced night by night for the same
+generation of a property add up to ``PRICE_INDEX_HORIZON_DAYS`` nights, about
+the work of a build, the index is built after the response is sent. Stays that
+end past the horizon are priced night by night as before.
+"""
+import math
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import Iterator, List, Optional, Sequence
+
+from django.conf import settings
+from django.db.models import Q
+
+from core.models import Booking, PricingRule, Property
+
+
+class PropertyPriceIndex:
+    """
+    Cumulative nightly prices of one property, per min stay tier, from ``start`` for ``horizon_days`` nights.
+
+    ``prefix_sums`` has ``horizon_days + 1`` sums per tier; any sequence of floats works, e.g. a memoryview.
+    """
+
+    def __init__(self, property_id: int, pricing_version: int, base_price: Optional[float], start: date,
+                 horizon_days: int, thresholds: Sequence[int], prefix_sums: Sequence[Sequence[float]]):
+        self.property_id = property_id
+        self.pricing_version = pricing_version
+        self.base_price = base_price
+        self.start = start
+        self.horizon_days = horizon_days
+        self.thresholds = thresholds
+        self.prefix_sums = prefix_sums
+
+    @classmethod
+    def compute(cls, property_obj: Property, rules: List[PricingRule], start: date, horizon_days: int, pricer):
+        """
+        Price every night of the horizon in every tier.
+
+        ``pricer`` provides the rule evaluation of ``BookingViewSet``.
+        """
+        index = cls(
+            property_obj.pk, property_obj.pricing_version, property_obj.base_price, start, horizon_days,
+            sorted({rule.min_stay_length for rule in rules if rule.min_stay_length is not None}), [],
+        )
+        days = [start + timedelta(days=offset) for offset in range(horizon_days)]
+        index.prefix_sums = [
+            [0.0, *accumulate(index._nightly_prices(rules, stay_length, days, pricer))]
+            for stay_length in index._tier_stay_lengths()
+        ]
+        return index
+
+    def _tier_stay_lengths(self) -> List[int]:
+        """
+        Return a stay length in each tier: just below the first threshold, then each threshold.
+        """
+        first = self.thresholds[0] - 1 if self.thresholds else 1
+        return [first, *self.thresholds]
+
+    def _nightly_prices(self, rules: List[PricingRule], stay_length: int, days: List[date], pricer) -> Iterator[float]:
+        """
+        Price each night of a stay of ``stay_length`` nights.
+
+        Rules that apply to every night are reduced to the most relevant one
+        up front, so each night only compares it with its specific-day and
+        seasonal rules.
+        """
+        every_night, by_day, seasonal = [], defaultdict(list), []
+        for rule in rules:
+            if rule.is_seasonal:
+                seasonal.append(rule)
+            elif pricer._valid_min_stay_rule(rule, stay_length):
+                every_night.append(rule)
+            elif rule.specific_day is not None:
+                by_day[rule.specific_day].append(rule)
+        every_night_rule = pricer._select_max_rule(every_night)
+
+        for day in days:
+            applicable_rules = [rule for rule in seasonal if pricer._is_rule_applicable(rule, stay_length, day)]
+            applicable_rules += by_day.get(day, [])
+            if every_night_rule:
+                applicable_rules.append(every_night_rule)
+            rule = pricer._select_max_rule(applicable_rules)
+            price = pricer._apply_rule(self.base_price, rule) if rule else self.base_price
+            # Nights without a price (no base price and no fixed price) make the sums NaN from there on.
+            yield math.nan if price is None else price
+
+    def is_current(self, property_obj: Property, today: date) -> bool:
+        return (
+            self.start == today
+            and self.pricing_version == property_obj.pricing_version
+            and self.base_price == property_obj.base_price
+        )
+
+    def total(self, date_start: date, date_end: date) -> Optional[float]:
+        """
+        Return the total price of the stay (both ends included), or None when it is outside the horizon
+        or the index cannot price it.
+        """
+        first = (date_start - self.start).days
+        last = (date_end - self.start).days
+        if first < 0 or last >= self.horizon_days:
+            return None
+        prefix = self.prefix_sums[bisect_right(self.thresholds, last - first + 1)]
+        total = prefix[last + 1] - prefix[first]
+        return None if math.isnan(total) else total
+
+
+class PriceIndexRegistry:
+    """
+    The price indexes of this worker, least recently used dropped first.
+
+    ``missed_nights`` counts, per property, the nights priced without an index
+    since its generation last changed, and ``pending`` holds the properties
+    whose index is built once the response is sent.
+    """
+
+    def __init__(self):
+        self.indexes = OrderedDict()
+        self.missed_nights = OrderedDict()
+        self.pending = {}
+
+    def clear(self) -> None:
+        self.indexes.clear()
+        self.missed_nights.clear()
+        self.pending.clear()
+
+    def find(self, property_obj: Property, today: date) -> Optional[PropertyPriceIndex]:
+        """
+        Return the current index of the property without building it, or None.
+        """
+        index = self.indexes.pop(property_obj.pk, None)
+        if index is None or not index.is_current(property_obj, today):
+            index = self.published(property_obj, today)
+        if index is not None:
+            self.keep(property_obj.pk, index)
+        return index
+
+    def published(self, property_obj: Property, today: date) -> Optional[PropertyPriceIndex]:
+        """
+        Return a current index of the property that another worker built, if they share them.
+        """
+        return None
+
+    def keep(self, property_id: int, index: PropertyPriceIndex) -> None:
+        self.indexes[property_id] = index
+        while len(self.indexes) > settings.PRICE_INDEX_MAX_PROPERTIES:
+            self.indexes.popitem(last=False)
+
+    def get(self, property_obj: Property, pricer) -> PropertyPriceIndex:
+        """
+        Return the current index of the property, building it if needed.
+        """
+        today = date.today()
+        index = self.find(property_obj, today)
+        if index is None:
+            index = self.load(property_obj, today, pricer)
+            self.keep(property_obj.pk, index)
+        return index
+
+    def load(self, property_obj: Property, today: date, pricer) -> PropertyPriceIndex:
+        return build_index(property_obj, today, settings.PRICE_INDEX_HORIZON_DAYS, pricer)
+
+    def total(self, booking: Booking, pricer) -> Optional[float]:
+        """
+        Return the total price of the booking from its property's current index, or None when there is none
+        or it cannot be used. A missing index is counted towards building it, but never built here.
+        """
+        if not settings.PRICE_INDEX_HORIZON_DAYS:
+            return None
+        today = date.today()
+        index = self.find(booking.property, today)
+        if index is None:
+            self.count_miss(booking, today, pricer)
+            return None
+        return index.total(booking.date_start, booking.date_end)
+
+    def count_miss(self, booking: Booking, today: date, pricer) -> None:
+        """
+        Add the nights of a booking priced without an index, and request the build once they pay for it.
+        """
+        property_obj = booking.property
+        generation = (property_obj.pricing_version, property_obj.base_price, today)
+        missed_generation, nights = self.missed_nights.pop(property_obj.pk, (generation, 0))
+        nights = booking.stay_length + (nights if missed_generation == generation else 0)
+        if nights >= settings.PRICE_INDEX_HORIZON_DAYS:
+            self.pending[property_obj.pk] = (property_obj, pricer)
+            return
+        self.missed_nights[property_obj.pk] = (generation, nights)
+        while len(self.missed_nights) > settings.PRICE_INDEX_MAX_PROPERTIES:
+            self.missed_nights.popitem(last=False)
+
+    def build_pending(self) -> None:
+        """
+        Build the indexes requested by ``count_miss``.
+        """
+        while self.pending:
+            _, (property_obj, pricer) = self.pending.popitem()
+            self.get(property_obj, pricer)
+
+
+def load_rules(property_obj: Property, start: date, end: date) -> List[PricingRule]:
+    """
+    Return the rules of the property that can apply to a night between ``start`` and ``end``.
+    """
+    return list(PricingRule.objects.filter(property=property_obj).filter(
+        Q(specific_day__isnull=True) | Q(specific_day__range=(start, end)) | Q(min_stay_length__isnull=False)
+    ).exclude(date_end__lt=start).exclude(date_start__gt=end))
+
+
+def build_index(property_obj: Property, start: date, horizon_days: int, pricer) -> PropertyPriceIndex:
+    """
+    Build the index of the property from the rules that can apply to a night of the horizon.
+    """
+    rules = load_rules(property_obj, start, start + timedelta(days=horizon_days - 1))
+    return PropertyPriceIndex.compute(property_obj, rules, start, horizon_days, pricer)
+
+
+def create_registry() -> PriceIndexRegistry:
+    """
+    Return the registry configured for this deployment: shared by the workers through files, or per worker.
+    """
+    if settings.PRICE_INDEX_SHARED_DIR:
+        from booking.shared_price_index import SharedPriceIndexRegistry
+        return SharedPriceIndexRegistry(settings.PRICE_INDEX_SHARED_DIR)
+    return PriceIndexRegistry()
+
+
+price_indexes = create_registry()
+
+
+def build_pending_indexes(**kwargs) -> None:
+    """
+    Build the price indexes the request asked for, once its response is sent (``request_finished`` receiver).
+    """
+    price_indexes.build_pending()
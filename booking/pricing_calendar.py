@@ -0,0 +1,45 @@
+"""
+Bulk upload of nightly prices, stored as specific-day pricing rules.
+
+A property's calendar holds at most one rule per day, marked by its
+``calendar_day``. Uploading a day again replaces the price of its rule instead
+of adding another one, and the whole upload is written with a single upsert,
+under a lock of the property row.
+"""
+from typing import Dict, List
+
+from django.db import transaction
+
+from booking.quotes import bump_pricing_version
+from core.models import PricingRule, Property
+
+
+def upsert_calendar(property_obj: Property, entries: List[dict]) -> Dict[str, int]:
+    """
+    Create or update the calendar rules of ``property_obj`` for the given days and return how many of each were done.
+
+    Each entry has a ``specific_day`` and a ``fixed_price`` and/or a ``price_modifier``.
+    """
+    days = [entry['specific_day'] for entry in entries]
+    rules = [
+        PricingRule(
+            property=property_obj,
+            specific_day=entry['specific_day'],
+            calendar_day=entry['specific_day'],
+            fixed_price=entry.get('fixed_price'),
+            price_modifier=entry.get('price_modifier'),
+        )
+        for entry in entries
+    ]
+    with transaction.atomic(using=property_obj._state.db):
+        # Concurrent uploads for the property wait here, so no calendar rule is added between the count and the upsert.
+        list(Property.objects.select_for_update().filter(pk=property_obj.pk).values_list('pk', flat=True))
+        existing = PricingRule.objects.filter(property=property_obj, calendar_day__in=days).count()
+        PricingRule.objects.bulk_create(
+            rules,
+            update_conflicts=True,
+            unique_fields=['property', 'calendar_day'],
+            update_fields=['fixed_price', 'price_modifier', 'min_stay_length', 'updated_at'],
+        )
+        bump_pricing_version([property_obj.pk])
+    return {'inserted': len(rules) - existing, 'updated': existing}
@@ -0,0 +1,85 @@
+"""
+Memoised booking price quotes.
+
+A quote depends on the property's base price and pricing rules only. Its key
+carries both the base price and the property's pricing version, which every
+pricing rule write replaces in the same transaction, so once a rule change
+commits the quotes priced with the old rules are never served again. The
+cache timeout and size only bound memory.
+
+The version is read with the property, before the rules are, so a quote
+priced while rules change is at worst stored under the old version.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Callable, Tuple
+
+from django.core.cache import caches
+from django.db.models import QuerySet
+
+from core.models import Property, new_pricing_version
+from core.sharding import shard_for
+
+
+class QuoteStats:
+    """
+    Hits and misses of the quote cache in this process.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+quote_stats = QuoteStats()
+
+
+def quote_key(property_obj: Property, date_start: date, date_end: date) -> str:
+    return (
+        f'quote:{property_obj.pk}:{property_obj.pricing_version}:{property_obj.base_price}:'
+        f'{date_start:%Y%m%d}:{date_end:%Y%m%d}'
+    )
+
+
+def get_quote(
+    property_obj: Property, date_start: date, date_end: date, price: Callable[[], float]
+) -> Tuple[float, bool]:
+    """
+    Return the cached price of the stay, or compute it with ``price`` and cache it, and whether it was cached.
+    """
+    cache = caches['quotes']
+    key = quote_key(property_obj, date_start, date_end)
+    final_price = cache.get(key)
+    if final_price is not None:
+        quote_stats.hits += 1
+        return final_price, True
+
+    quote_stats.misses += 1
+    final_price = price()
+    cache.set(key, final_price)
+    return final_price, False
+
+
+def bump_pricing_version(property_ids) -> None:
+    """
+    Give the properties a new pricing version, so their cached quotes are no longer used.
+
+    ``property_ids`` can be a list of ids or a queryset of ids. Call it in the
+    transaction that changes the pricing rules.
+    """
+    if isinstance(property_ids, QuerySet):
+        Property.objects.using(property_ids.db).filter(pk__in=property_ids).update(
+            pricing_version=new_pricing_version()
+        )
+        return
+    ids_by_shard = defaultdict(list)
+    for property_id in property_ids:
+        ids_by_shard[shard_for(property_id)].append(property_id)
+    ids_by_shard.pop(None, None)
+    for shard, ids in ids_by_shard.items():
+        Property.objects.using(shard).filter(pk__in=ids).update(pricing_version=new_pricing_version())
@@ -0,0 +1,121 @@
+"""
+Incremental monthly rollups of booking revenue and occupied nights.
+
+Each booking contributes its nights to the months they fall in, and its final
+price split evenly across its nights. Writes through the API and the admin
+apply the difference between the old and new contributions with a single
+upsert, so the analytics endpoint only reads rollup rows. Writes that bypass
+them (e.g. ``QuerySet.update``) are caught up with
+``python manage.py rebuild_booking_rollups``.
+"""
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.models import Booking, BookingRollup
+from core.partitioning import add_months, month_start
+from core.sharding import shard_for
+
+
+BookingSnapshot = namedtuple('BookingSnapshot', ['property_id', 'date_start', 'date_end', 'final_price'])
+
+# (property id, month) -> [revenue, nights]
+Contributions = Dict[Tuple[int, date], list]
+
+
+def snapshot(booking: Booking) -> BookingSnapshot:
+    """
+    Capture the fields of a booking that its rollup contribution depends on.
+    """
+    return BookingSnapshot(booking.property_id, booking.date_start, booking.date_end, booking.final_price)
+
+
+def month_nights(date_start: date, date_end: date) -> Dict[date, int]:
+    """
+    Return the number of nights of the stay (both ends included) in each month it touches.
+    """
+    nights = {}
+    month = month_start(date_start)
+    while month <= date_end:
+        next_month = add_months(month, 1)
+        first, last = max(month, date_start), min(next_month - timedelta(days=1), date_end)
+        nights[month] = (last - first).days + 1
+        month = next_month
+    return nights
+
+
+def add_contribution(contributions: Contributions, booking: BookingSnapshot, sign: int = 1) -> None:
+    """
+    Add the nights and revenue of ``booking`` to ``contributions``, or subtract them when ``sign`` is -1.
+    """
+    stay_length = (booking.date_end - booking.date_start).days + 1
+    nightly_rate = (booking.final_price or 0) / stay_length
+    for month, nights in month_nights(booking.date_start, booking.date_end).items():
+        totals = contributions[(booking.property_id, month)]
+        totals[0] += sign * nightly_rate * nights
+        totals[1] += sign * nights
+
+
+def aggregate(bookings: Iterable[BookingSnapshot]) -> Contributions:
+    contributions: Contributions = defaultdict(lambda: [0.0, 0])
+    for booking in bookings:
+        add_contribution(contributions, booking)
+    return contributions
+
+
+def apply_contributions(contributions: Contributions, using: str = DEFAULT_DB_ALIAS) -> None:
+    """
+    Add the contributions to the rollup rows of database ``using`` with one upsert.
+    """
+    rows = [
+        (property_id, month, revenue, nights)
+        for (property_id, month), (revenue, nights) in contributions.items()
+        if revenue or nights
+    ]
+    if not rows:
+        return
+    connection = connections[using]
+    table = connection.ops.quote_name(BookingRollup._meta.db_table)
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (property_id, month, revenue, nights) VALUES {values}
+            ON CONFLICT (property_id, month) DO UPDATE SET
+                revenue = {table}.revenue + EXCLUDED.revenue,
+                nights = {table}.nights + EXCLUDED.nights
+            """,
+            [value for row in rows for value in row],
+        )
+
+
+def record_booking_change(old: Optional[BookingSnapshot], new: Optional[BookingSnapshot]) -> None:
+    """
+    Update the rollups for a booking that was created (no ``old``), updated or deleted (no ``new``).
+
+    Both snapshots are of properties on the same shard.
+    """
+    contributions: Contributions = defaultdict(lambda: [0.0, 0])
+    if old:
+        add_contribution(contributions, old, sign=-1)
+    if new:
+        add_contribution(contributions, new)
+    apply_contributions(contributions, using=shard_for((new or old).property_id))
+
+
+def rebuild_rollups(chunk_size: int = 2000, using: str = DEFAULT_DB_ALIAS) -> int:
+    """
+    Recompute every rollup row of database ``using`` from its bookings and return the number of rows written.
+    """
+    with transaction.atomic(using=using):
+        BookingRollup.objects.using(using).all().delete()
+        bookings = Booking.objects.using(using).values_list('property_id', 'date_start', 'date_end', 'final_price')
+        contributions = aggregate(BookingSnapshot(*row) for row in bookings.iterator(chunk_size=chunk_size))
+        rollups = [
+            BookingRollup(property_id=property_id, month=month, revenue=revenue, nights=nights)
+            for (property_id, month), (revenue, nights) in contributions.items()
+        ]
+        BookingRollup.objects.using(using).bulk_create(rollups, batch_size=chunk_size)
+    return len(rollups)
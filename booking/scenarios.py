@@ -0,0 +1,113 @@
+"""
+Request mix for the HTTP load test (``python manage.py loadtest``).
+
+Each scenario builds one request against the routes registered in
+``booking/urls.py``, resolved with ``reverse`` so the scenarios follow the URL
+configuration. Booking dates are drawn from the next year with mostly short
+stays, like real traffic.
+"""
+import random
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from django.urls import reverse
+
+
+DATE_FORMAT = '%m-%d-%Y'
+
+Scenario = namedtuple('Scenario', ['name', 'weight', 'build'])
+ScenarioRequest = namedtuple('ScenarioRequest', ['method', 'path', 'payload'])
+
+# Stay lengths in nights and their relative frequency.
+STAY_LENGTHS = (1, 2, 3, 4, 5, 7, 10, 14, 21, 30)
+STAY_LENGTH_WEIGHTS = (10, 20, 20, 12, 10, 12, 6, 5, 3, 2)
+
+
+class VirtualUser:
+    """
+    State of one simulated client: the properties it can pick, the bookings it made, and the address
+    it sends as X-Forwarded-For so the server gives it its own throttle bucket.
+    """
+
+    def __init__(self, property_ids: List[int], rng: random.Random, today: Optional[date] = None,
+                 address: str = '10.1.0.1'):
+        self.property_ids = property_ids
+        self.rng = rng
+        self.today = today or date.today()
+        self.address = address
+        self.booking_ids: List[int] = []
+
+    def pick_property(self) -> int:
+        return self.rng.choice(self.property_ids)
+
+    def pick_stay(self) -> Tuple[date, date]:
+        """
+        Return the first and last night of a stay starting within the next year.
+        """
+        nights = self.rng.choices(STAY_LENGTHS, STAY_LENGTH_WEIGHTS)[0]
+        date_start = self.today + timedelta(days=self.rng.randint(1, 365))
+        return date_start, date_start + timedelta(days=nights - 1)
+
+
+def list_properties(user: VirtualUser) -> ScenarioRequest:
+    low = user.rng.randrange(0, 200, 10)
+    query = user.rng.choice([
+        f'base_price__gte={low}&base_price__lte={low + 50}',
+        f'name={user.rng.randint(1, 9)}',
+        'search=property',
+    ])
+    return ScenarioRequest('GET', f'{reverse("booking:property-list")}?{query}', None)
+
+
+def search_properties(user: VirtualUser) -> ScenarioRequest:
+    date_start, date_end = user.pick_stay()
+    query = f'date_start={date_start.strftime(DATE_FORMAT)}&date_end={date_end.strftime(DATE_FORMAT)}&limit=20'
+    return ScenarioRequest('GET', f'{reverse("booking:property-search")}?{query}', None)
+
+
+def list_pricing_rules(user: VirtualUser) -> ScenarioRequest:
+    return ScenarioRequest('GET', f'{reverse("booking:pricingrule-list")}?property={user.pick_property()}', None)
+
+
+def list_bookings(user: VirtualUser) -> ScenarioRequest:
+    date_start, date_end = user.pick_stay()
+    overlaps = f'{date_start.strftime(DATE_FORMAT)},{date_end.strftime(DATE_FORMAT)}'
+    query = f'property={user.pick_property()}&overlaps={overlaps}'
+    return ScenarioRequest('GET', f'{reverse("booking:booking-list")}?{query}', None)
+
+
+def create_booking(user: VirtualUser) -> ScenarioRequest:
+    date_start, date_end = user.pick_stay()
+    payload = {
+        'property': user.pick_property(),
+        'date_start': date_start.strftime(DATE_FORMAT),
+        'date_end': date_end.strftime(DATE_FORMAT),
+    }
+    return ScenarioRequest('POST', reverse('booking:booking-list'), payload)
+
+
+def update_booking(user: VirtualUser) -> ScenarioRequest:
+    """
+    Move one of the user's bookings to new dates, or create one if it has none yet.
+    """
+    if not user.booking_ids:
+        return create_booking(user)
+    date_start, date_end = user.pick_stay()
+    payload = {'date_start': date_start.strftime(DATE_FORMAT), 'date_end': date_end.strftime(DATE_FORMAT)}
+    path = reverse('booking:booking-detail', args=[user.rng.choice(user.booking_ids)])
+    return ScenarioRequest('PATCH', path, payload)
+
+
+SCENARIOS = (
+    Scenario('list properties', 30, list_properties),
+    Scenario('search properties', 10, search_properties),
+    Scenario('list pricing rules', 20, list_pricing_rules),
+    Scenario('list bookings', 15, list_bookings),
+    Scenario('create booking', 15, create_booking),
+    Scenario('update booking', 10, update_booking),
+)
+
+
+def pick_scenario(user: VirtualUser, scenarios=SCENARIOS) -> Scenario:
+    return user.rng.choices(scenarios, [scenario.weight for scenario in scenarios])[0]
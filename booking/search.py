@@ -0,0 +1,216 @@
+"""
+Search of available properties by the total price of a stay.
+
+Totals are computed for every candidate property in a single set-based query,
+following the same semantics as ``BookingViewSet._get_final_price``:
+
+* A rule applies to every night when the stay is at least its ``min_stay_length``
+  ("tier" rules), and to its ``specific_day`` when that night is part of the stay.
+* A seasonal rule applies to the nights in its date range and/or on its
+  weekdays, when the stay is at least its ``min_stay_length`` (if any).
+* Each night uses its most relevant applicable rule, ordered like
+  ``BookingViewSet._select_max_rule``, or the property's ``base_price``.
+
+Nights without a specific-day or seasonal rule all share the property's most
+relevant tier rule, so only nights with such rules are priced individually.
+
+When properties are sharded, each shard is searched and the pages are merged.
+"""
+from datetime import date
+from heapq import merge
+from operator import attrgetter
+from typing import List, Optional
+
+from django.db import connections
+
+from core.models import Property
+from core.sharding import shard_aliases
+
+
+# Most relevant rule first, as in BookingViewSet._select_max_rule.
+RULE_RELEVANCE = 'specificity DESC, min_stay DESC, modifier DESC, fixed DESC'
+
+NIGHT_PRICE = """
+    CASE
+        WHEN {rule}.fixed_price IS NOT NULL THEN {rule}.fixed_price
+        WHEN {rule}.price_modifier IS NOT NULL THEN {base} * (1 + {rule}.price_modifier / 100.0)
+        ELSE {base}
+    END
+"""
+
+# Whether booking ``b`` shares a night with the searched stay. The PostgreSQL
+# form is served by the GiST index on (property, daterange(date_start, date_end)).
+BOOKING_OVERLAP = {
+    'postgresql': "DATERANGE(b.date_start, b.date_end, '[]') && DATERANGE(%(date_start)s, %(date_end)s, '[]')",
+    'default': 'b.date_start <= %(date_end)s AND b.date_end >= %(date_start)s',
+}
+
+# The nights of the stay with their weekday (0 is Monday), to match seasonal rules.
+STAY_NIGHTS = {
+    'postgresql': """
+        stay_night (night, weekday) AS (
+            SELECT night::date, EXTRACT(ISODOW FROM night)::integer - 1
+            FROM generate_series(%(date_start)s::date, %(date_end)s::date, interval '1 day') AS night
+        )""",
+    'default': """
+        stay_night (night, weekday) AS (
+            SELECT date(%(date_start)s), (CAST(strftime('%%w', %(date_start)s) AS INTEGER) + 6) %% 7
+            UNION ALL
+            SELECT date(night, '+1 day'), (weekday + 1) %% 7 FROM stay_night WHERE night < date(%(date_end)s)
+        )""",
+}
+
+RULE_COLUMNS = 'property_id, base_price, fixed_price, price_modifier, specificity, min_stay, modifier, fixed'
+
+SEARCH_SQL = """
+WITH RECURSIVE {stay_nights},
+candidate AS (
+    SELECT p.id, p.base_price
+    FROM core_property p
+    WHERE p.base_price IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM core_booking b WHERE b.property_id = p.id AND {booking_overlap}
+      )
+),
+applicable_rule AS (
+    SELECT * FROM (
+        SELECT
+            r.property_id,
+            c.base_price,
+            r.specific_day,
+            r.date_start,
+            r.date_end,
+            r.weekdays,
+            r.fixed_price,
+            r.price_modifier,
+            (r.date_start IS NOT NULL OR r.weekdays IS NOT NULL) AS is_seasonal,
+            (r.min_stay_length IS NOT NULL AND r.min_stay_length <= %(stay_length)s) AS long_enough,
+            CASE
+                WHEN r.specific_day IS NOT NULL THEN 3
+                WHEN r.date_start IS NOT NULL THEN 2
+                WHEN r.weekdays IS NOT NULL THEN 1
+                ELSE 0
+            END AS specificity,
+            COALESCE(r.min_stay_length, 0) AS min_stay,
+            COALESCE(r.price_modifier, 0) AS modifier,
+            COALESCE(r.fixed_price, 0) AS fixed
+        FROM core_pricingrule r
+        JOIN candidate c ON c.id = r.property_id
+    ) rule
+    WHERE (NOT is_seasonal AND (long_enough OR specific_day BETWEEN %(date_start)s AND %(date_end)s))
+       OR (is_seasonal AND (long_enough OR min_stay = 0)
+           AND (date_start IS NULL OR (date_start <= %(date_end)s AND date_end >= %(date_start)s)))
+),
+tier_rule AS (
+    SELECT * FROM (
+        SELECT
+            applicable_rule.*,
+            ROW_NUMBER() OVER (PARTITION BY property_id ORDER BY {relevance}) AS position
+        FROM applicable_rule
+        WHERE long_enough AND NOT is_seasonal
+    ) ranked
+    WHERE position = 1
+),
+special_rule AS (
+    SELECT {rule_columns}, specific_day AS night
+    FROM applicable_rule
+    WHERE NOT is_seasonal AND specific_day BETWEEN %(date_start)s AND %(date_end)s
+    UNION ALL
+    SELECT {rule_columns}, n.night
+    FROM applicable_rule
+    JOIN stay_night n
+      ON (date_start IS NULL OR n.night BETWEEN date_start AND date_end)
+     AND (weekdays IS NULL OR (weekdays & (1 << n.weekday)) <> 0)
+    WHERE is_seasonal
+),
+night_rule AS (
+    SELECT * FROM special_rule
+    UNION ALL
+    SELECT {tier_rule_columns}, nights.night
+    FROM tier_rule t
+    JOIN (SELECT DISTINCT property_id, night FROM special_rule) nights ON nights.property_id = t.property_id
+),
+special_night AS (
+    SELECT property_id, COUNT(*) AS nights, SUM({special_night_price}) AS total
+    FROM (
+        SELECT
+            night_rule.*,
+            ROW_NUMBER() OVER (PARTITION BY property_id, night ORDER BY {relevance}) AS position
+        FROM night_rule
+    ) ranked
+    WHERE position = 1
+    GROUP BY property_id
+),
+priced AS (
+    SELECT
+        p.*,
+        {tier_night_price} * (%(stay_length)s - COALESCE(s.nights, 0)) + COALESCE(s.total, 0) AS total_price
+    FROM candidate c
+    JOIN core_property p ON p.id = c.id
+    LEFT JOIN tier_rule t ON t.property_id = c.id
+    LEFT JOIN special_night s ON s.property_id = c.id
+)
+"""
+
+
+class StayPriceSearch:
+    """
+    Properties free for a stay, cheapest total first, with the total as ``total_price``.
+
+    Supports ``count()`` and slicing so DRF paginators can page through it;
+    each of them runs one query per shard.
+    """
+
+    def __init__(self, date_start: date, date_end: date, max_total: Optional[float] = None):
+        self.max_total = max_total
+        self.params = {
+            'date_start': date_start,
+            'date_end': date_end,
+            'stay_length': (date_end - date_start).days + 1,
+            'max_total': max_total,
+        }
+
+    def _sql(self, select: str, connection) -> str:
+        """
+        Build the search query for ``connection`` with the given final SELECT over the ``priced`` rows.
+        """
+        booking_overlap = BOOKING_OVERLAP.get(connection.vendor, BOOKING_OVERLAP['default'])
+        where = ' WHERE total_price <= %(max_total)s' if self.max_total is not None else ''
+        return SEARCH_SQL.format(
+            stay_nights=STAY_NIGHTS.get(connection.vendor, STAY_NIGHTS['default']),
+            booking_overlap=booking_overlap,
+            relevance=RULE_RELEVANCE,
+            rule_columns=RULE_COLUMNS,
+            tier_rule_columns=', '.join(f't.{column.strip()}' for column in RULE_COLUMNS.split(',')),
+            special_night_price=NIGHT_PRICE.format(rule='ranked', base='ranked.base_price'),
+            tier_night_price=NIGHT_PRICE.format(rule='t', base='c.base_price'),
+        ) + f'{select} FROM priced{where}'
+
+    def count(self) -> int:
+        """
+        Return the number of matching properties.
+        """
+        count = 0
+        for shard in shard_aliases():
+            with connections[shard].cursor() as cursor:
+                cursor.execute(self._sql('SELECT COUNT(*)', connections[shard]), self.params)
+                count += cursor.fetchone()[0]
+        return count
+
+    def __getitem__(self, page: slice) -> List[Property]:
+        """
+        Return the properties in the ``page`` slice, cheapest first.
+        """
+        shards = shard_aliases()
+        # With several shards any of them may hold the whole page, so each returns its rows up to the page's end.
+        offset = page.start if len(shards) == 1 else 0
+        pages = [
+            Property.objects.raw(
+                self._sql('SELECT *', connections[shard])
+                + f' ORDER BY total_price, id LIMIT {int(page.stop - offset)} OFFSET {int(offset)}',
+                self.params,
+            ).using(shard)
+            for shard in shards
+        ]
+        properties = list(merge(*pages, key=attrgetter('total_price', 'id')))
+        return properties[page.start - offset:page.stop - offset]
@@ -1,11 +1,16 @@
 from datetime import datetime
 
+from django.conf import settings
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
-from core.models import Booking, Property, PricingRule
+from booking.mixins import SparseFieldsSerializerMixin
+from booking.simulation import RuleChanges, edited_copy
+from core.models import Booking, BookingRollup, Property, PricingRule
+from core.sharding import fan_out
 
 
-class PropertySerializer(serializers.ModelSerializer):
+class PropertySerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Property
@@ -19,7 +24,60 @@ class PropertySerializer(serializers.ModelSerializer):
         return data
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class PropertyAggregatesSerializer(PropertySerializer):
+    """
+    Property with the aggregates of ``booking.aggregates``, annotated on the queryset.
+    """
+    active_rule_count = serializers.IntegerField(read_only=True)
+    next_booked_date = serializers.DateField(read_only=True)
+    min_nightly_price = serializers.FloatField(read_only=True)
+
+    class Meta(PropertySerializer.Meta):
+        fields = PropertySerializer.Meta.fields + ['active_rule_count', 'next_booked_date', 'min_nightly_price']
+
+
+class PropertySearchSerializer(PropertySerializer):
+
+    total_price = serializers.FloatField(read_only=True)
+
+    class Meta(PropertySerializer.Meta):
+        fields = PropertySerializer.Meta.fields + ['total_price']
+
+
+class StaySearchSerializer(serializers.Serializer):
+    """
+    Query parameters of the property search by total stay price.
+    """
+    date_start = serializers.DateField()
+    date_end = serializers.DateField()
+    max_total = serializers.FloatField(required=False, min_value=0)
+
+    def validate(self, data):
+        if data['date_start'] > data['date_end']:
+            raise serializers.ValidationError("Booking end date must be after start date.")
+        return data
+
+
+class BookingPropertyField(serializers.PrimaryKeyRelatedField):
+    """
+    Property of a booking. An update that sends the property the booking already has reuses the loaded
+    property instead of fetching it again.
+    """
+
+    def to_internal_value(self, data):
+        booking = self.parent.instance
+        if (
+            isinstance(booking, Booking) and Booking.property.is_cached(booking)
+            and not isinstance(data, bool) and str(data) == str(booking.property_id)
+        ):
+            return booking.property
+        return super().to_internal_value(data)
+
+
+class BookingSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+
+    expandable_fields = {'property': PropertySerializer}
+    property = BookingPropertyField(queryset=Property.objects.all())
 
     class Meta:
         model = Booking
@@ -36,15 +94,58 @@ class BookingSerializer(serializers.ModelSerializer):
         if date_start and date_end and date_start > date_end:
             raise serializers.ValidationError("Booking end date must be after start date.")
 
+        if self.instance and 'property' in data and data['property']._state.db != self.instance._state.db:
+            raise serializers.ValidationError("Bookings cannot be moved to a property on another shard.")
+
+        # Checked before pricing, whose cost grows with the number of nights.
+        stay_start = date_start or getattr(self.instance, 'date_start', None)
+        stay_end = date_end or getattr(self.instance, 'date_end', None)
+        if stay_start and stay_end and (stay_end - stay_start).days + 1 > settings.BOOKING_MAX_STAY_LENGTH:
+            raise serializers.ValidationError(
+                f"Booking stay cannot be longer than {settings.BOOKING_MAX_STAY_LENGTH} days."
+            )
+
         return data
 
 
-class PricingRuleSerializer(serializers.ModelSerializer):
+@extend_schema_field({'type': 'array', 'items': {'type': 'integer', 'minimum': 0, 'maximum': 6}, 'nullable': True})
+class WeekdaysField(serializers.Field):
+    """
+    Weekdays bitmask exposed as a list of weekday numbers, 0 being Monday.
+    """
+    default_error_messages = {
+        'invalid': 'Weekdays must be a non-empty list of numbers from 0 (Monday) to 6 (Sunday).',
+    }
+
+    def to_representation(self, value):
+        return [day for day in range(7) if value & (1 << day)]
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            self.fail('invalid')
+        mask = 0
+        for day in data:
+            try:
+                day = int(day)
+            except (TypeError, ValueError):
+                self.fail('invalid')
+            if not 0 <= day <= 6:
+                self.fail('invalid')
+            mask |= 1 << day
+        return mask
+
+
+class PricingRuleSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+
+    expandable_fields = {'property': PropertySerializer}
+
+    weekdays = WeekdaysField(required=False, allow_null=True)
 
     class Meta:
         model = PricingRule
         fields = ['id', 'property', 'price_modifier',
-                  'min_stay_length', 'fixed_price', 'specific_day']
+                  'min_stay_length', 'fixed_price', 'specific_day',
+                  'date_start', 'date_end', 'weekdays']
         read_only_fields = ['id']
 
     def validate(self, data):
@@ -55,10 +156,175 @@ class PricingRuleSerializer(serializers.ModelSerializer):
         if specific_day and specific_day < datetime.now().date():
             raise serializers.ValidationError("Specific day must be in the future.")
 
+        # Partial updates are validated against the stored season.
+        def current(name):
+            return data[name] if name in data else getattr(self.instance, name, None)
+
+        date_start, date_end = current('date_start'), current('date_end')
+        if (date_start is None) != (date_end is None):
+            raise serializers.ValidationError("Date start and date end must be set together.")
+
+        if date_start and date_start > date_end:
+            raise serializers.ValidationError("Date end must be after date start.")
+
+        if data.get('date_end') and data['date_end'] < datetime.now().date():
+            raise serializers.ValidationError("Date end must be in the future.")
+
+        if current('specific_day') and (date_start or current('weekdays') is not None):
+            raise serializers.ValidationError("A specific day rule cannot have a date range or weekdays.")
+
         if fixed_price is not None and fixed_price < 0:
             raise serializers.ValidationError("Fixed price cannot be negative.")
 
         if min_stay_length is not None and min_stay_length < 0:
             raise serializers.ValidationError("Min stay length cannot be negative.")
 
+        if self.instance and 'property' in data and data['property']._state.db != self.instance._state.db:
+            raise serializers.ValidationError("Pricing rules cannot be moved to a property on another shard.")
+
         return data
+
+    def update(self, instance, validated_data):
+        # A rule moved to another day is no longer that day's calendar price.
+        if validated_data.get('specific_day', instance.specific_day) != instance.calendar_day:
+            instance.calendar_day = None
+        return super().update(instance, validated_data)
+
+
+class PricingRuleBulkUpdateSerializer(serializers.Serializer):
+    """
+    Values set on every pricing rule matched by a bulk update.
+
+    ``price_modifier_increment`` adds to the current modifier of each rule instead of replacing it.
+    """
+    price_modifier = serializers.FloatField(required=False, allow_null=True)
+    price_modifier_increment = serializers.FloatField(required=False)
+    fixed_price = serializers.FloatField(required=False, allow_null=True, min_value=0)
+    min_stay_length = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError("At least one field to update is required.")
+
+        if 'price_modifier' in data and 'price_modifier_increment' in data:
+            raise serializers.ValidationError("Price modifier cannot be set and incremented at once.")
+
+        return data
+
+
+class CalendarEntrySerializer(serializers.Serializer):
+    """
+    Nightly price of one day of a pricing calendar upload.
+    """
+    specific_day = serializers.DateField()
+    fixed_price = serializers.FloatField(required=False, allow_null=True, min_value=0)
+    price_modifier = serializers.FloatField(required=False, allow_null=True)
+
+    def validate(self, data):
+        if data['specific_day'] < datetime.now().date():
+            raise serializers.ValidationError("Specific day must be in the future.")
+
+        if data.get('fixed_price') is None and data.get('price_modifier') is None:
+            raise serializers.ValidationError("A fixed price or a price modifier is required.")
+
+        return data
+
+
+class PricingCalendarSerializer(serializers.Serializer):
+    """
+    Nightly prices of a property, uploaded at once.
+    """
+    property = serializers.PrimaryKeyRelatedField(queryset=Property.objects.all())
+    entries = CalendarEntrySerializer(many=True, allow_empty=False, max_length=settings.PRICING_CALENDAR_MAX_DAYS)
+    inserted = serializers.IntegerField(read_only=True)
+    updated = serializers.IntegerField(read_only=True)
+
+    def validate_entries(self, entries):
+        days = [entry['specific_day'] for entry in entries]
+        if len(set(days)) != len(days):
+            raise serializers.ValidationError("Each day can only appear once.")
+        return entries
+
+
+class PricingSimulationSerializer(serializers.Serializer):
+    """
+    Proposed pricing rule changes, and the window of booking start dates to reprice with them.
+
+    ``add`` holds new rules and ``update`` partial edits with the ``id`` of their rule, both validated as by
+    the pricing rule endpoints; ``delete`` holds rule ids.
+    """
+    date_start = serializers.DateField()
+    date_end = serializers.DateField()
+    add = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, data):
+        if data['date_start'] > data['date_end']:
+            raise serializers.ValidationError("Date end must be after date start.")
+
+        if (data['date_end'] - data['date_start']).days + 1 > settings.PRICING_SIMULATION_MAX_DAYS:
+            raise serializers.ValidationError(
+                f"Simulation window cannot be longer than {settings.PRICING_SIMULATION_MAX_DAYS} days."
+            )
+
+        change_count = len(data['add']) + len(data['update']) + len(data['delete'])
+        if not change_count:
+            raise serializers.ValidationError("At least one pricing rule change is required.")
+
+        if change_count > settings.PRICING_SIMULATION_MAX_CHANGES:
+            raise serializers.ValidationError(
+                f"A simulation cannot have more than {settings.PRICING_SIMULATION_MAX_CHANGES} changes."
+            )
+
+        try:
+            updated_ids = [int(entry['id']) for entry in data['update']]
+        except (KeyError, TypeError, ValueError):
+            raise serializers.ValidationError({'update': "Each edit needs the id of its rule."})
+
+        rule_ids = updated_ids + data['delete']
+        if len(set(rule_ids)) != len(rule_ids):
+            raise serializers.ValidationError("A rule can only be edited or deleted once.")
+
+        rules = {
+            rule.pk: rule
+            for rule in fan_out(PricingRule.objects.filter(pk__in=rule_ids).select_related('property').order_by('pk'))
+        }
+        missing = sorted(set(rule_ids) - set(rules))
+        if missing:
+            raise serializers.ValidationError(f"Unknown pricing rules: {', '.join(map(str, missing))}.")
+
+        added, errors = [], {}
+        for position, entry in enumerate(data['add']):
+            serializer = PricingRuleSerializer(data=entry)
+            if serializer.is_valid():
+                added.append(PricingRule(**serializer.validated_data))
+            else:
+                errors[position] = serializer.errors
+        if errors:
+            raise serializers.ValidationError({'add': errors})
+
+        updated = {}
+        for position, (rule_id, entry) in enumerate(zip(updated_ids, data['update'])):
+            rule = rules[rule_id]
+            serializer = PricingRuleSerializer(rule, data=entry, partial=True)
+            if not serializer.is_valid():
+                errors[position] = serializer.errors
+            elif serializer.validated_data.get('property', rule.property) != rule.property:
+                errors[position] = {'property': ["Edits cannot move a rule to another property."]}
+            else:
+                updated[rule_id] = edited_copy(rule, serializer.validated_data)
+        if errors:
+            raise serializers.ValidationError({'update': errors})
+
+        data['changes'] = RuleChanges(added, updated, {rule_id: rules[rule_id] for rule_id in data['delete']})
+        return data
+
+
+class BookingRollupSerializer(serializers.ModelSerializer):
+
+    average_nightly_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = BookingRollup
+        fields = ['property', 'month', 'revenue', 'nights', 'average_nightly_rate']
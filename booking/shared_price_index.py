@@ -0,0 +1,125 @@
+"""
+Price indexes shared by all the uWSGI workers of a host through memory-mapped files.
+
+Each property's index is a file in ``PRICE_INDEX_SHARED_DIR``: a fixed header,
+the min stay thresholds and the prefix sums as native int64 and float64 arrays.
+Workers map the file read-only and read the arrays in place, so the pages are
+held once in the page cache whatever the number of workers.
+
+The header carries the generation of the index: the property's pricing version,
+base price and first day. A worker that finds the file missing or out of date
+rebuilds it under an exclusive lock, so only one worker builds a given
+property, and swaps it in with an atomic rename. Workers that mapped the
+previous file keep reading it until they notice its generation is stale.
+
+Each mapped index keeps a file descriptor open, so ``PRICE_INDEX_MAX_PROPERTIES``
+must stay under the workers' open files limit.
+"""
+import fcntl
+import math
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from datetime import date
+from typing import Optional
+
+from django.conf import settings
+
+from booking.price_index import PriceIndexRegistry, PropertyPriceIndex, build_index
+from core.models import Property
+
+
+MAGIC = b'PIDX'
+FORMAT_VERSION = 1
+# magic, format version, pricing version, base price (NaN for none), first day ordinal, horizon, thresholds
+HEADER = struct.Struct('=4sIqdqII')
+
+
+def index_path(directory: str, property_id: int) -> str:
+    return os.path.join(directory, f'property_{property_id}.idx')
+
+
+def write_index(path: str, index: PropertyPriceIndex) -> None:
+    """
+    Write the index to a temporary file next to ``path`` and rename it over ``path``.
+    """
+    base_price = math.nan if index.base_price is None else index.base_price
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(HEADER.pack(
+                MAGIC, FORMAT_VERSION, index.pricing_version, base_price, index.start.toordinal(),
+                index.horizon_days, len(index.thresholds),
+            ))
+            array('q', index.thresholds).tofile(file)
+            for prefix in index.prefix_sums:
+                array('d', prefix).tofile(file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_index(path: str, property_id: int) -> Optional[PropertyPriceIndex]:
+    """
+    Map the index file at ``path`` and return an index reading its arrays in place, or None if there is none.
+    """
+    try:
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        # ValueError: the file is empty.
+        return None
+
+    magic, format_version, pricing_version, base_price, start, horizon_days, tiers = HEADER.unpack_from(mapped)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        return None
+    view = memoryview(mapped)
+    thresholds_end = HEADER.size + tiers * 8
+    sums = view[thresholds_end:].cast('d')
+    row = horizon_days + 1
+    index = PropertyPriceIndex(
+        property_id=property_id,
+        pricing_version=pricing_version,
+        base_price=None if math.isnan(base_price) else base_price,
+        start=date.fromordinal(start),
+        horizon_days=horizon_days,
+        thresholds=view[HEADER.size:thresholds_end].cast('q'),
+        prefix_sums=[sums[tier * row:(tier + 1) * row] for tier in range(tiers + 1)],
+    )
+    # Keeps the mapping alive as long as the index.
+    index.mapped = mapped
+    return index
+
+
+class SharedPriceIndexRegistry(PriceIndexRegistry):
+    """
+    Price indexes read from files shared by the workers, each built by a single worker.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def published(self, property_obj: Property, today: date) -> Optional[PropertyPriceIndex]:
+        index = read_index(index_path(self.directory, property_obj.pk), property_obj.pk)
+        return index if index is not None and index.is_current(property_obj, today) else None
+
+    def load(self, property_obj: Property, today: date, pricer) -> PropertyPriceIndex:
+        path = index_path(self.directory, property_obj.pk)
+        with open(f'{path}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another worker may have published it while this one waited for the lock.
+            index = read_index(path, property_obj.pk)
+            if index is not None and index.is_current(property_obj, today):
+                return index
+            built = build_index(property_obj, today, settings.PRICE_INDEX_HORIZON_DAYS, pricer)
+            write_index(path, built)
+
+        index = read_index(path, property_obj.pk)
+        # A worker holding a newer version of the property may have replaced the file meanwhile.
+        return index if index is not None and index.is_current(property_obj, today) else built
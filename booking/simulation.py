@@ -0,0 +1,162 @@
+"""
+What-if pricing: reprice existing bookings under proposed pricing rule changes, without writing anything.
+
+A proposal adds, edits and deletes pricing rules of one or more properties.
+For each property it touches, the rules are loaded once, the proposal is
+applied to in-memory copies of them, and two price indexes (see
+``booking.price_index``) are computed over the nights of the bookings that
+start in the window: one from the current rules and one from the proposed
+ones. Each booking is then priced with two lookups per index instead of night
+by night, so the cost grows with the nights of the window rather than with
+the number of bookings.
+
+Bookings are compared with their price under the current rules rather than
+with their stored ``final_price``, which may come from rules changed since.
+"""
+import copy
+import math
+from datetime import date
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from rest_framework import serializers
+
+from booking.price_index import PropertyPriceIndex, load_rules
+from core.models import Booking, PricingRule, Property
+
+
+# Dates of the results are formatted as in the API.
+format_date = serializers.DateField().to_representation
+
+
+class RuleChanges(NamedTuple):
+    """
+    Proposed pricing rules: unsaved new rules, edited copies of existing rules by id, and deleted rules by id.
+    """
+    added: List[PricingRule]
+    updated: Dict[int, PricingRule]
+    deleted: Dict[int, PricingRule]
+
+    def properties(self) -> List[Property]:
+        """
+        Return the properties whose rules change, in id order.
+        """
+        rules = [*self.added, *self.updated.values(), *self.deleted.values()]
+        return sorted({rule.property_id: rule.property for rule in rules}.values(), key=lambda obj: obj.pk)
+
+    def apply(self, property_obj: Property, rules: List[PricingRule]) -> List[PricingRule]:
+        """
+        Return the rules of the property once the changes are made.
+        """
+        proposed = [self.updated.get(rule.pk, rule) for rule in rules if rule.pk not in self.deleted]
+        loaded = {rule.pk for rule in rules}
+        # Edited rules that ``load_rules`` left out because they could not apply to the window before the edit.
+        proposed += [
+            rule for pk, rule in self.updated.items() if rule.property_id == property_obj.pk and pk not in loaded
+        ]
+        return proposed + [rule for rule in self.added if rule.property_id == property_obj.pk]
+
+
+class BookingDelta(NamedTuple):
+    id: int
+    property: int
+    date_start: date
+    date_end: date
+    final_price: Optional[float]
+    current_price: Optional[float]
+    simulated_price: Optional[float]
+
+    @property
+    def delta(self) -> Optional[float]:
+        if self.current_price is None or self.simulated_price is None:
+            return None
+        return self.simulated_price - self.current_price
+
+    @property
+    def changed(self) -> bool:
+        if self.delta is None:
+            return self.current_price != self.simulated_price
+        return not math.isclose(self.current_price, self.simulated_price, abs_tol=1e-6)
+
+
+def edited_copy(rule: PricingRule, values: dict) -> PricingRule:
+    """
+    Return a copy of the rule with ``values`` set, leaving the rule itself untouched.
+    """
+    edited = copy.copy(rule)
+    for name, value in values.items():
+        setattr(edited, name, value)
+    return edited
+
+
+def reprice_property(property_obj: Property, changes: RuleChanges, date_start: date, date_end: date,
+                     pricer) -> Iterator[BookingDelta]:
+    """
+    Price the bookings of the property starting between ``date_start`` and ``date_end`` with the current and
+    the proposed rules.
+
+    ``pricer`` provides the rule evaluation of ``BookingViewSet``.
+    """
+    bookings = list(
+        Booking.objects.filter(property=property_obj, date_start__range=(date_start, date_end))
+        .order_by('date_start', 'id')
+        .values_list('id', 'date_start', 'date_end', 'final_price')
+    )
+    if not bookings:
+        return
+    first = bookings[0][1]
+    last = max(booking[2] for booking in bookings)
+    horizon_days = (last - first).days + 1
+
+    rules = load_rules(property_obj, first, last)
+    current = PropertyPriceIndex.compute(property_obj, rules, first, horizon_days, pricer)
+    proposed = PropertyPriceIndex.compute(property_obj, changes.apply(property_obj, rules), first, horizon_days, pricer)
+    for booking_id, stay_start, stay_end, final_price in bookings:
+        yield BookingDelta(
+            booking_id, property_obj.pk, stay_start, stay_end, final_price,
+            current.total(stay_start, stay_end), proposed.total(stay_start, stay_end),
+        )
+
+
+def simulate(changes: RuleChanges, date_start: date, date_end: date, pricer) -> dict:
+    """
+    Return the revenue of the bookings of the changed properties starting in the window, under the current and
+    the proposed rules, per property and overall, with the bookings whose price changes.
+
+    Bookings that cannot be priced (no base price and no fixed price for a night) are counted apart.
+    """
+    def totals() -> dict:
+        return {'booking_count': 0, 'changed_count': 0, 'unpriced_count': 0,
+                'current_revenue': 0.0, 'simulated_revenue': 0.0, 'revenue_delta': 0.0}
+
+    def add(summary: dict, booking: BookingDelta) -> None:
+        summary['booking_count'] += 1
+        summary['changed_count'] += booking.changed
+        if booking.delta is None:
+            summary['unpriced_count'] += 1
+            return
+        summary['current_revenue'] += booking.current_price
+        summary['simulated_revenue'] += booking.simulated_price
+        summary['revenue_delta'] += booking.delta
+
+    result = {
+        'date_start': format_date(date_start), 'date_end': format_date(date_end),
+        **totals(), 'properties': [], 'bookings': [],
+    }
+    for property_obj in changes.properties():
+        property_totals = {'property': property_obj.pk, **totals()}
+        for booking in reprice_property(property_obj, changes, date_start, date_end, pricer):
+            add(property_totals, booking)
+            add(result, booking)
+            if booking.changed:
+                result['bookings'].append({
+                    'id': booking.id,
+                    'property': booking.property,
+                    'date_start': format_date(booking.date_start),
+                    'date_end': format_date(booking.date_end),
+                    'final_price': booking.final_price,
+                    'current_price': booking.current_price,
+                    'simulated_price': booking.simulated_price,
+                    'delta': booking.delta,
+                })
+        result['properties'].append(property_totals)
+    return result
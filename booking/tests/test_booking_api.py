@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from freezegun import freeze_time
 
 
@@ -8,7 +8,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Booking, PricingRule, Property
+from core.models import Booking, IdempotencyKey, PricingRule, Property
 from booking.serializers import BookingSerializer
 
 
@@ -326,6 +326,60 @@ class PublicBookingApiTests(TestCase):
         self.assertEqual(booking.property, property_obj)
         self.assertEqual(booking.final_price, 80)
 
+    @freeze_time("2024-01-01")
+    def test_create_booking_with_date_range_rule(self):
+        property_obj = create_property()
+        create_pricing_rule(
+            property_obj, price_modifier=None, min_stay_length=None, fixed_price=20,
+            date_start=datetime(2024, 1, 3).date(), date_end=datetime(2024, 1, 4).date()
+        )
+        res = self.create_booking(property=property_obj, date_start='01-01-2024', date_end='01-05-2024')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Booking.objects.get(id=res.data['id']).final_price, 70)
+
+    @freeze_time("2024-01-01")
+    def test_create_booking_with_weekdays_rule(self):
+        property_obj = create_property()
+        # Saturdays and Sundays
+        create_pricing_rule(property_obj, price_modifier=50, min_stay_length=None, weekdays=0b1100000)
+        res = self.create_booking(property=property_obj, date_start='01-05-2024', date_end='01-08-2024')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Booking.objects.get(id=res.data['id']).final_price, 50)
+
+    @freeze_time("2024-01-01")
+    def test_create_booking_seasonal_rule_min_stay_length(self):
+        """
+        Test the min stay length of a seasonal rule is required on top of its season
+        """
+        property_obj = create_property()
+        create_pricing_rule(
+            property_obj, price_modifier=None, min_stay_length=5, fixed_price=5,
+            date_start=datetime(2024, 1, 1).date(), date_end=datetime(2024, 1, 10).date()
+        )
+        res = self.create_booking(property=property_obj, date_start='01-02-2024', date_end='01-04-2024')
+        self.assertEqual(Booking.objects.get(id=res.data['id']).final_price, 30)
+        res = self.create_booking(property=property_obj, date_start='01-02-2024', date_end='01-06-2024')
+        self.assertEqual(Booking.objects.get(id=res.data['id']).final_price, 25)
+
+    @freeze_time("2024-01-01")
+    def test_create_booking_rule_specificity(self):
+        """
+        Test a specific day beats a date range, which beats weekdays, which beat stay length rules
+        """
+        property_obj = create_property()
+        create_pricing_rule(property_obj, price_modifier=None, min_stay_length=1, fixed_price=12)
+        create_pricing_rule(property_obj, price_modifier=None, min_stay_length=None, fixed_price=25,
+                            weekdays=0b1100000)
+        create_pricing_rule(
+            property_obj, price_modifier=None, min_stay_length=None, fixed_price=20,
+            date_start=datetime(2024, 1, 5).date(), date_end=datetime(2024, 1, 7).date()
+        )
+        create_pricing_rule(property_obj, price_modifier=None, min_stay_length=None, fixed_price=30,
+                            specific_day=datetime(2024, 1, 6).date())
+        res = self.create_booking(property=property_obj, date_start='01-05-2024', date_end='01-08-2024')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Booking.objects.get(id=res.data['id']).final_price, 20 + 30 + 20 + 12)
+
     @freeze_time("2024-01-01")
     def test_retrieve_bookings(self):
         property_1 = create_property(name='Test House 1')
@@ -395,3 +449,182 @@ class PublicBookingApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Booking.objects.filter(id=booking.id).exists())
+
+    @freeze_time("2024-01-01")
+    def test_filter_bookings_overlapping_dates(self):
+        property_obj = create_property()
+        bookings = [
+            Booking(property=property_obj, date_start='2024-02-25', date_end='2024-03-01', final_price=60),
+            Booking(property=property_obj, date_start='2024-03-10', date_end='2024-03-12', final_price=30),
+            Booking(property=property_obj, date_start='2024-03-31', date_end='2024-04-05', final_price=60),
+            Booking(property=property_obj, date_start='2024-02-01', date_end='2024-02-28', final_price=280),
+            Booking(property=property_obj, date_start='2024-04-01', date_end='2024-04-03', final_price=30),
+        ]
+        Booking.objects.bulk_create(bookings)
+
+        res = self.client.get(BOOKINGS_URL, {'overlaps': '03-01-2024,03-31-2024'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(item['date_start'] for item in res.data),
+            ['02-25-2024', '03-10-2024', '03-31-2024']
+        )
+
+    @freeze_time("2024-01-01")
+    def test_filter_bookings_overlapping_dates_requires_two_dates(self):
+        res = self.client.get(BOOKINGS_URL, {'overlaps': '03-01-2024'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @freeze_time("2024-01-01")
+    def test_filter_bookings_containing_date(self):
+        property_obj = create_property()
+        bookings = [
+            Booking(property=property_obj, date_start='2024-03-01', date_end='2024-03-05', final_price=50),
+            Booking(property=property_obj, date_start='2024-03-05', date_end='2024-03-05', final_price=10),
+            Booking(property=property_obj, date_start='2024-03-06', date_end='2024-03-08', final_price=30),
+        ]
+        Booking.objects.bulk_create(bookings)
+
+        res = self.client.get(BOOKINGS_URL, {'contains_date': '03-05-2024'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(item['date_start'] for item in res.data),
+            ['03-01-2024', '03-05-2024']
+        )
+
+    @freeze_time("2024-01-01")
+    def test_filter_bookings_by_date_start(self):
+        property_obj = create_property()
+        Booking.objects.create(property=property_obj, date_start='2024-03-01', date_end='2024-03-05')
+        Booking.objects.create(property=property_obj, date_start='2024-04-01', date_end='2024-04-05')
+
+        res = self.client.get(BOOKINGS_URL, {'date_start__gte': '03-15-2024'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['date_start'] for item in res.data], ['04-01-2024'])
+
+
+class BookingWriteQueryCountTests(TestCase):
+    """
+    Each write loads the property and its rules once and issues a single INSERT/UPDATE.
+    The atomic block adds a SAVEPOINT and RELEASE SAVEPOINT inside the test transaction.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.property = create_property()
+        create_pricing_rule(property=self.property)
+        self.booking = Booking.objects.create(
+            property=self.property,
+            date_start='2024-01-01',
+            date_end='2024-01-10',
+            final_price=90
+        )
+
+    @freeze_time("2024-01-01")
+    def test_create_booking_queries(self):
+        payload = {'property': self.property.id, 'date_start': '01-01-2024', 'date_end': '01-10-2024'}
+        # Throttle bucket, property, rules, INSERT, rollup upsert
+        with self.assertNumQueries(7):
+            res = self.client.post(BOOKINGS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Booking.objects.get(id=res.data['id']).final_price, 90)
+
+    @freeze_time("2024-01-01")
+    def test_update_booking_queries(self):
+        payload = {'property': self.property.id, 'date_start': '01-01-2024', 'date_end': '01-12-2024'}
+        # Throttle bucket, booking with its property, rules, UPDATE, rollup upsert
+        with self.assertNumQueries(7):
+            res = self.client.put(detail_url(self.booking.id), payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.final_price, 108)
+
+    @freeze_time("2024-01-01")
+    def test_update_moves_booking_to_another_property(self):
+        other = create_property(name='Flat', base_price=20)
+        payload = {'property': other.id, 'date_start': '01-01-2024', 'date_end': '01-02-2024'}
+        res = self.client.put(detail_url(self.booking.id), payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['final_price'], 40)
+
+        res = self.client.put(detail_url(self.booking.id), dict(payload, property=other.id + 100))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('property', res.data)
+
+    @freeze_time("2024-01-01")
+    def test_partial_update_booking_queries(self):
+        # Throttle bucket, booking with its property, rules, UPDATE, rollup upsert
+        with self.assertNumQueries(7):
+            res = self.client.patch(detail_url(self.booking.id), {'date_end': '01-05-2024'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['final_price'], 50)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.final_price, 50)
+
+
+class IdempotentBookingCreateTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.property = create_property()
+        self.payload = {'property': self.property.id, 'date_start': '01-01-2024', 'date_end': '01-10-2024'}
+
+    def create_booking(self, payload, key='retry-key-1'):
+        return self.client.post(BOOKINGS_URL, payload, HTTP_IDEMPOTENCY_KEY=key)
+
+    @freeze_time("2024-01-01")
+    def test_retry_replays_stored_response(self):
+        first = self.create_booking(self.payload)
+        # Throttle bucket, stored response
+        with self.assertNumQueries(2):
+            retry = self.create_booking(self.payload)
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+
+    @freeze_time("2024-01-01")
+    def test_key_reused_for_different_request(self):
+        self.create_booking(self.payload)
+        res = self.create_booking(dict(self.payload, date_end='01-05-2024'))
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    @freeze_time("2024-01-01")
+    def test_failed_request_is_not_stored(self):
+        res = self.create_booking(dict(self.payload, date_start='01-12-2024'))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        res = self.create_booking(self.payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    @freeze_time("2024-01-01")
+    def test_keys_are_scoped_to_the_client(self):
+        first = self.client.post(BOOKINGS_URL, self.payload, HTTP_IDEMPOTENCY_KEY='shared-key',
+                                 HTTP_X_FORWARDED_FOR='10.0.0.1')
+        other = self.client.post(BOOKINGS_URL, dict(self.payload, date_start='01-11-2024', date_end='01-12-2024'),
+                                 HTTP_IDEMPOTENCY_KEY='shared-key', HTTP_X_FORWARDED_FOR='10.0.0.2')
+
+        self.assertEqual(other.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', other)
+        self.assertNotEqual(other.data['id'], first.data['id'])
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.filter(key='shared-key').count(), 2)
+
+    def test_expired_key_is_processed_again(self):
+        with freeze_time("2024-01-01"):
+            self.create_booking(self.payload)
+        with freeze_time(datetime(2024, 1, 1) + timedelta(days=2)):
+            res = self.create_booking(dict(self.payload, date_start='01-03-2024'))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    @freeze_time("2024-01-01")
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.client.post(BOOKINGS_URL, self.payload)
+        self.client.post(BOOKINGS_URL, self.payload)
+        self.assertEqual(Booking.objects.count(), 2)
@@ -0,0 +1,100 @@
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from booking.quotes import quote_stats
+from core.models import PricingRule, Property
+
+
+BOOKINGS_URL = reverse('booking:booking-list')
+PRICING_RULES_URL = reverse('booking:pricingrule-list')
+
+
+@freeze_time("2024-01-01")
+class BookingQuoteCacheTests(TestCase):
+
+    def setUp(self):
+        caches['quotes'].clear()
+        self.client = APIClient()
+        self.property = Property.objects.create(name='House', base_price=10)
+        self.rule = PricingRule.objects.create(property=self.property, price_modifier=-10, min_stay_length=3)
+
+    def book(self):
+        payload = {'property': self.property.id, 'date_start': '01-02-2024', 'date_end': '01-05-2024'}
+        res = self.client.post(BOOKINGS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res
+
+    def test_repeated_stay_is_served_from_cache(self):
+        hits = quote_stats.hits
+        res = self.book()
+        self.assertEqual(res['X-Quote-Cache'], 'MISS')
+        self.assertEqual(res.data['final_price'], 36)
+
+        # No pricing rule query on a hit.
+        with self.assertNumQueries(6):
+            res = self.book()
+        self.assertEqual(res['X-Quote-Cache'], 'HIT')
+        self.assertEqual(res.data['final_price'], 36)
+        self.assertEqual(quote_stats.hits, hits + 1)
+
+    def test_rule_change_reprices(self):
+        self.book()
+        res = self.client.patch(
+            reverse('booking:pricingrule-detail', args=[self.rule.id]), {'price_modifier': -20}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.book()
+        self.assertEqual(res['X-Quote-Cache'], 'MISS')
+        self.assertEqual(res.data['final_price'], 32)
+
+    def test_new_rule_reprices(self):
+        self.book()
+        self.client.post(
+            PRICING_RULES_URL, {'property': self.property.id, 'fixed_price': 5, 'specific_day': '01-03-2024'}
+        )
+        self.assertEqual(self.book().data['final_price'], 9 + 5 + 9 + 9)
+
+    def test_bulk_delete_reprices(self):
+        self.book()
+        self.client.delete(f"{reverse('booking:pricingrule-bulk')}?property={self.property.id}")
+        self.assertEqual(self.book().data['final_price'], 40)
+
+    def test_calendar_upload_reprices(self):
+        self.book()
+        self.client.post(
+            reverse('booking:pricingrule-calendar'),
+            {'property': self.property.id, 'entries': [{'specific_day': '01-02-2024', 'fixed_price': 1}]},
+            format='json',
+        )
+        self.assertEqual(self.book().data['final_price'], 1 + 9 * 3)
+
+    def test_base_price_change_reprices(self):
+        self.book()
+        self.client.patch(reverse('booking:property-detail', args=[self.property.id]), {'base_price': 20})
+        self.assertEqual(self.book().data['final_price'], 72)
+
+    def test_saving_stale_property_keeps_new_version(self):
+        stale = Property.objects.get(pk=self.property.pk)
+        self.client.delete(reverse('booking:pricingrule-detail', args=[self.rule.id]))
+        stale.name = 'Renamed'
+        stale.save()
+
+        self.property.refresh_from_db()
+        self.assertNotEqual(self.property.pricing_version, stale.pricing_version)
+        self.assertEqual(self.book().data['final_price'], 40)
+
+    def test_other_properties_keep_their_quotes(self):
+        other = Property.objects.create(name='Flat', base_price=10)
+        version = other.pricing_version
+        self.client.delete(reverse('booking:pricingrule-detail', args=[self.rule.id]))
+        other.refresh_from_db()
+        self.assertEqual(other.pricing_version, version)
+
+    def test_quote_stats_hit_rate(self):
+        self.book()
+        self.book()
+        self.assertGreater(quote_stats.hit_rate, 0)
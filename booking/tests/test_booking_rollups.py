@@ -0,0 +1,172 @@
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from freezegun import freeze_time
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from booking.rollups import month_nights, rebuild_rollups
+from booking.views import BookingViewSet
+from core.models import Booking, BookingRollup, PricingRule, Property
+
+
+BOOKINGS_URL = reverse('booking:booking-list')
+ANALYTICS_URL = reverse('booking:bookingrollup-list')
+
+
+def detail_url(booking_id):
+    return reverse('booking:booking-detail', args=[booking_id])
+
+
+def aggregate_nights(bookings):
+    """
+    Aggregate revenue and nights per property and month from the raw bookings, night by night.
+    """
+    totals = defaultdict(lambda: [0.0, 0])
+    for booking in bookings:
+        stay_length = (booking.date_end - booking.date_start).days + 1
+        for offset in range(stay_length):
+            night = booking.date_start + timedelta(days=offset)
+            row = totals[(booking.property_id, night.replace(day=1))]
+            row[0] += booking.final_price / stay_length
+            row[1] += 1
+    return totals
+
+
+class MonthNightsTests(SimpleTestCase):
+
+    def test_stay_within_a_month(self):
+        self.assertEqual(month_nights(date(2024, 1, 3), date(2024, 1, 5)), {date(2024, 1, 1): 3})
+
+    def test_stay_across_months(self):
+        self.assertEqual(
+            month_nights(date(2024, 1, 30), date(2024, 3, 1)),
+            {date(2024, 1, 1): 2, date(2024, 2, 1): 29, date(2024, 3, 1): 1}
+        )
+
+
+@freeze_time("2024-01-01")
+class BookingRollupTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.properties = [Property.objects.create(name=f'Property {i}', base_price=10 * (i + 1)) for i in range(3)]
+        PricingRule.objects.create(property=self.properties[0], min_stay_length=7, price_modifier=-10)
+        PricingRule.objects.create(property=self.properties[1], specific_day=date(2024, 2, 1), fixed_price=99)
+
+    def assert_rollups_match_bookings(self):
+        expected = {
+            key: (round(revenue, 6), nights)
+            for key, (revenue, nights) in aggregate_nights(Booking.objects.all()).items()
+        }
+        actual = {
+            (rollup.property_id, rollup.month): (round(rollup.revenue, 6), rollup.nights)
+            for rollup in BookingRollup.objects.filter(nights__gt=0)
+        }
+        self.assertEqual(actual, expected)
+
+    def random_stay(self, rng):
+        date_start = date(2024, 1, 1) + timedelta(days=rng.randint(0, 120))
+        return {
+            'property': rng.choice(self.properties).id,
+            'date_start': date_start.strftime('%m-%d-%Y'),
+            'date_end': (date_start + timedelta(days=rng.randint(0, 45))).strftime('%m-%d-%Y'),
+        }
+
+    def test_rollups_follow_api_writes(self):
+        rng = random.Random(7)
+        booking_ids = []
+        for _ in range(40):
+            operation = rng.choice(['create', 'create', 'update', 'patch', 'delete'])
+            if operation == 'create' or not booking_ids:
+                res = self.client.post(BOOKINGS_URL, self.random_stay(rng))
+                self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+                booking_ids.append(res.data['id'])
+            elif operation == 'update':
+                res = self.client.put(detail_url(rng.choice(booking_ids)), self.random_stay(rng))
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+            elif operation == 'patch':
+                booking = Booking.objects.get(id=rng.choice(booking_ids))
+                date_end = booking.date_end + timedelta(days=rng.randint(0, 20))
+                res = self.client.patch(detail_url(booking.id), {'date_end': date_end.strftime('%m-%d-%Y')})
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+            else:
+                booking_id = booking_ids.pop(rng.randrange(len(booking_ids)))
+                res = self.client.delete(detail_url(booking_id))
+                self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assert_rollups_match_bookings()
+
+    def test_rebuild_matches_bookings(self):
+        Booking.objects.create(
+            property=self.properties[0], date_start=date(2024, 1, 25), date_end=date(2024, 2, 10), final_price=170
+        )
+        Booking.objects.create(
+            property=self.properties[2], date_start=date(2024, 3, 1), date_end=date(2024, 3, 2), final_price=60
+        )
+        self.assertEqual(rebuild_rollups(), 3)
+        self.assert_rollups_match_bookings()
+
+    def test_analytics_reads_only_rollups(self):
+        self.client.post(BOOKINGS_URL, {
+            'property': self.properties[2].id, 'date_start': '01-30-2024', 'date_end': '02-02-2024'
+        })
+        with self.assertNumQueries(1):
+            res = self.client.get(ANALYTICS_URL, {'month__gte': '02-01-2024'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{
+            'property': self.properties[2].id,
+            'month': '02-01-2024',
+            'revenue': 60.0,
+            'nights': 2,
+            'average_nightly_rate': 30.0,
+        }])
+
+    def test_deleted_property_removes_rollups(self):
+        res = self.client.post(BOOKINGS_URL, {
+            'property': self.properties[0].id, 'date_start': '01-01-2024', 'date_end': '01-02-2024'
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.properties[0].delete()
+        self.assertFalse(BookingRollup.objects.exists())
+
+
+@freeze_time("2024-01-01")
+class BookingRowLockTests(TransactionTestCase):
+    """
+    The booking is read under a row lock, in the transaction that writes it and its rollups.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.property = Property.objects.create(name='House', base_price=10)
+        self.booking = Booking.objects.create(
+            property=self.property, date_start=date(2024, 1, 2), date_end=date(2024, 1, 3), final_price=20,
+        )
+
+    def test_writes_lock_the_booking_they_read(self):
+        reads = []
+        get_object = BookingViewSet.get_object
+
+        def locked_get_object(view):
+            reads.append((view.get_queryset().query.select_for_update, transaction.get_connection().in_atomic_block))
+            return get_object(view)
+
+        payload = {'property': self.property.id, 'date_start': '01-02-2024', 'date_end': '01-04-2024'}
+        with mock.patch.object(BookingViewSet, 'get_object', locked_get_object):
+            self.assertEqual(self.client.put(detail_url(self.booking.id), payload).status_code, status.HTTP_200_OK)
+            res = self.client.patch(detail_url(self.booking.id), {'date_end': '01-05-2024'})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            res = self.client.delete(detail_url(self.booking.id))
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(reads, [(True, True)] * 3)
+        self.assertFalse(BookingRollup.objects.filter(nights__gt=0).exists())
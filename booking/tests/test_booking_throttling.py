@@ -0,0 +1,120 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from freezegun import freeze_time
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from booking.throttling import BookingThrottle
+from core.models import Booking, Property, ThrottleBucket
+
+
+BOOKINGS_URL = reverse('booking:booking-list')
+
+
+@override_settings(
+    BOOKING_THROTTLE_CAPACITY=10,
+    BOOKING_THROTTLE_REFILL_RATE=1,
+    BOOKING_THROTTLE_NIGHTS_PER_TOKEN=30,
+    BOOKING_MAX_STAY_LENGTH=365,
+)
+@freeze_time("2024-01-01")
+class BookingAdmissionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.now = 1_700_000_000.0
+        timer = mock.patch.object(BookingThrottle, 'timer', side_effect=lambda: self.now)
+        timer.start()
+        self.addCleanup(timer.stop)
+        self.client = APIClient()
+        self.property = Property.objects.create(name='Big house', base_price=10)
+
+    def create_booking(self, date_end, client_ip='10.0.0.1'):
+        payload = {'property': self.property.id, 'date_start': '01-01-2024', 'date_end': date_end}
+        return self.client.post(BOOKINGS_URL, payload, HTTP_X_FORWARDED_FOR=client_ip)
+
+    def test_stay_longer_than_maximum_rejected_before_pricing(self):
+        with mock.patch('booking.views.BookingViewSet._get_final_price') as get_final_price:
+            res = self.create_booking('01-01-2025')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        get_final_price.assert_not_called()
+        self.assertFalse(Booking.objects.exists())
+
+    def test_long_stays_spend_more_tokens(self):
+        for _ in range(8):
+            self.assertEqual(self.create_booking('01-01-2024').status_code, status.HTTP_201_CREATED)
+
+        # 60 nights cost 1 + 60 // 30 = 3 tokens, one more than is left.
+        res = self.create_booking('02-29-2024')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '1')
+
+        self.assertEqual(self.create_booking('01-01-2024').status_code, status.HTTP_201_CREATED)
+
+    def test_bucket_refills_over_time(self):
+        for _ in range(10):
+            self.assertEqual(self.create_booking('01-02-2024').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.create_booking('01-02-2024').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.now += 3
+        self.assertEqual(self.create_booking('01-02-2024').status_code, status.HTTP_201_CREATED)
+
+    def test_clients_have_separate_buckets(self):
+        for _ in range(10):
+            self.create_booking('01-02-2024', client_ip='10.0.0.1')
+        self.assertEqual(
+            self.create_booking('01-02-2024', client_ip='10.0.0.1').status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(
+            self.create_booking('01-02-2024', client_ip='10.0.0.2').status_code,
+            status.HTTP_201_CREATED
+        )
+
+    def test_purge_deletes_buckets_full_again(self):
+        now = time.time()
+        ThrottleBucket.objects.create(ident='10.0.0.1', tokens=0, updated_at=now - 11)
+        ThrottleBucket.objects.create(ident='10.0.0.2', tokens=0, updated_at=now - 9)
+        call_command('purge_throttle_buckets', stdout=StringIO())
+        self.assertEqual(list(ThrottleBucket.objects.values_list('ident', flat=True)), ['10.0.0.2'])
+
+
+@override_settings(BOOKING_THROTTLE_CAPACITY=10, BOOKING_THROTTLE_REFILL_RATE=0.001)
+class BookingThrottleConcurrencyTests(TransactionTestCase):
+
+    def test_overlapping_requests_do_not_overspend(self):
+        request = RequestFactory().get(BOOKINGS_URL, HTTP_X_FORWARDED_FOR='10.0.0.1')
+        start = threading.Barrier(20)
+        allowed = []
+
+        def send():
+            throttle = BookingThrottle()
+            start.wait()
+            try:
+                allowed.append(throttle.allow_request(request, None))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 10)
+        self.assertLess(ThrottleBucket.objects.get(ident='10.0.0.1').tokens, 1)
+
+    def test_tokens_are_spent_in_one_statement(self):
+        request = RequestFactory().get(BOOKINGS_URL, HTTP_X_FORWARDED_FOR='10.0.0.1')
+        for _ in range(3):
+            with self.assertNumQueries(1):
+                self.assertTrue(BookingThrottle().allow_request(request, None))
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Property
+
+
+PROPERTIES_URL = reverse('booking:property-list')
+PRICING_RULES_URL = reverse('booking:pricingrule-list')
+BOOKINGS_URL = reverse('booking:booking-list')
+
+
+@override_settings(API_CACHE_MAX_AGE=2)
+class CatalogCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.property = Property.objects.create(name='Big house', base_price=10)
+
+    def test_reads_are_publicly_cacheable(self):
+        for url in (PROPERTIES_URL, reverse('booking:property-detail', args=[self.property.id]), PRICING_RULES_URL):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res['Cache-Control'], 'public, max-age=2')
+            self.assertIn('Accept', res['Vary'])
+            self.assertTrue(res['ETag'])
+
+    def test_other_endpoints_are_not_cached(self):
+        res = self.client.get(BOOKINGS_URL)
+        self.assertNotIn('Cache-Control', res)
+        res = self.client.get(
+            reverse('booking:property-search'), {'date_start': '01-01-2030', 'date_end': '01-02-2030'}
+        )
+        self.assertNotIn('Cache-Control', res)
+
+    def test_revalidation_without_database_queries(self):
+        etag = self.client.get(PROPERTIES_URL)['ETag']
+        with self.assertNumQueries(0):
+            res = self.client.get(PROPERTIES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_etag_depends_on_query(self):
+        self.assertNotEqual(
+            self.client.get(PROPERTIES_URL)['ETag'],
+            self.client.get(PROPERTIES_URL, {'name': 'house'})['ETag']
+        )
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(PROPERTIES_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(PRICING_RULES_URL, {'property': self.property.id, 'min_stay_length': 7})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(PROPERTIES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_failed_writes_keep_the_etag(self):
+        etag = self.client.get(PROPERTIES_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(PROPERTIES_URL, {'name': 'Bad', 'base_price': -1})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(PROPERTIES_URL)['ETag'], etag)
+
+    def test_admin_property_edit_changes_the_etag(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        etag = self.client.get(PROPERTIES_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                reverse('admin:core_property_change', args=[self.property.id]),
+                {'name': 'Bigger house', 'base_price': 12},
+            )
+        self.assertEqual(res.status_code, status.HTTP_302_FOUND)
+
+        res = self.client.get(PROPERTIES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['name'], 'Bigger house')
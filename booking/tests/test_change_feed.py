@@ -0,0 +1,146 @@
+from datetime import date, timedelta
+from io import StringIO
+from urllib.parse import urlencode
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from freezegun import freeze_time
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from booking.changes import decode_cursor, encode_cursor
+from booking.deletion import delete_property
+from core.models import Booking, PricingRule, Property, Tombstone
+
+
+def changes_url(name, **params):
+    return f'{reverse(f"booking:{name}-changes")}?{urlencode(params)}'
+
+
+class ChangeFeedApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.freezer = freeze_time('2024-01-01 12:00:00')
+        self.frozen = self.freezer.start()
+        self.addCleanup(self.freezer.stop)
+        self.property = Property.objects.create(name='House', base_price=10)
+        self.rules = [
+            PricingRule.objects.create(property=self.property, fixed_price=day, specific_day=date(2024, 6, day))
+            for day in range(1, 6)
+        ]
+        self.frozen.tick(timedelta(seconds=10))
+
+    def read_feed(self, name, cursor=None, limit=100):
+        """
+        Follow the feed until has_more is false and return the changes and the last cursor.
+        """
+        results = []
+        while True:
+            params = {'limit': limit}
+            if cursor is not None:
+                params['cursor'] = cursor
+            res = self.client.get(changes_url(name, **params))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            results += res.data['results']
+            cursor = res.data['next_cursor']
+            if not res.data['has_more']:
+                return results, cursor
+
+    def test_first_sync_lists_existing_rows(self):
+        results, _ = self.read_feed('pricingrule')
+        self.assertEqual([change['id'] for change in results], [rule.id for rule in self.rules])
+        self.assertFalse(any(change['deleted'] for change in results))
+        self.assertEqual(results[0]['data']['fixed_price'], 1)
+
+    def test_pages_with_equal_timestamps(self):
+        """
+        Test rows written in the same instant are split over pages without being skipped or repeated
+        """
+        results, _ = self.read_feed('pricingrule', limit=2)
+        self.assertEqual([change['id'] for change in results], [rule.id for rule in self.rules])
+
+    def test_next_sync_only_returns_changes(self):
+        _, cursor = self.read_feed('pricingrule')
+        self.frozen.tick(timedelta(seconds=10))
+        self.rules[3].fixed_price = 40
+        self.rules[3].save()
+        self.frozen.tick()
+        self.client.delete(reverse('booking:pricingrule-detail', args=[self.rules[1].id]))
+        self.frozen.tick()
+        added = PricingRule.objects.create(property=self.property, fixed_price=7)
+        self.frozen.tick(timedelta(seconds=10))
+
+        results, _ = self.read_feed('pricingrule', cursor)
+        self.assertEqual(
+            [(change['id'], change['deleted']) for change in results],
+            [(self.rules[3].id, False), (self.rules[1].id, True), (added.id, False)],
+        )
+        self.assertEqual(results[0]['data']['fixed_price'], 40)
+        self.assertIsNone(results[1]['data'])
+
+    def test_recent_changes_are_held_back(self):
+        _, cursor = self.read_feed('pricingrule')
+        PricingRule.objects.create(property=self.property, fixed_price=7)
+        results, next_cursor = self.read_feed('pricingrule', cursor)
+        self.assertEqual(results, [])
+
+        self.frozen.tick(timedelta(seconds=10))
+        results, _ = self.read_feed('pricingrule', next_cursor)
+        self.assertEqual(len(results), 1)
+
+    def test_idle_cursor_moves_forward(self):
+        _, cursor = self.read_feed('pricingrule')
+        self.frozen.tick(timedelta(days=20))
+        _, next_cursor = self.read_feed('pricingrule', cursor)
+        self.assertGreater(decode_cursor(next_cursor)[0], decode_cursor(cursor)[0])
+
+    def test_bulk_and_property_deletes_leave_tombstones(self):
+        _, cursor = self.read_feed('booking')
+        other = Property.objects.create(name='Flat', base_price=10)
+        other_id = other.id
+        booking = Booking.objects.create(property=other, date_start=date(2024, 6, 1), date_end=date(2024, 6, 2))
+        bulk_url = f'{reverse("booking:pricingrule-bulk")}?{urlencode({"specific_day__lte": "06-02-2024"})}'
+        self.client.delete(bulk_url)
+        delete_property(other)
+        self.frozen.tick(timedelta(seconds=10))
+
+        results, _ = self.read_feed('booking', cursor)
+        self.assertEqual([(change['id'], change['deleted']) for change in results], [(booking.id, True)])
+        results, _ = self.read_feed('pricingrule', cursor)
+        self.assertEqual(
+            {change['id'] for change in results if change['deleted']}, {self.rules[0].id, self.rules[1].id}
+        )
+        results, _ = self.read_feed('property', cursor)
+        self.assertEqual([(change['id'], change['deleted']) for change in results], [(other_id, True)])
+
+    def test_page_cost_does_not_depend_on_history(self):
+        _, cursor = self.read_feed('pricingrule')
+        with self.assertNumQueries(2):
+            res = self.client.get(changes_url('pricingrule', cursor=cursor))
+        self.assertEqual(res.data['results'], [])
+
+    def test_invalid_cursor(self):
+        for cursor in ('nope', encode_cursor((timezone.now().replace(tzinfo=None), 1))):
+            res = self.client.get(changes_url('property', cursor=cursor))
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('cursor', res.data)
+
+    def test_expired_cursor(self):
+        res = self.client.get(changes_url('property', cursor=encode_cursor((timezone.now() - timedelta(days=31), 1))))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cursor', res.data)
+
+    def test_limit_is_bounded(self):
+        res = self.client.get(changes_url('property', limit=100000))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('limit', res.data)
+
+    def test_purge_tombstones(self):
+        self.client.delete(reverse('booking:pricingrule-detail', args=[self.rules[0].id]))
+        self.frozen.tick(timedelta(days=31))
+        self.client.delete(reverse('booking:pricingrule-detail', args=[self.rules[1].id]))
+        call_command('purge_tombstones', stdout=StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [self.rules[1].id])
@@ -0,0 +1,37 @@
+import random
+from datetime import date
+
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+
+from booking.scenarios import SCENARIOS, VirtualUser, update_booking
+from core.models import PricingRule, Property
+
+
+class LoadScenarioTests(TestCase):
+    """
+    Test the load test scenarios send valid requests to the API
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        properties = [Property.objects.create(name=f'Property {i}', base_price=100) for i in range(3)]
+        PricingRule.objects.create(property=properties[0], min_stay_length=7, price_modifier=-10)
+        self.user = VirtualUser([p.id for p in properties], random.Random(0), today=date.today())
+
+    def test_every_scenario_succeeds(self):
+        for scenario in SCENARIOS:
+            for _ in range(5):
+                request = scenario.build(self.user)
+                send = getattr(self.client, request.method.lower())
+                res = send(request.path, request.payload, format='json')
+                self.assertLess(res.status_code, 300, f'{scenario.name}: {res.data}')
+                if request.method == 'POST':
+                    self.user.booking_ids.append(res.data['id'])
+
+    def test_update_booking_patches_own_booking(self):
+        self.user.booking_ids.append(42)
+        request = update_booking(self.user)
+        self.assertEqual(request.method, 'PATCH')
+        self.assertTrue(request.path.endswith('/42/'))
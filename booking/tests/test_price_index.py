@@ -0,0 +1,117 @@
+import random
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.signals import request_finished
+from django.test import TestCase, override_settings
+from freezegun import freeze_time
+
+from booking.price_index import PriceIndexRegistry, build_index
+from booking.quotes import bump_pricing_version
+from booking.views import BookingViewSet
+from core.models import Booking, PricingRule, Property
+
+
+TODAY = date(2024, 1, 1)
+
+
+def random_rule(rng, property_obj):
+    shape = rng.choice(['tier', 'day', 'day', 'season', 'weekdays'])
+    season_start = TODAY + timedelta(days=rng.randint(-10, 60))
+    return PricingRule(
+        property=property_obj,
+        price_modifier=rng.choice([None, -25, -10, 5, 30]),
+        fixed_price=rng.choice([None, None, 7, 45]),
+        min_stay_length=rng.choice([None, 2, 5, 14]) if shape != 'tier' else rng.choice([1, 3, 7, 30]),
+        specific_day=TODAY + timedelta(days=rng.randint(0, 70)) if shape == 'day' else None,
+        date_start=season_start if shape == 'season' else None,
+        date_end=season_start + timedelta(days=rng.randint(0, 20)) if shape == 'season' else None,
+        weekdays=rng.randint(1, 127) if shape == 'weekdays' or (shape == 'season' and rng.random() < 0.3) else None,
+    )
+
+
+@freeze_time("2024-01-01")
+class PriceIndexTests(TestCase):
+
+    def setUp(self):
+        self.view = BookingViewSet()
+
+    def test_index_totals_match_booking_final_price(self):
+        """
+        Test the index totals match BookingViewSet._get_final_price for random rules and stays
+        """
+        rng = random.Random(45)
+        for index in range(40):
+            property_obj = Property.objects.create(name=f'House {index}', base_price=rng.choice([10, 33.3, 80]))
+            PricingRule.objects.bulk_create(random_rule(rng, property_obj) for _ in range(rng.randint(0, 10)))
+            price_index = build_index(property_obj, TODAY, 90, self.view)
+
+            for _ in range(25):
+                date_start = TODAY + timedelta(days=rng.randint(0, 60))
+                date_end = date_start + timedelta(days=rng.randint(0, 29))
+                booking = Booking(property=property_obj, date_start=date_start, date_end=date_end)
+                self.assertAlmostEqual(
+                    price_index.total(date_start, date_end), self.view._get_final_price(booking), places=6
+                )
+
+    def test_stays_outside_horizon_are_not_indexed(self):
+        property_obj = Property.objects.create(name='House', base_price=10)
+        price_index = build_index(property_obj, TODAY, 30, self.view)
+        self.assertEqual(price_index.total(TODAY, TODAY + timedelta(days=29)), 300)
+        self.assertIsNone(price_index.total(TODAY, TODAY + timedelta(days=30)))
+        self.assertIsNone(price_index.total(TODAY - timedelta(days=1), TODAY))
+
+    def test_registry_prices_only_from_current_index(self):
+        registry = PriceIndexRegistry()
+        property_obj = Property.objects.create(name='House', base_price=10)
+        booking = Booking(property=property_obj, date_start=TODAY, date_end=TODAY + timedelta(days=1))
+        self.assertIsNone(registry.total(booking, self.view))
+        self.assertFalse(registry.indexes)
+
+        registry.get(property_obj, self.view)
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.total(booking, self.view), 20)
+
+        PricingRule.objects.create(property=property_obj, fixed_price=5, specific_day=TODAY)
+        bump_pricing_version([property_obj.pk])
+        property_obj.refresh_from_db()
+        self.assertIsNone(registry.total(booking, self.view))
+        self.assertEqual(registry.get(property_obj, self.view).total(TODAY, TODAY + timedelta(days=1)), 15)
+
+    @override_settings(PRICE_INDEX_HORIZON_DAYS=30)
+    def test_misses_request_the_index_once_they_pay_for_it(self):
+        registry = PriceIndexRegistry()
+        property_obj = Property.objects.create(name='House', base_price=10)
+        booking = Booking(property=property_obj, date_start=TODAY, date_end=TODAY + timedelta(days=9))
+        for _ in range(2):
+            self.assertIsNone(registry.total(booking, self.view))
+        self.assertFalse(registry.pending)
+
+        # A new generation of the property starts counting again.
+        bump_pricing_version([property_obj.pk])
+        property_obj.refresh_from_db()
+        for _ in range(3):
+            self.assertIsNone(registry.total(booking, self.view))
+        self.assertEqual(list(registry.pending), [property_obj.pk])
+
+        with mock.patch('booking.price_index.price_indexes', registry):
+            request_finished.send(sender=self.__class__)
+        self.assertFalse(registry.pending)
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.total(booking, self.view), 100)
+
+    def test_registry_rebuilds_when_day_rolls_over(self):
+        registry = PriceIndexRegistry()
+        property_obj = Property.objects.create(name='House', base_price=10)
+        first = registry.get(property_obj, self.view)
+        with freeze_time("2024-01-02"):
+            self.assertEqual(registry.get(property_obj, self.view).start, date(2024, 1, 2))
+        self.assertEqual(first.start, TODAY)
+
+    @override_settings(PRICE_INDEX_MAX_PROPERTIES=2)
+    def test_registry_keeps_most_recently_used(self):
+        registry = PriceIndexRegistry()
+        properties = [Property.objects.create(name=f'House {index}', base_price=10) for index in range(3)]
+        for property_obj in properties:
+            registry.get(property_obj, self.view)
+        self.assertEqual(list(registry.indexes), [properties[1].pk, properties[2].pk])
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from booking.views import BookingViewSet
+from core.models import Booking, PricingRule, Property
+
+
+PRICING_CALENDAR_URL = reverse('booking:pricingrule-calendar')
+
+
+def calendar_entries(first_day, days, **price):
+    return [
+        {'specific_day': (first_day + timedelta(days=offset)).strftime('%m-%d-%Y'), **price}
+        for offset in range(days)
+    ]
+
+
+@freeze_time("2024-01-01")
+class PricingCalendarApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.property = Property.objects.create(name='House', base_price=10)
+
+    def upload(self, entries):
+        return self.client.post(
+            PRICING_CALENDAR_URL, {'property': self.property.id, 'entries': entries}, format='json'
+        )
+
+    def test_upload_calendar(self):
+        res = self.upload(calendar_entries(date(2024, 1, 2), 365, fixed_price=20))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'inserted': 365, 'updated': 0})
+        self.assertEqual(PricingRule.objects.filter(property=self.property, fixed_price=20).count(), 365)
+
+    def test_upload_calendar_again_updates_days(self):
+        self.upload(calendar_entries(date(2024, 1, 2), 10, fixed_price=20))
+        res = self.upload(calendar_entries(date(2024, 1, 7), 10, price_modifier=-10))
+        self.assertEqual(res.data, {'inserted': 5, 'updated': 5})
+
+        rules = PricingRule.objects.filter(property=self.property)
+        self.assertEqual(rules.count(), 15)
+        rule = rules.get(specific_day=date(2024, 1, 8))
+        self.assertIsNone(rule.fixed_price)
+        self.assertEqual(rule.price_modifier, -10)
+
+    def test_upload_calendar_queries(self):
+        """
+        Test an upload is validated and written with a constant number of queries
+        """
+        with self.assertNumQueries(7):
+            self.upload(calendar_entries(date(2024, 1, 2), 30, fixed_price=20))
+
+    def test_upload_counts_under_property_lock(self):
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True,
+                               side_effect=QuerySet.select_for_update) as select_for_update:
+            res = self.upload(calendar_entries(date(2024, 1, 2), 3, fixed_price=20))
+        self.assertEqual(res.data, {'inserted': 3, 'updated': 0})
+        self.assertEqual(select_for_update.call_args.args[0].model, Property)
+
+    def test_upload_calendar_keeps_other_rules(self):
+        other = PricingRule.objects.create(property=self.property, fixed_price=15, specific_day=date(2024, 1, 2))
+        res = self.upload(calendar_entries(date(2024, 1, 2), 1, fixed_price=20))
+        self.assertEqual(res.data, {'inserted': 1, 'updated': 0})
+        other.refresh_from_db()
+        self.assertEqual(other.fixed_price, 15)
+
+    def test_upload_calendar_invalid(self):
+        invalid_uploads = [
+            [],
+            calendar_entries(date(2023, 12, 31), 2, fixed_price=20),
+            calendar_entries(date(2024, 1, 2), 1),
+            calendar_entries(date(2024, 1, 2), 1, fixed_price=-5),
+            calendar_entries(date(2024, 1, 2), 1, fixed_price=20) * 2,
+        ]
+        for entries in invalid_uploads:
+            res = self.upload(entries)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, entries)
+        self.assertFalse(PricingRule.objects.exists())
+
+    def test_calendar_prices_bookings(self):
+        self.upload(calendar_entries(date(2024, 1, 2), 2, fixed_price=20))
+        booking = Booking(property=self.property, date_start=date(2024, 1, 1), date_end=date(2024, 1, 4))
+        self.assertEqual(BookingViewSet()._get_final_price(booking), 10 + 20 + 20 + 10)
+
+    def test_moving_calendar_rule_leaves_calendar(self):
+        self.upload(calendar_entries(date(2024, 1, 2), 1, fixed_price=20))
+        rule = PricingRule.objects.get()
+        res = self.client.patch(
+            reverse('booking:pricingrule-detail', args=[rule.id]), {'specific_day': '01-05-2024'}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rule.refresh_from_db()
+        self.assertIsNone(rule.calendar_day)
+
+        res = self.upload(calendar_entries(date(2024, 1, 2), 1, fixed_price=30))
+        self.assertEqual(res.data, {'inserted': 1, 'updated': 0})
@@ -1,5 +1,8 @@
+from datetime import date
+
 from django.urls import reverse
 from django.test import TestCase
+from freezegun import freeze_time
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -91,3 +94,73 @@ class PublicPricingRulesApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         pricing_rules = PricingRule.objects.all()
         self.assertFalse(pricing_rules.exists())
+
+    @freeze_time("2024-01-01")
+    def test_create_seasonal_pricing_rule(self):
+        property_obj = create_property()
+        payload = {
+            'property': property_obj.id,
+            'fixed_price': 20,
+            'date_start': '06-01-2024',
+            'date_end': '08-31-2024',
+            'weekdays': [5, 6],
+        }
+        res = self.client.post(PRICING_RULES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['weekdays'], [5, 6])
+        pricing_rule = PricingRule.objects.get(id=res.data['id'])
+        self.assertEqual(pricing_rule.weekdays, 0b1100000)
+        self.assertEqual(pricing_rule.date_start, date(2024, 6, 1))
+
+    @freeze_time("2024-01-01")
+    def test_create_seasonal_pricing_rule_invalid(self):
+        property_obj = create_property()
+        invalid_payloads = [
+            {'date_start': '06-01-2024'},
+            {'date_start': '06-10-2024', 'date_end': '06-01-2024'},
+            {'date_start': '12-01-2023', 'date_end': '12-31-2023'},
+            {'specific_day': '06-01-2024', 'weekdays': [0]},
+            {'weekdays': []},
+            {'weekdays': [7]},
+        ]
+        for payload in invalid_payloads:
+            payload.update(property=property_obj.id, fixed_price=20)
+            res = self.client.post(PRICING_RULES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, payload)
+        self.assertFalse(PricingRule.objects.exists())
+
+    @freeze_time("2024-01-01")
+    def test_partial_update_validates_stored_season(self):
+        pricing_rule = PricingRule.objects.create(
+            property=create_property(), fixed_price=20, date_start=date(2024, 6, 1), date_end=date(2024, 6, 30)
+        )
+        res = self.client.patch(detail_url(pricing_rule.id), {'date_end': '05-01-2024'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_pricing_rules_active_on(self):
+        property_obj = create_property()
+        tier = PricingRule.objects.create(property=property_obj, fixed_price=5, min_stay_length=7)
+        day = PricingRule.objects.create(property=property_obj, fixed_price=5, specific_day=date(2024, 6, 1))
+        season = PricingRule.objects.create(
+            property=property_obj, fixed_price=5, date_start=date(2024, 5, 1), date_end=date(2024, 6, 30)
+        )
+        weekend = PricingRule.objects.create(property=property_obj, fixed_price=5, weekdays=0b1100000)
+        PricingRule.objects.create(property=property_obj, fixed_price=5, specific_day=date(2024, 6, 2))
+        PricingRule.objects.create(
+            property=property_obj, fixed_price=5, date_start=date(2024, 7, 1), date_end=date(2024, 7, 31)
+        )
+        PricingRule.objects.create(property=property_obj, fixed_price=5, weekdays=0b0000001)
+
+        # June 1st 2024 is a Saturday.
+        res = self.client.get(PRICING_RULES_URL, {'active_on': '06-01-2024'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['id'] for item in res.data}, {tier.id, day.id, season.id, weekend.id})
+
+    def test_filter_pricing_rules_by_weekday(self):
+        property_obj = create_property()
+        weekend = PricingRule.objects.create(property=property_obj, fixed_price=5, weekdays=0b1100000)
+        PricingRule.objects.create(property=property_obj, fixed_price=5, weekdays=0b0000001)
+        PricingRule.objects.create(property=property_obj, fixed_price=5, min_stay_length=7)
+
+        res = self.client.get(PRICING_RULES_URL, {'weekday': 6})
+        self.assertEqual([item['id'] for item in res.data], [weekend.id])
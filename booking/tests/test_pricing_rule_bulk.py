@@ -0,0 +1,108 @@
+from datetime import date
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from booking.caching import CATALOG_VERSION_KEY
+from core.models import PricingRule, Property
+
+
+BULK_URL = reverse('booking:pricingrule-bulk')
+
+
+def bulk_url(**params):
+    return f'{BULK_URL}?{urlencode(params)}'
+
+
+class PricingRuleBulkApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.property = Property.objects.create(name='House', base_price=10)
+        self.other_property = Property.objects.create(name='Flat', base_price=10)
+        self.rules = [
+            PricingRule.objects.create(property=self.property, price_modifier=-10, specific_day=date(2024, 6, day))
+            for day in range(1, 4)
+        ]
+        self.fixed_rule = PricingRule.objects.create(
+            property=self.property, fixed_price=20, specific_day=date(2024, 6, 2)
+        )
+        self.other_rule = PricingRule.objects.create(
+            property=self.other_property, price_modifier=-10, specific_day=date(2024, 6, 2)
+        )
+
+    def test_bulk_update_increments_modifiers(self):
+        url = bulk_url(property=self.property.id, specific_day__gte='06-02-2024')
+        # The property filter's validation, then the pricing version bump and a single UPDATE in a savepoint.
+        with self.assertNumQueries(5):
+            res = self.client.patch(url, {'price_modifier_increment': 5}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'updated': 3, 'dry_run': False})
+
+        modifiers = dict(PricingRule.objects.values_list('id', 'price_modifier'))
+        self.assertEqual(modifiers[self.rules[0].id], -10)
+        self.assertEqual(modifiers[self.rules[1].id], -5)
+        self.assertEqual(modifiers[self.rules[2].id], -5)
+        self.assertIsNone(modifiers[self.fixed_rule.id])
+        self.assertEqual(modifiers[self.other_rule.id], -10)
+
+    def test_bulk_update_sets_values(self):
+        res = self.client.patch(bulk_url(property=self.property.id), {'fixed_price': 30}, format='json')
+        self.assertEqual(res.data['updated'], 4)
+        self.assertEqual(PricingRule.objects.filter(fixed_price=30).count(), 4)
+
+    def test_bulk_delete(self):
+        url = bulk_url(property=self.property.id, specific_day__lte='06-02-2024')
+        # As an update, plus the SELECT of the deleted ids and the INSERT of their tombstones.
+        with self.assertNumQueries(7):
+            res = self.client.delete(url)
+        self.assertEqual(res.data, {'deleted': 3, 'dry_run': False})
+        self.assertEqual(
+            set(PricingRule.objects.values_list('id', flat=True)), {self.rules[2].id, self.other_rule.id}
+        )
+
+    def test_dry_run_does_not_write(self):
+        res = self.client.delete(bulk_url(property=self.property.id, dry_run=1))
+        self.assertEqual(res.data, {'deleted': 4, 'dry_run': True})
+        res = self.client.patch(bulk_url(property=self.property.id, dry_run=1), {'fixed_price': 1}, format='json')
+        self.assertEqual(res.data, {'updated': 4, 'dry_run': True})
+        self.assertEqual(PricingRule.objects.count(), 5)
+        self.assertFalse(PricingRule.objects.filter(fixed_price=1).exists())
+
+    def test_bulk_requires_filters(self):
+        res = self.client.delete(BULK_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.delete(bulk_url(dry_run=1))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PricingRule.objects.count(), 5)
+
+    def test_bulk_rejects_blank_filters(self):
+        for params in ({'property': ''}, {'property': '', 'specific_day__gte': ''}, {'min_stay_length_min': ''}):
+            res = self.client.delete(bulk_url(**params))
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('filters', res.data)
+            res = self.client.patch(bulk_url(**params), {'fixed_price': 1}, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+        self.assertEqual(PricingRule.objects.count(), 5)
+        self.assertFalse(PricingRule.objects.filter(fixed_price=1).exists())
+
+    def test_bulk_rejects_invalid_filters(self):
+        res = self.client.delete(bulk_url(property='abc'))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PricingRule.objects.count(), 5)
+
+    def test_bulk_update_invalid(self):
+        url = bulk_url(property=self.property.id)
+        for payload in [{}, {'fixed_price': -1}, {'price_modifier': 5, 'price_modifier_increment': 5}]:
+            res = self.client.patch(url, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, payload)
+
+    def test_bulk_write_invalidates_catalog_cache(self):
+        cache.set(CATALOG_VERSION_KEY, 1, timeout=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(bulk_url(property=self.other_property.id))
+        self.assertNotEqual(cache.get(CATALOG_VERSION_KEY), 1)
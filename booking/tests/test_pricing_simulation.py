@@ -0,0 +1,152 @@
+import random
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from booking.caching import get_catalog_version
+from booking.serializers import WeekdaysField
+from booking.tests.test_price_index import TODAY, random_rule
+from booking.views import BookingViewSet
+from core.models import Booking, PricingRule, Property
+
+
+SIMULATE_URL = reverse('booking:pricingrule-simulate')
+
+
+def rule_data(rule):
+    """
+    Return the API representation of an unsaved rule.
+    """
+    data = {
+        'property': rule.property_id,
+        'price_modifier': rule.price_modifier,
+        'min_stay_length': rule.min_stay_length,
+        'fixed_price': rule.fixed_price,
+        'specific_day': rule.specific_day,
+        'date_start': rule.date_start,
+        'date_end': rule.date_end,
+        'weekdays': WeekdaysField().to_representation(rule.weekdays) if rule.weekdays else None,
+    }
+    return {name: value.strftime('%m-%d-%Y') if isinstance(value, date) else value
+            for name, value in data.items() if value is not None}
+
+
+@freeze_time("2024-01-01")
+class PricingSimulationApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.view = BookingViewSet()
+        self.property = Property.objects.create(name='House', base_price=10)
+        self.rule = PricingRule.objects.create(property=self.property, fixed_price=5, specific_day=date(2024, 1, 10))
+
+    def book(self, property_obj, date_start, nights):
+        date_end = date_start + timedelta(days=nights - 1)
+        booking = Booking(property=property_obj, date_start=date_start, date_end=date_end)
+        booking.final_price = self.view._get_final_price(booking)
+        booking.save()
+        return booking
+
+    def post(self, **data):
+        return self.client.post(SIMULATE_URL, {'date_start': '01-01-2024', 'date_end': '12-31-2024', **data},
+                                format='json')
+
+    def test_simulated_prices_match_applying_the_changes(self):
+        """
+        Test the simulated prices are the final prices once the proposed changes are saved, for random rules
+        """
+        rng = random.Random(49)
+        for index in range(15):
+            property_obj = Property.objects.create(name=f'House {index}', base_price=rng.choice([10, 33.3, 80]))
+            rules = PricingRule.objects.bulk_create(random_rule(rng, property_obj) for _ in range(rng.randint(2, 8)))
+            bookings = [
+                self.book(property_obj, TODAY + timedelta(days=rng.randint(0, 60)), rng.randint(1, 30))
+                for _ in range(20)
+            ]
+            # Seasons that ended already are rejected like by the pricing rule endpoints.
+            added = [rule for rule in (random_rule(rng, property_obj) for _ in range(rng.randint(0, 5)))
+                     if rule.date_end is None or rule.date_end >= TODAY]
+            edited, deleted = rules[0], rules[1]
+            edit = {'price_modifier': rng.choice([-40, 15]), 'min_stay_length': rng.choice([None, 3])}
+
+            res = self.post(
+                add=[rule_data(rule) for rule in added], update=[{'id': edited.id, **edit}], delete=[deleted.id],
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+            self.assertEqual(PricingRule.objects.filter(property=property_obj).count(), len(rules))
+
+            PricingRule.objects.bulk_create(added)
+            PricingRule.objects.filter(pk=edited.pk).update(**edit)
+            deleted.delete()
+            simulated = {item['id']: item['simulated_price'] for item in res.data['bookings']}
+            expected_revenue = 0
+            for booking in bookings:
+                final_price = self.view._get_final_price(booking)
+                expected_revenue += final_price
+                self.assertAlmostEqual(simulated.get(booking.id, booking.final_price), final_price, places=6)
+
+            self.assertEqual(res.data['booking_count'], 20)
+            self.assertAlmostEqual(res.data['current_revenue'], sum(booking.final_price for booking in bookings))
+            self.assertAlmostEqual(res.data['simulated_revenue'], expected_revenue)
+            self.assertAlmostEqual(
+                res.data['revenue_delta'], sum(item['delta'] for item in res.data['bookings']), places=6
+            )
+
+    def test_revenue_deltas(self):
+        other = Property.objects.create(name='Flat', base_price=20)
+        changed = self.book(self.property, date(2024, 1, 9), 2)
+        self.book(self.property, date(2024, 2, 1), 1)
+        self.book(self.property, date(2025, 1, 9), 2)
+        self.book(other, date(2024, 1, 10), 1)
+        added = {'property': other.id, 'specific_day': '01-10-2024', 'price_modifier': 50}
+
+        res = self.post(update=[{'id': self.rule.id, 'fixed_price': 8}], add=[added])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['booking_count'], 3)
+        self.assertEqual(res.data['changed_count'], 2)
+        self.assertEqual(res.data['current_revenue'], 15 + 10 + 20)
+        self.assertEqual(res.data['revenue_delta'], 3 + 10)
+        self.assertEqual(
+            [(item['property'], item['booking_count'], item['revenue_delta']) for item in res.data['properties']],
+            [(self.property.id, 2, 3), (other.id, 1, 10)],
+        )
+        self.assertEqual(res.data['bookings'][0], {
+            'id': changed.id, 'property': self.property.id, 'date_start': '01-09-2024', 'date_end': '01-10-2024',
+            'final_price': 15, 'current_price': 15, 'simulated_price': 18, 'delta': 3,
+        })
+
+    def test_queries_do_not_grow_with_bookings(self):
+        for day in range(30):
+            self.book(self.property, TODAY + timedelta(days=day), 3)
+        # Edited rules and their properties, then per property its bookings and its rules.
+        with self.assertNumQueries(3):
+            res = self.post(delete=[self.rule.id])
+        self.assertEqual(res.data['changed_count'], 3)
+        self.assertEqual(res.data['revenue_delta'], 3 * 5)
+
+    def test_simulation_does_not_invalidate_the_catalog(self):
+        version = get_catalog_version()
+        self.post(delete=[self.rule.id])
+        self.assertEqual(get_catalog_version(), version)
+
+    def test_invalid_proposals(self):
+        other = Property.objects.create(name='Flat', base_price=20)
+        for data, field in (
+            ({}, 'non_field_errors'),
+            ({'delete': [self.rule.id + 100]}, 'non_field_errors'),
+            ({'delete': [self.rule.id], 'update': [{'id': self.rule.id, 'fixed_price': 1}]}, 'non_field_errors'),
+            ({'update': [{'fixed_price': 1}]}, 'update'),
+            ({'update': [{'id': self.rule.id, 'property': other.id}]}, 'update'),
+            ({'add': [{'property': other.id, 'fixed_price': -1}]}, 'add'),
+            ({'delete': [self.rule.id], 'date_end': '01-01-2030'}, 'non_field_errors'),
+        ):
+            res = self.post(**data)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, data)
+            self.assertIn(field, res.data)
@@ -1,14 +1,23 @@
+import random
+from datetime import date, timedelta
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from freezegun import freeze_time
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Property
+from core.models import Booking, PricingRule, Property
 from booking.serializers import PropertySerializer
+from booking.views import BookingViewSet
 
 
 PROPERTIES_URL = reverse('booking:property-list')
+SEARCH_URL = reverse('booking:property-search')
 
 
 def detail_url(property_id):
@@ -59,3 +68,204 @@ class PublicPropertyApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         properties = Property.objects.all()
         self.assertFalse(properties.exists())
+
+    def test_search_properties_by_substring(self):
+        Property.objects.create(name='Big house in front of the beach', base_price=10)
+        Property.objects.create(name='Mountain cabin', base_price=20)
+
+        res = self.client.get(PROPERTIES_URL, {'search': 'BEACH'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in res.data], ['Big house in front of the beach'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Trigram similarity requires PostgreSQL')
+    def test_search_properties_ranked_by_similarity(self):
+        Property.objects.create(name='Beach house', base_price=10)
+        Property.objects.create(name='Beach houses', base_price=10)
+        Property.objects.create(name='Mountain cabin', base_price=20)
+
+        res = self.client.get(PROPERTIES_URL, {'search': 'beach hose'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in res.data], ['Beach house', 'Beach houses'])
+
+
+class PropertySearchApiTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def search(self, **params):
+        defaults = {'date_start': '01-01-2024', 'date_end': '01-10-2024'}
+        defaults.update(params)
+        return self.client.get(SEARCH_URL, defaults)
+
+    def test_search_sorted_by_total_price(self):
+        cheap = Property.objects.create(name='Cheap', base_price=10)
+        expensive = Property.objects.create(name='Expensive', base_price=30)
+        discounted = Property.objects.create(name='Discounted', base_price=30)
+        PricingRule.objects.create(property=discounted, price_modifier=-50, min_stay_length=7)
+        PricingRule.objects.create(property=discounted, fixed_price=60, specific_day='2024-01-04')
+
+        res = self.search()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(
+            [(item['id'], item['total_price']) for item in res.data['results']],
+            [(cheap.id, 100), (discounted.id, 195), (expensive.id, 300)]
+        )
+
+    def test_search_excludes_booked_properties(self):
+        free = Property.objects.create(name='Free', base_price=10)
+        booked = Property.objects.create(name='Booked', base_price=10)
+        Booking.objects.create(property=booked, date_start='2024-01-10', date_end='2024-01-12')
+        Booking.objects.create(property=free, date_start='2024-01-11', date_end='2024-01-12')
+
+        res = self.search()
+        self.assertEqual([item['id'] for item in res.data['results']], [free.id])
+
+    def test_search_max_total(self):
+        Property.objects.create(name='Cheap', base_price=10)
+        Property.objects.create(name='Expensive', base_price=30)
+
+        res = self.search(max_total=100)
+        self.assertEqual([item['name'] for item in res.data['results']], ['Cheap'])
+
+    def test_search_paginated(self):
+        for base_price in range(1, 6):
+            Property.objects.create(name=f'House {base_price}', base_price=base_price)
+
+        res = self.search(limit=2, offset=2)
+        self.assertEqual(res.data['count'], 5)
+        self.assertEqual([item['name'] for item in res.data['results']], ['House 3', 'House 4'])
+        self.assertIsNotNone(res.data['next'])
+        self.assertIsNotNone(res.data['previous'])
+
+    def test_search_invalid_dates(self):
+        res = self.search(date_start='01-10-2024', date_end='01-01-2024')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(SEARCH_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_totals_match_booking_final_price(self):
+        """
+        Test the set-based totals match BookingViewSet._get_final_price for random rules
+        """
+        rng = random.Random(42)
+        date_start = date(2024, 1, 1)
+        properties = []
+        for index in range(30):
+            property_obj = Property.objects.create(name=f'House {index}', base_price=rng.choice([10, 25, 80]))
+            for _ in range(rng.randint(0, 6)):
+                PricingRule.objects.create(
+                    property=property_obj,
+                    price_modifier=rng.choice([None, -20, -10, 15]),
+                    fixed_price=rng.choice([None, None, 5, 40]),
+                    min_stay_length=rng.choice([None, 1, 3, 7, 30]),
+                    specific_day=rng.choice([None, date_start + timedelta(days=rng.randint(0, 12))]),
+                )
+            properties.append(property_obj)
+
+        view = BookingViewSet()
+        for stay_length in [1, 3, 8, 12]:
+            date_end = date_start + timedelta(days=stay_length - 1)
+            res = self.search(date_end=date_end.strftime('%m-%d-%Y'), limit=100)
+            totals = {item['id']: item['total_price'] for item in res.data['results']}
+            for property_obj in properties:
+                booking = Booking(property=property_obj, date_start=date_start, date_end=date_end)
+                self.assertAlmostEqual(totals[property_obj.id], view._get_final_price(booking))
+
+    def test_search_totals_match_booking_final_price_with_seasonal_rules(self):
+        """
+        Test the set-based totals match BookingViewSet._get_final_price for random date range and weekday rules
+        """
+        rng = random.Random(7)
+        date_start = date(2024, 1, 1)
+        properties = []
+        for index in range(30):
+            property_obj = Property.objects.create(name=f'House {index}', base_price=rng.choice([10, 25, 80]))
+            for _ in range(rng.randint(0, 6)):
+                season_start = rng.choice([None, date_start + timedelta(days=rng.randint(-5, 10))])
+                PricingRule.objects.create(
+                    property=property_obj,
+                    price_modifier=rng.choice([None, -20, -10, 15]),
+                    fixed_price=rng.choice([None, None, 5, 40]),
+                    min_stay_length=rng.choice([None, None, 1, 3, 7]),
+                    specific_day=rng.choice([None, None, date_start + timedelta(days=rng.randint(0, 12))]),
+                    date_start=season_start,
+                    date_end=season_start + timedelta(days=rng.randint(0, 6)) if season_start else None,
+                    weekdays=rng.choice([None, None, 0b1100000, 0b0000001, 0b0011110]),
+                )
+            properties.append(property_obj)
+
+        view = BookingViewSet()
+        for stay_length in [1, 3, 8, 12]:
+            date_end = date_start + timedelta(days=stay_length - 1)
+            res = self.search(date_end=date_end.strftime('%m-%d-%Y'), limit=100)
+            totals = {item['id']: item['total_price'] for item in res.data['results']}
+            for property_obj in properties:
+                booking = Booking(property=property_obj, date_start=date_start, date_end=date_end)
+                self.assertAlmostEqual(totals[property_obj.id], view._get_final_price(booking))
+
+
+@freeze_time('2024-03-10')
+class PropertyAggregatesApiTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.house = Property.objects.create(name='House', base_price=100)
+        PricingRule.objects.bulk_create([
+            PricingRule(property=self.house, specific_day=date(2024, 3, 20), fixed_price=80),
+            PricingRule(property=self.house, date_start=date(2024, 3, 1), date_end=date(2024, 3, 31),
+                        price_modifier=10),
+            PricingRule(property=self.house, weekdays=0b1100000, price_modifier=20),
+            PricingRule(property=self.house, min_stay_length=7, price_modifier=-30),
+            # Over, or never applying.
+            PricingRule(property=self.house, specific_day=date(2024, 3, 1), fixed_price=10),
+            PricingRule(property=self.house, date_start=date(2024, 2, 1), date_end=date(2024, 2, 29), fixed_price=10),
+            PricingRule(property=self.house, price_modifier=-90),
+        ])
+        Booking.objects.bulk_create([
+            Booking(property=self.house, date_start=date(2024, 3, 1), date_end=date(2024, 3, 5)),
+            Booking(property=self.house, date_start=date(2024, 4, 1), date_end=date(2024, 4, 3)),
+        ])
+        self.flat = Property.objects.create(name='Flat', base_price=60)
+        Booking.objects.create(property=self.flat, date_start=date(2024, 3, 8), date_end=date(2024, 3, 12))
+        self.empty = Property.objects.create(name='Empty', base_price=None)
+
+    def test_list_with_aggregates(self):
+        res = self.client.get(PROPERTIES_URL, {'aggregates': 1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
+        aggregates = {
+            item['id']: (item['active_rule_count'], item['next_booked_date'], item['min_nightly_price'])
+            for item in res.data
+        }
+        self.assertEqual(aggregates, {
+            self.house.id: (4, '04-01-2024', 70),
+            self.flat.id: (0, '03-10-2024', 60),
+            self.empty.id: (0, None, None),
+        })
+
+    def test_aggregates_are_opt_in(self):
+        res = self.client.get(PROPERTIES_URL)
+        self.assertEqual(set(res.data[0]), {'id', 'name', 'base_price'})
+        res = self.client.get(detail_url(self.house.id), {'aggregates': 'true', 'fields': 'id,active_rule_count'})
+        self.assertEqual(res.data, {'id': self.house.id, 'active_rule_count': 4})
+
+    def test_one_query_whatever_the_page_size(self):
+        for count in (3, 30):
+            Property.objects.bulk_create(Property(name=f'Extra {index}', base_price=50) for index in range(count))
+            with self.assertNumQueries(1):
+                res = self.client.get(PROPERTIES_URL, {'aggregates': 1, 'ordering': '-active_rule_count'})
+            self.assertEqual(res.data[0]['id'], self.house.id)
+
+    def test_filter_and_order_on_aggregates(self):
+        res = self.client.get(PROPERTIES_URL, {'next_booked_date__lte': '03-31-2024'})
+        self.assertEqual([item['id'] for item in res.data], [self.flat.id])
+        self.assertNotIn('ETag', res)
+
+        res = self.client.get(PROPERTIES_URL, {'active_rule_count__gte': 1, 'aggregates': 1})
+        self.assertEqual([item['id'] for item in res.data], [self.house.id])
+
+        res = self.client.get(PROPERTIES_URL, {'ordering': 'min_nightly_price', 'min_nightly_price__lte': 100})
+        self.assertEqual([item['id'] for item in res.data], [self.flat.id, self.house.id])
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from booking.caching import get_catalog_version
+from booking.deletion import delete_in_chunks, delete_property
+from core.models import Booking, BookingRollup, PricingRule, Property
+
+
+class PropertyDeletionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.property = Property.objects.create(name='Big house', base_price=10)
+        self.other = Property.objects.create(name='Small house', base_price=10)
+        for prop in (self.property, self.other):
+            for day in range(1, 6):
+                Booking.objects.create(
+                    property=prop, date_start=f'2030-01-{day:02}', date_end=f'2030-01-{day:02}', final_price=10
+                )
+            PricingRule.objects.create(property=prop, min_stay_length=7, price_modifier=-10)
+            BookingRollup.objects.create(property=prop, month='2030-01-01', revenue=50, nights=5)
+
+    def assert_only_other_property_left(self):
+        self.assertFalse(Property.objects.filter(id=self.property.id).exists())
+        for model in (Booking, PricingRule, BookingRollup):
+            self.assertEqual(set(model.objects.values_list('property_id', flat=True)), {self.other.id})
+
+    def test_delete_property_in_chunks(self):
+        property_id = self.property.id
+        counts = delete_property(self.property, chunk_size=2)
+        self.assertEqual(counts['core.Booking'], 5)
+        self.assertEqual(counts['core.PricingRule'], 1)
+        self.assertEqual(counts['core.Property'], 1)
+        self.assertFalse(Booking.objects.filter(property_id=property_id).exists())
+        self.assert_only_other_property_left()
+
+    def test_chunks_do_not_load_rows_without_receivers(self):
+        # Per chunk: SAVEPOINT, SELECT ids, INSERT tombstones, DELETE, RELEASE; plus the final empty chunk.
+        with self.assertNumQueries(5 * 3 + 3):
+            deleted = delete_in_chunks(Booking.objects.filter(property=self.property), chunk_size=2)
+        self.assertEqual(deleted, 5)
+
+    def test_receivers_still_get_signals(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.id)
+
+        expected = set(Booking.objects.filter(property=self.property).values_list('id', flat=True))
+        post_delete.connect(receiver, sender=Booking)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Booking)
+        delete_property(self.property, chunk_size=2)
+        self.assertEqual(set(deleted), expected)
+
+    def test_api_destroy(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            res = APIClient().delete(reverse('booking:property-detail', args=[self.property.id]))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assert_only_other_property_left()
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_admin_delete_summarises_related_rows(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        url = reverse('admin:core_property_delete', args=[self.property.id])
+
+        res = self.client.get(url)
+        self.assertContains(res, 'Bookings: 5')
+        self.assertNotContains(res, 'start: 2030-01-01')
+
+        res = self.client.post(url, {'post': 'yes'})
+        self.assertEqual(res.status_code, 302)
+        self.assert_only_other_property_left()
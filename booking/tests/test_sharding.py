@@ -0,0 +1,169 @@
+from datetime import date
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Booking, BookingRollup, PricingRule, Property, Tombstone
+from core.sharding import SHARD_ID_BITS, shard_for
+
+
+SHARD1_ID = (1 << SHARD_ID_BITS) + 1
+BOOKINGS_URL = reverse('booking:booking-list')
+PROPERTIES_URL = reverse('booking:property-list')
+PRICING_RULES_URL = reverse('booking:pricingrule-list')
+
+
+@override_settings(SHARD_DATABASES=['default', 'shard1'])
+class ShardRoutingTests(SimpleTestCase):
+
+    def test_shard_for(self):
+        self.assertEqual(shard_for(5), 'default')
+        self.assertEqual(shard_for(str(SHARD1_ID)), 'shard1')
+        self.assertEqual(shard_for(Property(id=SHARD1_ID)), 'shard1')
+        self.assertIsNone(shard_for(2 << SHARD_ID_BITS))
+        self.assertIsNone(shard_for('abc'))
+        self.assertIsNone(shard_for(None))
+
+    def test_lookups_route_querysets(self):
+        self.assertEqual(Property.objects.filter(pk=SHARD1_ID).db, 'shard1')
+        self.assertEqual(Booking.objects.filter(property=Property(id=SHARD1_ID)).db, 'shard1')
+        self.assertEqual(PricingRule.objects.filter(property_id__in=[SHARD1_ID, SHARD1_ID + 1]).db, 'shard1')
+        self.assertEqual(Booking.objects.filter(pk=SHARD1_ID).filter(date_start__gte=date(2024, 1, 1)).db, 'shard1')
+        self.assertEqual(Booking.objects.filter(property__exact=SHARD1_ID).db, 'shard1')
+
+    def test_unrouted_querysets_fan_out(self):
+        for queryset in (
+            Booking.objects.all(),
+            Booking.objects.filter(pk__in=[1, SHARD1_ID]),
+            Booking.objects.exclude(property=SHARD1_ID),
+            Property.objects.filter(name='Away'),
+        ):
+            self.assertFalse(queryset.is_routed)
+            self.assertEqual([shard.db for shard in queryset.shard_querysets()], ['default', 'shard1'])
+
+    def test_new_rows_go_to_their_property_shard(self):
+        self.assertEqual(router.db_for_write(Booking, instance=Booking(property_id=SHARD1_ID)), 'shard1')
+        self.assertEqual(router.db_for_write(PricingRule, instance=PricingRule(property_id=1)), 'default')
+        with mock.patch('core.sharding.random.choice', return_value='shard1'):
+            self.assertEqual(router.db_for_write(Property, instance=Property()), 'shard1')
+
+    def test_other_models_stay_on_default(self):
+        self.assertEqual(router.db_for_read(Tombstone, instance=Booking(property_id=SHARD1_ID)), 'default')
+        self.assertEqual(Tombstone.objects.filter(object_id=SHARD1_ID).db, 'default')
+
+
+@skipUnless(len(settings.SHARD_DATABASES) > 1, 'Needs at least two shards in SHARD_DATABASES.')
+@freeze_time('2024-01-01 12:00:00')
+class ShardedApiTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.shard = settings.SHARD_DATABASES[1]
+        self.home = Property.objects.using('default').create(name='Home', base_price=10)
+        with freeze_time('2024-01-01 12:00:01'):
+            self.away = Property.objects.using(self.shard).create(name='Away', base_price=20)
+
+    def create_booking(self, property_obj, **data):
+        data = {'property': property_obj.id, 'date_start': '01-10-2024', 'date_end': '01-11-2024', **data}
+        return self.client.post(BOOKINGS_URL, data)
+
+    def test_ids_come_from_the_shard_range(self):
+        self.assertEqual(shard_for(self.home.id), 'default')
+        self.assertEqual(shard_for(self.away.id), self.shard)
+
+    def test_booking_is_written_on_its_property_shard(self):
+        PricingRule.objects.create(property=self.away, specific_day=date(2024, 1, 10), fixed_price=5)
+        res = self.create_booking(self.away)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['final_price'], 25)
+        self.assertEqual(shard_for(res.data['id']), self.shard)
+        self.assertTrue(Booking.objects.using(self.shard).filter(id=res.data['id']).exists())
+        self.assertFalse(Booking.objects.using('default').exists())
+        self.assertEqual(BookingRollup.objects.using(self.shard).get(property=self.away).revenue, 25)
+
+        res = self.client.patch(reverse('booking:booking-detail', args=[res.data['id']]), {'date_end': '01-12-2024'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['final_price'], 45)
+
+    def test_lists_merge_shards_by_created_at(self):
+        with freeze_time('2024-01-02'):
+            newest = Property.objects.using('default').create(name='Newest', base_price=30)
+        res = self.client.get(PROPERTIES_URL)
+        self.assertEqual([item['id'] for item in res.data], [newest.id, self.away.id, self.home.id])
+
+    def test_filtered_list_reads_one_shard(self):
+        PricingRule.objects.create(property=self.home, fixed_price=1)
+        rule = PricingRule.objects.create(property=self.away, fixed_price=2)
+        with self.assertNumQueries(0, using='default'):
+            res = self.client.get(PRICING_RULES_URL, {'property': self.away.id})
+        self.assertEqual([item['id'] for item in res.data], [rule.id])
+
+    def test_rule_cannot_move_to_another_shard(self):
+        rule = PricingRule.objects.create(property=self.away, fixed_price=2)
+        res = self.client.patch(reverse('booking:pricingrule-detail', args=[rule.id]), {'property': self.home.id})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_delete_on_every_shard(self):
+        PricingRule.objects.create(property=self.home, fixed_price=1, specific_day=date(2024, 2, 1))
+        PricingRule.objects.create(property=self.away, fixed_price=2, specific_day=date(2024, 2, 1))
+        res = self.client.delete(f'{reverse("booking:pricingrule-bulk")}?specific_day__gte=02-01-2024')
+        self.assertEqual(res.data, {'deleted': 2, 'dry_run': False})
+        self.assertEqual(Tombstone.objects.using(self.shard).count(), 1)
+
+    def test_search_merges_shards_by_total_price(self):
+        with freeze_time('2024-01-02'):
+            cheap = Property.objects.using(self.shard).create(name='Cheap', base_price=5)
+        res = self.client.get(
+            reverse('booking:property-search'), {'date_start': '02-01-2024', 'date_end': '02-02-2024', 'limit': 2}
+        )
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual([item['id'] for item in res.data['results']], [cheap.id, self.home.id])
+
+    def test_delete_and_change_feed_across_shards(self):
+        self.create_booking(self.away)
+        with freeze_time('2024-01-01 12:01:00'):
+            res = self.client.get(reverse('booking:property-changes'))
+        cursor = res.data['next_cursor']
+        self.assertEqual({item['id'] for item in res.data['results']}, {self.home.id, self.away.id})
+
+        with freeze_time('2024-01-01 12:01:30'):
+            res = self.client.delete(reverse('booking:property-detail', args=[self.away.id]))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Booking.objects.using(self.shard).exists())
+        with freeze_time('2024-01-01 12:02:00'):
+            res = self.client.get(reverse('booking:property-changes'), {'cursor': cursor})
+        self.assertEqual([(item['id'], item['deleted']) for item in res.data['results']], [(self.away.id, True)])
+
+    def test_simulation_across_shards(self):
+        home_rule = PricingRule.objects.create(property=self.home, specific_day=date(2024, 1, 10), fixed_price=5)
+        self.create_booking(self.home)
+        self.create_booking(self.away)
+        res = self.client.post(reverse('booking:pricingrule-simulate'), {
+            'date_start': '01-01-2024', 'date_end': '01-31-2024', 'delete': [home_rule.id],
+            'add': [{'property': self.away.id, 'specific_day': '01-10-2024', 'fixed_price': 15}],
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(res.data['revenue_delta'], (10 - 5) + (35 - 40))
+
+    def test_lists_merge_shards_by_aggregates(self):
+        self.create_booking(self.away)
+        res = self.client.get(PROPERTIES_URL, {'aggregates': 1, 'ordering': 'next_booked_date'})
+        self.assertEqual(
+            [(item['id'], item['next_booked_date']) for item in res.data],
+            [(self.away.id, '01-10-2024'), (self.home.id, None)],
+        )
+
+    def test_lists_merge_shards_in_mixed_directions(self):
+        twin = Property.objects.using('default').create(name='Away', base_price=30)
+        res = self.client.get(PROPERTIES_URL, {'ordering': 'name,-base_price'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data], [twin.id, self.away.id, self.home.id])
@@ -0,0 +1,87 @@
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+
+from django.test import TestCase
+from freezegun import freeze_time
+
+from booking.price_index import build_index
+from booking.quotes import bump_pricing_version
+from booking.shared_price_index import SharedPriceIndexRegistry, index_path, read_index, write_index
+from booking.tests.test_price_index import random_rule
+from booking.views import BookingViewSet
+from core.models import Booking, PricingRule, Property
+
+
+TODAY = date(2024, 1, 1)
+
+
+@freeze_time("2024-01-01")
+class SharedPriceIndexTests(TestCase):
+
+    def setUp(self):
+        self.view = BookingViewSet()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.directory = tmp_dir.name
+
+    def test_mapped_index_matches_booking_final_price(self):
+        rng = random.Random(46)
+        for index in range(10):
+            property_obj = Property.objects.create(name=f'House {index}', base_price=rng.choice([10, 33.3]))
+            PricingRule.objects.bulk_create(random_rule(rng, property_obj) for _ in range(rng.randint(0, 10)))
+            path = index_path(self.directory, property_obj.pk)
+            write_index(path, build_index(property_obj, TODAY, 90, self.view))
+            mapped = read_index(path, property_obj.pk)
+
+            self.assertTrue(mapped.is_current(property_obj, TODAY))
+            for _ in range(20):
+                date_start = TODAY + timedelta(days=rng.randint(0, 60))
+                date_end = date_start + timedelta(days=rng.randint(0, 29))
+                booking = Booking(property=property_obj, date_start=date_start, date_end=date_end)
+                self.assertAlmostEqual(
+                    mapped.total(date_start, date_end), self.view._get_final_price(booking), places=6
+                )
+
+    def test_missing_base_price_round_trips(self):
+        property_obj = Property.objects.create(name='House', base_price=None)
+        PricingRule.objects.create(property=property_obj, fixed_price=5, min_stay_length=3)
+        path = index_path(self.directory, property_obj.pk)
+        write_index(path, build_index(property_obj, TODAY, 10, self.view))
+        mapped = read_index(path, property_obj.pk)
+        self.assertIsNone(mapped.base_price)
+        self.assertEqual(mapped.total(TODAY, TODAY + timedelta(days=2)), 15)
+        # Shorter stays have nights without a price.
+        self.assertIsNone(mapped.total(TODAY, TODAY + timedelta(days=1)))
+
+    def test_missing_file(self):
+        self.assertIsNone(read_index(index_path(self.directory, 1), 1))
+
+    def test_index_is_built_once_for_all_workers(self):
+        property_obj = Property.objects.create(name='House', base_price=10)
+        booking = Booking(property=property_obj, date_start=TODAY, date_end=TODAY + timedelta(days=1))
+        first_worker = SharedPriceIndexRegistry(self.directory)
+        second_worker = SharedPriceIndexRegistry(self.directory)
+
+        first_worker.get(property_obj, self.view)
+        with self.assertNumQueries(0):
+            self.assertEqual(second_worker.total(booking, self.view), 20)
+
+    def test_rule_change_publishes_new_generation(self):
+        property_obj = Property.objects.create(name='House', base_price=10)
+        booking = Booking(property=property_obj, date_start=TODAY, date_end=TODAY + timedelta(days=1))
+        first_worker = SharedPriceIndexRegistry(self.directory)
+        second_worker = SharedPriceIndexRegistry(self.directory)
+        first_worker.get(property_obj, self.view)
+        second_worker.get(property_obj, self.view)
+        inode = os.stat(index_path(self.directory, property_obj.pk)).st_ino
+
+        PricingRule.objects.create(property=property_obj, fixed_price=5, specific_day=TODAY)
+        bump_pricing_version([property_obj.pk])
+        property_obj.refresh_from_db()
+        self.assertIsNone(first_worker.total(booking, self.view))
+        first_worker.get(property_obj, self.view)
+        self.assertNotEqual(os.stat(index_path(self.directory, property_obj.pk)).st_ino, inode)
+        with self.assertNumQueries(0):
+            self.assertEqual(second_worker.total(booking, self.view), 15)
@@ -0,0 +1,86 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Booking, PricingRule, Property
+
+
+BOOKINGS_URL = reverse('booking:booking-list')
+PROPERTIES_URL = reverse('booking:property-list')
+PRICING_RULES_URL = reverse('booking:pricingrule-list')
+
+
+class SparseFieldsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.properties = [Property.objects.create(name=f'Property {i}', base_price=10) for i in range(3)]
+        self.bookings = [
+            Booking.objects.create(
+                property=prop, date_start='2030-01-01', date_end='2030-01-10', final_price=100
+            )
+            for prop in self.properties
+        ]
+        PricingRule.objects.create(property=self.properties[0], min_stay_length=7, price_modifier=-10)
+
+    def test_fields_restrict_output_and_columns(self):
+        full = self.client.get(BOOKINGS_URL)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(BOOKINGS_URL, {'fields': 'id,final_price'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([set(item) for item in res.data], [{'id', 'final_price'}] * 3)
+        self.assertLess(len(res.content), len(full.content))
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('date_start', sql)
+        self.assertNotIn('property_id', sql)
+
+    def test_expand_embeds_property_in_the_list_query(self):
+        # Throttle bucket, then the bookings joined with their properties.
+        with self.assertNumQueries(2):
+            res = self.client.get(BOOKINGS_URL, {'expand': 'property'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data[-1]['property'],
+            {'id': self.properties[0].id, 'name': 'Property 0', 'base_price': 10.0}
+        )
+
+    def test_expand_with_fields(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(PRICING_RULES_URL, {'fields': 'id,property', 'expand': 'property'})
+        self.assertEqual(res.data, [{
+            'id': PricingRule.objects.get().id,
+            'property': {'id': self.properties[0].id, 'name': 'Property 0', 'base_price': 10.0},
+        }])
+
+    def test_ids_fetch_many_objects(self):
+        ids = f'{self.properties[0].id},{self.properties[2].id}'
+        res = self.client.get(PROPERTIES_URL, {'ids': ids, 'fields': 'id'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['id'] for item in res.data}, {self.properties[0].id, self.properties[2].id})
+
+    def test_retrieve_with_fields(self):
+        booking = self.bookings[0]
+        res = self.client.get(reverse('booking:booking-detail', args=[booking.id]), {'fields': 'final_price'})
+        self.assertEqual(res.data, {'final_price': 100.0})
+
+    def test_invalid_parameters(self):
+        cases = [
+            (BOOKINGS_URL, {'fields': 'id,secret'}, 'fields'),
+            (PROPERTIES_URL, {'expand': 'property'}, 'expand'),
+            (BOOKINGS_URL, {'ids': '1,a'}, 'ids'),
+            (BOOKINGS_URL, {'ids': ','.join(str(i) for i in range(101))}, 'ids'),
+        ]
+        for url, params, error in cases:
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn(error, res.data)
+
+    def test_writes_ignore_sparse_parameters(self):
+        res = self.client.post(f'{PROPERTIES_URL}?fields=id', {'name': 'New', 'base_price': 5})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['name'], 'New')
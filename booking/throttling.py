@@ -0,0 +1,101 @@
+import time
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections, router
+from rest_framework.throttling import BaseThrottle
+
+from core.models import ThrottleBucket
+from reservations.settings import DATE_INPUT_FORMATS
+
+
+# Smaller of two values, which SQLite spells MIN.
+LEAST = {'postgresql': 'LEAST', 'sqlite': 'MIN'}
+
+
+def parse_date(value) -> Optional[datetime]:
+    """
+    Parse a request date in any of the accepted input formats, or return None.
+    """
+    for date_format in DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(str(value), date_format)
+        except ValueError:
+            continue
+    return None
+
+
+class BookingThrottle(BaseThrottle):
+    """
+    Per-client token bucket stored in the default database.
+
+    Each client's bucket holds up to BOOKING_THROTTLE_CAPACITY tokens and refills at
+    BOOKING_THROTTLE_REFILL_RATE tokens per second. Reads cost one token, while
+    creating or updating a booking also costs one token per
+    BOOKING_THROTTLE_NIGHTS_PER_TOKEN nights, since pricing a stay walks every night.
+
+    Tokens are spent with a single upsert that refills the bucket and takes the
+    cost only if the refilled bucket has it, so concurrent requests of a client
+    cannot spend the same tokens, and none of them waits on another for longer
+    than that statement. Buckets are kept in the database rather than in the
+    cache because ``add`` and ``incr`` are not atomic on the file-based cache used
+    in production. A bucket left alone until it is full again is the same as no
+    bucket, so ``purge_throttle_buckets`` can delete it.
+    """
+    timer = time.time
+
+    def __init__(self):
+        self.capacity = settings.BOOKING_THROTTLE_CAPACITY
+        self.refill_rate = settings.BOOKING_THROTTLE_REFILL_RATE
+        self.wait_seconds = None
+
+    def get_cost(self, request, view) -> int:
+        """
+        Estimate the cost of the request in tokens from the stay length, without touching the database.
+        """
+        if request.method not in ('POST', 'PUT', 'PATCH'):
+            return 1
+        data = request.data if hasattr(request.data, 'get') else {}
+        date_start = parse_date(data.get('date_start'))
+        date_end = parse_date(data.get('date_end'))
+        if date_start is None or date_end is None or date_end < date_start:
+            return 1
+        nights = (date_end - date_start).days + 1
+        return min(self.capacity, 1 + nights // settings.BOOKING_THROTTLE_NIGHTS_PER_TOKEN)
+
+    def allow_request(self, request, view) -> bool:
+        ident = self.get_ident(request)
+        cost = self.get_cost(request, view)
+        now = self.timer()
+        if self.spend(ident, cost, now):
+            return True
+
+        bucket = ThrottleBucket.objects.get(ident=ident)
+        tokens = min(self.capacity, bucket.tokens + (now - bucket.updated_at) * self.refill_rate)
+        self.wait_seconds = max(cost - tokens, 0) / self.refill_rate
+        return False
+
+    def spend(self, ident: str, cost: int, now: float) -> bool:
+        """
+        Refill the client's bucket and take ``cost`` tokens from it in one upsert, if it has them.
+
+        A client without a bucket starts with a full one.
+        """
+        connection = connections[router.db_for_write(ThrottleBucket)]
+        table = connection.ops.quote_name(ThrottleBucket._meta.db_table)
+        refill = f'{table}.tokens + (%(now)s - {table}.updated_at) * %(rate)s'
+        refilled = f'{LEAST[connection.vendor]}(%(capacity)s, {refill})'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (ident, tokens, updated_at) VALUES (%(ident)s, %(capacity)s - %(cost)s, %(now)s)
+                ON CONFLICT (ident) DO UPDATE SET tokens = {refilled} - %(cost)s, updated_at = %(now)s
+                WHERE {refilled} >= %(cost)s
+                """,
+                {'ident': ident, 'capacity': float(self.capacity), 'cost': cost, 'now': now, 'rate': self.refill_rate},
+            )
+            return cursor.rowcount == 1
+
+    def wait(self) -> Optional[float]:
+        return self.wait_seconds
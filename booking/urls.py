@@ -8,6 +8,7 @@ router = DefaultRouter()
 router.register('bookings', views.BookingViewSet)
 router.register('properties', views.PropertyViewSet)
 router.register('pricingrules', views.PricingRuleViewSet)
+router.register('analytics', views.BookingRollupViewSet)
 
 app_name = 'booking'
 
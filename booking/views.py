@@ -1,40 +1,202 @@
 from datetime import timedelta, date
-from typing import List, Optional
+from typing import Collection, List, Optional
 
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from django_filters import rest_framework as filters
+from django_filters.utils import translate_validation
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from core.models import Booking, PricingRule, Property
+from core.models import Booking, BookingRollup, PricingRule, Property
 from booking import serializers
-from booking.filters import PropertyFilter, PricingRuleFilter, BookingFilter
-
-
-class PropertyViewSet(viewsets.ModelViewSet):
+from booking.aggregates import property_aggregates
+from booking.caching import CatalogCacheMixin
+from booking.changes import ChangeFeedMixin, record_deletions
+from booking.deletion import delete_property
+from booking.filters import (
+    PropertyFilter, PricingRuleFilter, BookingFilter, BookingRollupFilter, has_applied_filter,
+)
+from booking.idempotency import idempotent
+from booking.mixins import FanOutListMixin, SparseFieldsViewSetMixin
+from booking.pagination import PropertySearchPagination
+from booking.price_index import price_indexes
+from booking.pricing_calendar import upsert_calendar
+from booking.quotes import bump_pricing_version, get_quote
+from booking.rollups import record_booking_change, snapshot
+from booking.search import StayPriceSearch
+from booking.simulation import simulate
+from booking.throttling import BookingThrottle
+from core.sharding import shard_for
+
+
+class PropertyViewSet(CatalogCacheMixin, ChangeFeedMixin, FanOutListMixin, SparseFieldsViewSetMixin,
+                      viewsets.ModelViewSet):
 
     serializer_class = serializers.PropertySerializer
     queryset = Property.objects.all().order_by('-created_at')
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = PropertyFilter
 
+    def wants_aggregates(self) -> bool:
+        """
+        Whether the list or retrieve response should include the aggregates (?aggregates=1).
+        """
+        return self.action in ('list', 'retrieve') and self.request.query_params.get('aggregates') in ('1', 'true')
 
-class PricingRuleViewSet(viewsets.ModelViewSet):
+    def is_cached_request(self, request) -> bool:
+        # Aggregates change with bookings and with the date, which the catalog version does not track.
+        return super().is_cached_request(request) and not (
+            self.wants_aggregates() or PropertyFilter.uses_aggregates(request.query_params)
+        )
+
+    def get_serializer_class(self):
+        if self.wants_aggregates():
+            return serializers.PropertyAggregatesSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.wants_aggregates():
+            queryset = queryset.annotate(**property_aggregates())
+        return queryset
+
+    def perform_destroy(self, instance):
+        delete_property(instance)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        serializer_class=serializers.PropertySearchSerializer,
+        pagination_class=PropertySearchPagination,
+        filter_backends=(),
+    )
+    def search(self, request):
+        """
+        List properties free between date_start and date_end, cheapest total stay price first.
+
+        Optionally only properties whose total is at most max_total.
+        """
+        params = serializers.StaySearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        results = StayPriceSearch(**params.validated_data)
+
+        page = self.paginate_queryset(results)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class PricingRuleViewSet(CatalogCacheMixin, ChangeFeedMixin, FanOutListMixin, SparseFieldsViewSetMixin,
+                         viewsets.ModelViewSet):
 
     serializer_class = serializers.PricingRuleSerializer
     queryset = PricingRule.objects.all().order_by('-created_at')
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = PricingRuleFilter
+    read_only_actions = ('simulate',)
+
+    def perform_create(self, serializer):
+        with transaction.atomic(using=serializer.validated_data['property']._state.db):
+            serializer.save()
+            bump_pricing_version([serializer.instance.property_id])
+
+    def perform_update(self, serializer):
+        old_property_id = serializer.instance.property_id
+        with transaction.atomic(using=serializer.instance._state.db):
+            serializer.save()
+            bump_pricing_version([old_property_id, serializer.instance.property_id])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic(using=instance._state.db):
+            record_deletions(PricingRule, [instance.pk], using=instance._state.db)
+            instance.delete()
+            bump_pricing_version([instance.property_id])
+
+    @action(detail=False, methods=['post'], serializer_class=serializers.PricingCalendarSerializer)
+    def calendar(self, request):
+        """
+        Create or replace the nightly prices of a property for many days at once.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        counts = upsert_calendar(serializer.validated_data['property'], serializer.validated_data['entries'])
+        return Response(counts, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], serializer_class=serializers.PricingSimulationSerializer)
+    def simulate(self, request):
+        """
+        Reprice the bookings starting in a window under proposed rule additions, edits and deletions,
+        without saving them, and return the revenue deltas per property and per changed booking.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response(simulate(data['changes'], data['date_start'], data['date_end'], pricer=BookingViewSet()))
 
+    def get_bulk_queryset(self):
+        """
+        Return the rules matching the filter parameters, requiring at least one applied filter so a bare
+        request, or one whose filters are all blank, cannot match them all.
+        """
+        filterset = filters.DjangoFilterBackend().get_filterset(self.request, self.get_queryset(), self)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        if not has_applied_filter(filterset):
+            raise ValidationError({'filters': 'At least one pricing rule filter is required.'})
+        return filterset.qs
+
+    @action(
+        detail=False,
+        methods=['patch', 'delete'],
+        serializer_class=serializers.PricingRuleBulkUpdateSerializer,
+    )
+    def bulk(self, request):
+        """
+        Update or delete every pricing rule matching the filters with a single statement per shard.
 
-class BookingViewSet(viewsets.ModelViewSet):
+        With ?dry_run=1 only the number of matching rules is returned.
+        """
+        querysets = self.get_bulk_queryset().shard_querysets()
+        if request.method == 'PATCH':
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            values = dict(serializer.validated_data)
+            if 'price_modifier_increment' in values:
+                values['price_modifier'] = F('price_modifier') + values.pop('price_modifier_increment')
+            result_key = 'updated'
+        else:
+            result_key = 'deleted'
+
+        if request.query_params.get('dry_run') in ('1', 'true'):
+            return Response({result_key: sum(queryset.count() for queryset in querysets), 'dry_run': True})
+
+        count = 0
+        for queryset in querysets:
+            with transaction.atomic(using=queryset.db):
+                bump_pricing_version(queryset.values('property'))
+                if request.method == 'PATCH':
+                    count += queryset.update(**values, updated_at=timezone.now())
+                else:
+                    record_deletions(PricingRule, queryset.values_list('pk', flat=True), using=queryset.db)
+                    count += queryset.delete()[0]
+        return Response({result_key: count, 'dry_run': False})
+
+
+class BookingViewSet(ChangeFeedMixin, FanOutListMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing bookings and calculating final prices.
+
+    Booking creation accepts an Idempotency-Key header to make retries safe.
     """
 
     serializer_class = serializers.BookingSerializer
     queryset = Booking.objects.all().order_by('-created_at')
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = BookingFilter
+    throttle_classes = (BookingThrottle,)
 
     def _get_range_dates(self, booking: Booking) -> List[date]:
         """
@@ -62,7 +224,7 @@ class BookingViewSet(viewsets.ModelViewSet):
         """
         return rule.min_stay_length is not None and total_days >= rule.min_stay_length
 
-    def _valid_specific_day_rule(self, rule: PricingRule, range_dates: List[date]) -> bool:
+    def _valid_specific_day_rule(self, rule: PricingRule, range_dates: Collection[date]) -> bool:
         """
         Check if the given rule is valid for a specific day.
 
@@ -79,6 +241,9 @@ class BookingViewSet(viewsets.ModelViewSet):
         """
         Get applicable pricing rules for the booking.
 
+        Only rules whose day or season overlaps the stay are fetched, so the
+        number of rules scanned per night does not grow with the season length.
+
         Args:
             booking: The booking instance.
             range_dates: List of dates for the booking duration.
@@ -87,12 +252,39 @@ class BookingViewSet(viewsets.ModelViewSet):
         Returns:
             List of applicable pricing rules.
         """
-        pricing_rules = PricingRule.objects.filter(property=booking.property)
+        pricing_rules = PricingRule.objects.filter(property=booking.property).filter(
+            Q(min_stay_length__lte=total_days) |
+            Q(specific_day__range=(booking.date_start, booking.date_end)) |
+            Q(date_start__lte=booking.date_end, date_end__gte=booking.date_start) |
+            Q(date_start__isnull=True, weekdays__isnull=False)
+        )
+        stay_days = set(range_dates)
         return [
             rule for rule in pricing_rules
-            if self._valid_min_stay_rule(rule, total_days) or self._valid_specific_day_rule(rule, range_dates)
+            if (self._valid_seasonal_rule(rule, total_days) if rule.is_seasonal else
+                self._valid_min_stay_rule(rule, total_days) or self._valid_specific_day_rule(rule, stay_days))
         ]
 
+    def _valid_seasonal_rule(self, rule: PricingRule, total_days: int) -> bool:
+        """
+        Check if a seasonal rule (date range and/or weekdays) can apply to the stay.
+
+        Unlike other rules, its min_stay_length is an extra condition rather than a rule of its own.
+        """
+        return rule.min_stay_length is None or total_days >= rule.min_stay_length
+
+    def _rule_specificity(self, rule: PricingRule) -> int:
+        """
+        Rank the shape of a rule: specific day, then date range, then weekdays only, then stay length only.
+        """
+        if rule.specific_day is not None:
+            return 3
+        if rule.date_start is not None:
+            return 2
+        if rule.weekdays is not None:
+            return 1
+        return 0
+
     def _select_max_rule(self, applicable_rules: List[PricingRule]) -> Optional[PricingRule]:
         """
         Select the most relevant pricing rule from the list of applicable rules.
@@ -100,7 +292,7 @@ class BookingViewSet(viewsets.ModelViewSet):
         return max(
             applicable_rules,
             key=lambda rule: (
-                rule.specific_day is not None,
+                self._rule_specificity(rule),
                 rule.min_stay_length or 0,
                 rule.price_modifier or 0,
                 rule.fixed_price or 0
@@ -111,6 +303,8 @@ class BookingViewSet(viewsets.ModelViewSet):
         """
         Check if the given rule is applicable for the specified total_days and date.
         """
+        if rule.is_seasonal:
+            return self._valid_seasonal_rule(rule, total_days) and rule.applies_on(date)
         return (
             self._valid_min_stay_rule(rule, total_days) or
             (rule.specific_day is not None and rule.specific_day == date)
@@ -163,18 +357,81 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         return final_price
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('update', 'partial_update'):
+            # The property is needed to price the updated booking.
+            queryset = queryset.select_related('property')
+        if self.action in ('update', 'partial_update', 'destroy'):
+            # The rollups subtract the booking as read here: concurrent writes of the booking must wait for it.
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset
+
+    def _get_quote(self, booking: Booking) -> float:
+        """
+        Return the final price of the booking from the quote cache, pricing it on a miss.
+        """
+        final_price, self.quote_cached = get_quote(
+            booking.property, booking.date_start, booking.date_end, lambda: self._get_indexed_price(booking)
+        )
+        return final_price
+
+    def _get_indexed_price(self, booking: Booking) -> float:
+        """
+        Return the final price of the booking from its property's price index, or night by night past its horizon.
+        """
+        final_price = price_indexes.total(booking, pricer=self)
+        return final_price if final_price is not None else self._get_final_price(booking)
+
+    def perform_create(self, serializer):
+        """
+        Price the booking from the validated data, then insert it with its final price.
+        """
+        booking = Booking(**serializer.validated_data)
+        serializer.save(final_price=self._get_quote(booking))
+        record_booking_change(None, snapshot(serializer.instance))
+
+    def perform_update(self, serializer):
+        """
+        Price the booking with the validated changes applied, then update it in one statement.
+        """
+        booking = serializer.instance
+        old = snapshot(booking)
+        for attr, value in serializer.validated_data.items():
+            setattr(booking, attr, value)
+        serializer.save(final_price=self._get_quote(booking))
+        record_booking_change(old, snapshot(booking))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if hasattr(self, 'quote_cached'):
+            response['X-Quote-Cache'] = 'HIT' if self.quote_cached else 'MISS'
+        return response
+
+    def perform_destroy(self, instance):
+        with transaction.atomic(using=instance._state.db):
+            record_booking_change(snapshot(instance), None)
+            record_deletions(Booking, [instance.pk], using=instance._state.db)
+            instance.delete()
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Delete a booking, holding its row lock from the read to the delete.
+        """
+        with transaction.atomic(using=shard_for(kwargs[self.lookup_field])):
+            return super().destroy(request, *args, **kwargs)
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
         Create a new booking instance and calculate the final price.
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer=serializer)
+        with transaction.atomic(using=serializer.validated_data['property']._state.db):
+            self.perform_create(serializer=serializer)
 
         booking = serializer.instance
-        booking.final_price = self._get_final_price(booking)
-        booking.save(update_fields=['final_price'])
-
         return Response(
             {
                 'final_price': booking.final_price,
@@ -187,12 +444,13 @@ class BookingViewSet(viewsets.ModelViewSet):
         """
         Update a booking instance and calculate the final price.
         """
+        partial = kwargs.pop('partial', False)
+        with transaction.atomic(using=shard_for(kwargs[self.lookup_field])):
+            serializer = self.get_serializer(self.get_object(), data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer=serializer)
 
-        super().update(request, *args, **kwargs)
-        booking = self.get_object()
-        booking.final_price = self._get_final_price(booking)
-        booking.save(update_fields=['final_price'])
-
+        booking = serializer.instance
         return Response(
             {
                 'final_price': booking.final_price,
@@ -200,3 +458,18 @@ class BookingViewSet(viewsets.ModelViewSet):
             },
             status=status.HTTP_200_OK
         )
+
+
+class BookingRollupViewSet(FanOutListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for revenue and occupancy per property and month.
+
+    Reads only the rollup rows, which are kept up to date as bookings are written.
+    """
+
+    serializer_class = serializers.BookingRollupSerializer
+    queryset = BookingRollup.objects.filter(nights__gt=0).annotate(
+        average_nightly_rate=F('revenue') / F('nights')
+    ).order_by('month', 'property_id')
+    filter_backends = (filters.DjangoFilterBackend,)
+    filterset_class = BookingRollupFilter
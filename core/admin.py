@@ -1,8 +1,132 @@
 from django.contrib import admin
+from django.db import transaction
 
+from booking.caching import bump_catalog_version
+from booking.changes import record_deletions
+from booking.deletion import CHILD_MODELS, delete_property
+from booking.quotes import bump_pricing_version
+from booking.rollups import record_booking_change, snapshot
 from core import models
+from core.paginator import EstimatedCountPaginator
 
 
-admin.site.register(models.Property)
-admin.site.register(models.Booking)
-admin.site.register(models.PricingRule)
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows.
+
+    The row count is estimated and the unfiltered total is not counted again,
+    foreign keys use raw id widgets instead of loading every property, and
+    only indexed columns can be sorted on.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    ordering = ('-id',)
+    sortable_by = ('id',)
+
+
+class PropertyAdmin(LargeTableAdmin):
+    """
+    Delete properties with set-based, chunked deletes of their bookings, rules and rollups,
+    and invalidate the cached catalog when properties are edited in the admin.
+    """
+    list_display = ('id', 'name', 'base_price')
+    # Served by the trigram index on UPPER(name) on PostgreSQL.
+    search_fields = ('name',)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_catalog_version(using=obj._state.db)
+
+    def get_deleted_objects(self, objs, request):
+        """
+        Count the related rows for the confirmation page instead of loading and listing each one.
+        """
+        objs = list(objs)
+        model_count = {models.Property._meta.verbose_name_plural: len(objs)}
+        perms_needed = set()
+        for model in CHILD_MODELS:
+            count = model.objects.filter(property__in=objs).count()
+            if not count:
+                continue
+            model_count[model._meta.verbose_name_plural] = count
+            opts = model._meta
+            if self.admin_site.is_registered(model) and not request.user.has_perm(
+                f'{opts.app_label}.delete_{opts.model_name}'
+            ):
+                perms_needed.add(opts.verbose_name)
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        delete_property(obj)
+
+    def delete_queryset(self, request, queryset):
+        for property_obj in queryset:
+            delete_property(property_obj)
+
+
+class PricingRuleAdmin(LargeTableAdmin):
+    """
+    Invalidate the cached catalog and quotes when pricing rules are edited in the admin.
+    """
+    list_display = ('id', 'property', 'specific_day', 'date_start', 'date_end', 'min_stay_length',
+                    'price_modifier', 'fixed_price')
+    list_select_related = ('property',)
+    list_filter = ('specific_day',)
+    sortable_by = ('id', 'specific_day')
+    raw_id_fields = ('property',)
+
+    def save_model(self, request, obj, form, change):
+        if obj.specific_day != obj.calendar_day:
+            # A rule moved to another day is no longer that day's calendar price.
+            obj.calendar_day = None
+        old_property_id = form.initial.get('property') if change else None
+        super().save_model(request, obj, form, change)
+        bump_pricing_version([obj.property_id, old_property_id])
+        bump_catalog_version()
+
+    def delete_model(self, request, obj):
+        record_deletions(models.PricingRule, [obj.pk], using=obj._state.db)
+        super().delete_model(request, obj)
+        bump_pricing_version([obj.property_id])
+        bump_catalog_version()
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        bump_pricing_version(queryset.values('property'))
+        record_deletions(models.PricingRule, queryset.values_list('pk', flat=True), using=queryset.db)
+        super().delete_queryset(request, queryset)
+        bump_catalog_version()
+
+
+class BookingAdmin(LargeTableAdmin):
+    """
+    Keep the booking rollups up to date when bookings are edited in the admin.
+    """
+    list_display = ('id', 'property', 'date_start', 'date_end', 'final_price')
+    list_select_related = ('property',)
+    date_hierarchy = 'date_start'
+    sortable_by = ('id', 'date_start')
+    raw_id_fields = ('property',)
+
+    def save_model(self, request, obj, form, change):
+        old = snapshot(models.Booking.objects.get(pk=obj.pk)) if change else None
+        super().save_model(request, obj, form, change)
+        record_booking_change(old, snapshot(obj))
+
+    def delete_model(self, request, obj):
+        record_booking_change(snapshot(obj), None)
+        record_deletions(models.Booking, [obj.pk], using=obj._state.db)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for booking in queryset:
+            record_booking_change(snapshot(booking), None)
+        record_deletions(models.Booking, queryset.values_list('pk', flat=True), using=queryset.db)
+        super().delete_queryset(request, queryset)
+
+
+admin.site.register(models.Property, PropertyAdmin)
+admin.site.register(models.Booking, BookingAdmin)
+admin.site.register(models.PricingRule, PricingRuleAdmin)
@@ -0,0 +1,86 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks seed their data inside a transaction that is rolled back at the
+end, so they can be run against a development database without leaving rows
+behind.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import QuerySet
+
+
+def require_postgresql() -> None:
+    """
+    Raise a CommandError unless the default database is PostgreSQL.
+    """
+    if connection.vendor != 'postgresql':
+        raise CommandError('This benchmark requires a PostgreSQL database.')
+
+
+@contextmanager
+def rolled_back() -> Iterator[None]:
+    """
+    Run the enclosed block in a transaction that is always rolled back.
+    """
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@contextmanager
+def index_scans_disabled() -> Iterator[None]:
+    """
+    Discourage the planner from using indexes, to measure the plan without them.
+
+    Must be used inside a transaction: the settings are reset when it ends.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_indexscan = off')
+        cursor.execute('SET LOCAL enable_bitmapscan = off')
+        cursor.execute('SET LOCAL enable_indexonlyscan = off')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_indexscan')
+            cursor.execute('RESET enable_bitmapscan')
+            cursor.execute('RESET enable_indexonlyscan')
+
+
+def time_queryset(queryset: QuerySet, repeat: int = 5) -> float:
+    """
+    Evaluate ``queryset`` ``repeat`` times and return the median time in milliseconds.
+    """
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def scan_nodes(queryset: QuerySet) -> str:
+    """
+    Return the scan nodes of the queryset's plan, e.g. ``Bitmap Heap Scan on core_property``.
+    """
+    nodes = []
+    for line in queryset.explain().splitlines():
+        node = line.strip().lstrip('->').strip().split('  (')[0]
+        if 'Scan' in node and node not in nodes:
+            nodes.append(node)
+    return ', '.join(nodes)
+
+
+def analyze(*tables: str) -> None:
+    """
+    Refresh planner statistics for freshly seeded tables.
+    """
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
@@ -0,0 +1,15 @@
+"""
+Database expressions shared by models, filters and indexes.
+"""
+from django.contrib.postgres.fields import DateRangeField
+from django.db.models import Func
+
+
+class DateRange(Func):
+    """
+    PostgreSQL ``daterange(lower, upper, bounds)`` constructor.
+
+    Booking stays are inclusive of both ends, so use ``'[]'`` bounds for them.
+    """
+    function = 'DATERANGE'
+    output_field = DateRangeField()
@@ -0,0 +1,68 @@
+"""
+Measure cold-import costs using the interpreter's ``-X importtime`` report.
+"""
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+
+ImportTiming = namedtuple('ImportTiming', ['name', 'depth', 'self_us', 'cumulative_us'])
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """
+    Parse the ``-X importtime`` lines written by the interpreter to stderr.
+
+    Args:
+        output: The captured stderr of the profiled process.
+
+    Returns:
+        List of import timings in the order they were reported.
+    """
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            # Header line: "import time: self [us] | cumulative | imported package"
+            continue
+        # One separator space, then two spaces of indentation per nesting level.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        timings.append(ImportTiming(name.strip(), depth, int(self_us), int(cumulative_us)))
+    return timings
+
+
+def measure_imports(module: str, extra_env: Optional[Dict[str, str]] = None) -> List[ImportTiming]:
+    """
+    Import ``module`` in a fresh interpreter and return its import timings.
+
+    Args:
+        module: Dotted path of the module to import.
+        extra_env: Environment variables to set in the child process.
+
+    Returns:
+        List of import timings.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    env.update(extra_env or {})
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def total_import_time_ms(timings: List[ImportTiming]) -> float:
+    """
+    Sum the cumulative time of the top-level imports, in milliseconds.
+    """
+    return sum(timing.cumulative_us for timing in timings if timing.depth == 0) / 1000
@@ -0,0 +1,116 @@
+"""
+Helpers for load tests that drive a running server over HTTP.
+
+They only use the standard library, so a load test can run from any machine
+that can reach the server.
+"""
+import json
+import math
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+Stage = namedtuple('Stage', ['users', 'throughput', 'p99'])
+
+
+def json_request(
+    url: str,
+    method: str = 'GET',
+    payload: Optional[dict] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 30,
+) -> Tuple[int, float, Any]:
+    """
+    Send one request and return its status code, latency in milliseconds and decoded JSON body.
+
+    Connection errors and timeouts are reported with status 0. The body is None
+    when the response is not JSON.
+    """
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={
+        'Accept': 'application/json',
+        'Content-Type': 'application/json',
+        **(headers or {}),
+    })
+    started = time.perf_counter()
+    body = b''
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        body = error.read()
+        status = error.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    try:
+        decoded = json.loads(body) if body else None
+    except ValueError:
+        decoded = None
+    return status, elapsed_ms, decoded
+
+
+def timed_request(
+    url: str,
+    method: str = 'GET',
+    payload: Optional[dict] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 30,
+) -> Tuple[int, float]:
+    """
+    Send one request and return its status code and latency in milliseconds.
+    """
+    status, elapsed_ms, _ = json_request(url, method, payload, headers, timeout)
+    return status, elapsed_ms
+
+
+def client_address(index: int) -> str:
+    """
+    Return a distinct private address for the ``index``-th simulated client.
+    """
+    number = index + 1
+    return f'10.{1 + number // 65536}.{number // 256 % 256}.{number % 256}'
+
+
+def is_throttled(status: int) -> bool:
+    return status == 429
+
+
+def is_error(status: int) -> bool:
+    """
+    Whether a response is a failure of the server rather than a success or a throttled request.
+    """
+    return not 200 <= status < 300 and not is_throttled(status)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Return the ``pct`` percentile of ``values`` (nearest rank), or 0 when empty.
+    """
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def find_knee(stages: Sequence[Stage], latency_factor: float = 2.0, min_gain: float = 0.05) -> Optional[int]:
+    """
+    Return the index of the first stage where adding users stopped paying off, or None.
+
+    That is the first stage whose p99 exceeds ``latency_factor`` times the p99 of
+    the first stage, or whose throughput grew less than ``min_gain`` over the
+    best throughput seen so far.
+    """
+    if not stages:
+        return None
+    baseline_p99 = stages[0].p99
+    best_throughput = stages[0].throughput
+    for index, stage in enumerate(stages[1:], start=1):
+        if stage.p99 > latency_factor * baseline_p99 or stage.throughput < best_throughput * (1 + min_gain):
+            return index
+        best_throughput = stage.throughput
+    return None
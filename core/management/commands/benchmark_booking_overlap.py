@@ -0,0 +1,84 @@
+"""
+Django command to benchmark booking date-window filters against the GiST range index
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from booking.filters import BookingFilter
+from core.benchmark import (
+    analyze,
+    index_scans_disabled,
+    require_postgresql,
+    rolled_back,
+    scan_nodes,
+    time_queryset,
+)
+from core.models import Booking, Property
+
+
+class Command(BaseCommand):
+    """Django command to benchmark booking overlap lookups"""
+
+    help = 'Seed bookings (rolled back afterwards) and EXPLAIN/time the overlaps and contains_date filters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--properties', type=int, default=1_000, help='Number of properties to seed.')
+        parser.add_argument('--bookings', type=int, default=1_000, help='Bookings per property.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the median is reported.')
+
+    def seed(self, properties: int, bookings: int) -> int:
+        """
+        Insert properties, each with back-to-back stays of 1 to 7 nights starting in 2000.
+
+        Returns:
+            The id of one of the seeded properties.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO core_property (name, base_price, created_at, updated_at)
+                SELECT 'Property ' || i, 100, now(), now() FROM generate_series(1, %s) AS i
+                RETURNING id
+                """,
+                [properties],
+            )
+            property_ids = [row[0] for row in cursor.fetchall()]
+            # Stay n of a property starts 7 * n days after 2000-01-01 and lasts n % 7 + 1 nights.
+            cursor.execute(
+                """
+                INSERT INTO core_booking (property_id, date_start, date_end, final_price, created_at, updated_at)
+                SELECT p.id, DATE '2000-01-01' + 7 * n, DATE '2000-01-01' + 7 * n + n %% 7, 100, now(), now()
+                FROM core_property AS p, generate_series(0, %s - 1) AS n
+                WHERE p.id BETWEEN %s AND %s
+                """,
+                [bookings, min(property_ids), max(property_ids)],
+            )
+        analyze(Property._meta.db_table, Booking._meta.db_table)
+        return property_ids[0]
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        require_postgresql()
+        with rolled_back():
+            self.stdout.write(self.style.NOTICE(
+                f'Seeding {options["properties"]} properties x {options["bookings"]} bookings...'
+            ))
+            property_id = self.seed(options['properties'], options['bookings'])
+
+            searches = [
+                {'property': property_id, 'overlaps': '03-01-2010,03-31-2010'},
+                {'property': property_id, 'contains_date': '03-15-2010'},
+                {'overlaps': '03-01-2010,03-31-2010'},
+            ]
+            self.stdout.write(f'{"query":<48}{"no index [ms]":>16}{"gist [ms]":>16}  plan')
+            for params in searches:
+                queryset = BookingFilter(params, Booking.objects.order_by('-created_at')).qs
+                with index_scans_disabled():
+                    before = time_queryset(queryset, options['repeat'])
+                after = time_queryset(queryset, options['repeat'])
+                label = '&'.join(f'{key}={value}' for key, value in params.items())
+                self.stdout.write(f'{label:<48}{before:>16.1f}{after:>16.1f}  {scan_nodes(queryset)}')
+
+            queryset = BookingFilter(searches[0], Booking.objects.order_by('-created_at')).qs
+            self.stdout.write(f'\nEXPLAIN ANALYZE for {searches[0]}:')
+            self.stdout.write(queryset.explain(analyze=True, buffers=True))
@@ -0,0 +1,149 @@
+"""
+Django command to compare per-worker and shared price indexes across worker processes
+"""
+import multiprocessing
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from booking.price_index import PriceIndexRegistry
+from booking.shared_price_index import SharedPriceIndexRegistry
+from booking.views import BookingViewSet
+from core.loadtest import percentile
+from core.models import PricingRule, Property
+
+
+def memory_kib() -> Tuple[int, int]:
+    """
+    Return the resident and proportional set sizes of this process, in KiB (Linux only).
+    """
+    sizes = {}
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            name, _, value = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                sizes[name] = int(value.split()[0])
+    return sizes['Rss'], sizes['Pss']
+
+
+def run_worker(mode: str, directory: str, property_ids: List[int], lookups: int, seed: int, results) -> None:
+    """
+    Load the index of every property, then price random stays, as a uWSGI worker would.
+    """
+    registry = SharedPriceIndexRegistry(directory) if mode == 'shared' else PriceIndexRegistry()
+    pricer = BookingViewSet()
+    properties = list(Property.objects.filter(pk__in=property_ids))
+    rss_before, pss_before = memory_kib()
+
+    cold = []
+    for property_obj in properties:
+        started = time.perf_counter()
+        registry.get(property_obj, pricer)
+        cold.append((time.perf_counter() - started) * 1000)
+
+    rng = random.Random(seed)
+    today = date.today()
+    warm = []
+    for _ in range(lookups):
+        property_obj = rng.choice(properties)
+        date_start = today + timedelta(days=rng.randint(0, 300))
+        started = time.perf_counter()
+        registry.get(property_obj, pricer).total(date_start, date_start + timedelta(days=rng.randint(0, 30)))
+        warm.append((time.perf_counter() - started) * 1000)
+
+    rss_after, pss_after = memory_kib()
+    results.put({
+        'cold': cold, 'warm': warm, 'rss': rss_after - rss_before, 'pss': pss_after - pss_before,
+    })
+
+
+class Command(BaseCommand):
+    """Django command to measure the memory and cold lookup latency of the price index modes"""
+
+    help = (
+        'Seed properties with pricing rules, then start --workers processes that each load every '
+        'property\'s price index and price random stays, once with per-worker indexes and once with '
+        'indexes shared through memory-mapped files. Reports the memory the indexes added to the workers '
+        '(RSS and PSS, summed over workers) and the cold and warm lookup latencies.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes, as in scripts/run.sh.')
+        parser.add_argument('--properties', type=int, default=200, help='Properties to seed.')
+        parser.add_argument('--rules', type=int, default=40, help='Pricing rules per property.')
+        parser.add_argument('--lookups', type=int, default=5000, help='Stays priced per worker once warm.')
+
+    def seed(self, properties: int, rules: int) -> List[int]:
+        rng = random.Random(0)
+        today = date.today()
+        property_objs = Property.objects.bulk_create(
+            Property(name=f'Benchmark index {index}', base_price=rng.choice([80, 120, 250]))
+            for index in range(properties)
+        )
+        PricingRule.objects.bulk_create(
+            PricingRule(
+                property=property_obj,
+                price_modifier=rng.choice([-20, -10, 10, 25]),
+                min_stay_length=rng.choice([None, None, None, 3, 7, 14, 28]),
+                specific_day=today + timedelta(days=rng.randint(0, 364)),
+            )
+            for property_obj in property_objs for _ in range(rules)
+        )
+        return [property_obj.pk for property_obj in property_objs]
+
+    def run_mode(self, mode: str, directory: str, property_ids: List[int], options) -> List[Dict]:
+        # Workers must not share the parent's database connection.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(
+                target=run_worker, args=(mode, directory, property_ids, options['lookups'], seed, results)
+            )
+            for seed in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        stats = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        return stats
+
+    def report(self, mode: str, stats: List[Dict]) -> None:
+        cold = [value for worker in stats for value in worker['cold']]
+        warm = [value for worker in stats for value in worker['warm']]
+        self.stdout.write(
+            f'{mode:<12}{sum(worker["rss"] for worker in stats) / 1024:>12.1f}'
+            f'{sum(worker["pss"] for worker in stats) / 1024:>12.1f}'
+            f'{percentile(cold, 50):>12.2f}{percentile(cold, 99):>12.2f}'
+            f'{percentile(warm, 50) * 1000:>14.1f}'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['properties'] > settings.PRICE_INDEX_MAX_PROPERTIES:
+            raise CommandError('--properties cannot be above PRICE_INDEX_MAX_PROPERTIES.')
+
+        self.stdout.write(self.style.NOTICE(
+            f'Seeding {options["properties"]} properties with {options["rules"]} rules each...'
+        ))
+        property_ids = self.seed(options['properties'], options['rules'])
+        directory = tempfile.mkdtemp(prefix='price_index_')
+        try:
+            self.stdout.write(
+                f'{"indexes":<12}{"RSS [MiB]":>12}{"PSS [MiB]":>12}{"cold p50":>12}{"cold p99":>12}'
+                f'{"warm p50 [us]":>14}'
+            )
+            for mode in ('per-worker', 'shared'):
+                self.report(mode, self.run_mode(mode, directory, property_ids, options))
+            self.stdout.write('Cold lookups in ms. Memory is what loading the indexes added, summed over workers.')
+        finally:
+            shutil.rmtree(directory)
+            Property.objects.filter(pk__in=property_ids).delete()
@@ -0,0 +1,85 @@
+"""
+Django command to benchmark the what-if pricing simulation on a property with a large booking history
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from booking.simulation import RuleChanges, edited_copy, simulate
+from booking.views import BookingViewSet
+from core.benchmark import rolled_back
+from core.models import Booking, PricingRule, Property
+
+
+class Command(BaseCommand):
+    """Django command to compare the batch pricing simulation with pricing each booking night by night"""
+
+    help = (
+        'Seed a property with many bookings and pricing rules (rolled back), then time a simulation that edits, '
+        'deletes and adds rules over a year of bookings, and pricing a sample of the same bookings one by one '
+        'with BookingViewSet._get_final_price, extrapolated to all of them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=100_000, help='Number of bookings to seed.')
+        parser.add_argument('--rules', type=int, default=200, help='Pricing rules of the property.')
+        parser.add_argument('--sample', type=int, default=500, help='Bookings priced one by one.')
+
+    def seed(self, bookings: int, rules: int, start: date) -> Property:
+        rng = random.Random(0)
+        property_obj = Property.objects.create(name='Benchmark simulation', base_price=100)
+        PricingRule.objects.bulk_create(
+            PricingRule(
+                property=property_obj,
+                price_modifier=rng.choice([-20, -10, 10, 25]),
+                min_stay_length=rng.choice([None, None, None, 3, 7, 14]),
+                specific_day=start + timedelta(days=rng.randint(0, 364)),
+            )
+            for _ in range(rules)
+        )
+        stays = (start + timedelta(days=rng.randint(0, 364)) for _ in range(bookings))
+        Booking.objects.bulk_create(
+            (
+                Booking(property=property_obj, date_start=stay, date_end=stay + timedelta(days=rng.randint(0, 13)))
+                for stay in stays
+            ),
+            batch_size=5000,
+        )
+        return property_obj
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        start = date.today() + timedelta(days=1)
+        end = start + timedelta(days=364)
+        pricer = BookingViewSet()
+        with rolled_back():
+            self.stdout.write(self.style.NOTICE(
+                f'Seeding a property with {options["bookings"]} bookings and {options["rules"]} rules...'
+            ))
+            property_obj = self.seed(options['bookings'], options['rules'], start)
+            rules = list(PricingRule.objects.filter(property=property_obj).select_related('property'))
+            changes = RuleChanges(
+                added=[PricingRule(property=property_obj, price_modifier=-15, min_stay_length=5)],
+                updated={rule.pk: edited_copy(rule, {'price_modifier': 40}) for rule in rules[:10]},
+                deleted={rule.pk: rule for rule in rules[10:20]},
+            )
+
+            started = time.perf_counter()
+            result = simulate(changes, start, end, pricer)
+            simulation = time.perf_counter() - started
+
+            sample = list(Booking.objects.filter(property=property_obj).select_related('property')[:options['sample']])
+            started = time.perf_counter()
+            for booking in sample:
+                pricer._get_final_price(booking)
+            per_booking = (time.perf_counter() - started) / len(sample) * result['booking_count']
+
+        self.stdout.write(f'{"pricing":<36}{"time [s]":>10}')
+        self.stdout.write(f'{"simulation":<36}{simulation:>10.2f}')
+        self.stdout.write(f'{"_get_final_price, extrapolated":<36}{per_booking:>10.2f}')
+        self.stdout.write(
+            f'{result["booking_count"]} bookings repriced, {result["changed_count"]} changed, '
+            f'revenue delta {result["revenue_delta"]:.2f}.'
+        )
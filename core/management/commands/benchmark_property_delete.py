@@ -0,0 +1,90 @@
+"""
+Django command to benchmark deleting a property with a large booking history
+"""
+import math
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models.signals import post_delete
+
+from booking.deletion import DEFAULT_CHUNK_SIZE, delete_property
+from core.benchmark import analyze, rolled_back
+from core.models import Booking, PricingRule, Property
+
+
+class Command(BaseCommand):
+    """Django command to compare Property.delete() with the chunked property deletion"""
+
+    help = (
+        'Seed a property with many bookings and time its deletion with Property.delete() (rolled back), '
+        'with and without a post_delete receiver on Booking, and with the chunked deletion.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=500_000, help='Number of bookings to seed.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per transaction.')
+
+    def seed(self, bookings: int) -> Property:
+        """
+        Insert a property with ``bookings`` three-night stays and a few pricing rules.
+        """
+        property_obj = Property.objects.create(name='Benchmark delete', base_price=100)
+        first = date(2000, 1, 1)
+        stays = (first + timedelta(days=index % 20000) for index in range(bookings))
+        Booking.objects.bulk_create(
+            (
+                Booking(property=property_obj, date_start=stay, date_end=stay + timedelta(days=2), final_price=300)
+                for stay in stays
+            ),
+            batch_size=5000,
+        )
+        PricingRule.objects.bulk_create(
+            PricingRule(property=property_obj, price_modifier=-index, min_stay_length=7 * index)
+            for index in range(1, 11)
+        )
+        analyze(Booking._meta.db_table)
+        return property_obj
+
+    def measure(self, label: str, delete, transactions: int = 1) -> None:
+        tracemalloc.start()
+        started = time.perf_counter()
+        delete()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{label:<44}{elapsed:>10.2f}{elapsed / transactions:>20.3f}{peak / 1024 / 1024:>14.1f}'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.stdout.write(self.style.NOTICE(f'Seeding a property with {options["bookings"]} bookings...'))
+        property_obj = self.seed(options['bookings'])
+        try:
+            self.stdout.write(
+                f'{"deletion":<44}{"time [s]":>10}{"per transaction [s]":>20}{"peak [MiB]":>14}'
+            )
+            with rolled_back():
+                self.measure('Property.delete()', Property.objects.get(id=property_obj.id).delete)
+            with rolled_back():
+                def receiver(**kwargs):
+                    pass
+                post_delete.connect(receiver, sender=Booking)
+                try:
+                    self.measure(
+                        'Property.delete(), Booking receiver connected', Property.objects.get(id=property_obj.id).delete
+                    )
+                finally:
+                    post_delete.disconnect(receiver, sender=Booking)
+            # One transaction per chunk of bookings and one for the property, with its rules and rollups.
+            chunks = math.ceil(options['bookings'] / options['chunk_size'])
+            self.measure(
+                f'chunked, {chunks} transactions of {options["chunk_size"]}',
+                lambda: delete_property(property_obj, options['chunk_size']),
+                transactions=chunks + 1,
+            )
+        finally:
+            if property_obj.id is not None:
+                delete_property(property_obj, options['chunk_size'])
@@ -0,0 +1,102 @@
+"""
+Django command to benchmark the property search by total stay price
+"""
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from booking.search import StayPriceSearch
+from core.benchmark import analyze, require_postgresql, rolled_back
+from core.models import Booking, PricingRule, Property
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the stay price search"""
+
+    help = 'Seed properties, rules and bookings (rolled back afterwards) and time the stay price search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--properties', type=int, default=100_000, help='Number of properties to seed.')
+        parser.add_argument('--repeat', type=int, default=5, help='Searches per stay; the median is reported.')
+        parser.add_argument(
+            '--target-ms',
+            type=float,
+            default=1000,
+            help='Fail when the median latency of a search page exceeds this.',
+        )
+
+    def seed(self, properties: int) -> None:
+        """
+        Insert properties with two min-stay tiers, a few specific-day rules and weekly bookings in 2030.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO core_property (name, base_price, created_at, updated_at)
+                SELECT 'Property ' || i, 50 + i %% 150, now(), now() FROM generate_series(1, %s) AS i
+                RETURNING id
+                """,
+                [properties],
+            )
+            property_ids = [row[0] for row in cursor.fetchall()]
+            bounds = [min(property_ids), max(property_ids)]
+            cursor.execute(
+                """
+                INSERT INTO core_pricingrule
+                    (property_id, price_modifier, min_stay_length, fixed_price, specific_day, created_at, updated_at)
+                SELECT p.id, -5 * tier, 7 * tier, NULL, NULL, now(), now()
+                FROM core_property AS p, generate_series(1, 2) AS tier
+                WHERE p.id BETWEEN %s AND %s
+                UNION ALL
+                SELECT p.id, NULL, NULL, 20 + day, DATE '2030-01-01' + (p.id + 17 * day) %% 365, now(), now()
+                FROM core_property AS p, generate_series(1, 10) AS day
+                WHERE p.id BETWEEN %s AND %s
+                """,
+                bounds + bounds,
+            )
+            cursor.execute(
+                """
+                INSERT INTO core_booking (property_id, date_start, date_end, final_price, created_at, updated_at)
+                SELECT p.id, DATE '2030-01-01' + 7 * week + p.id %% 7, DATE '2030-01-01' + 7 * week + p.id %% 7 + 2,
+                       300, now(), now()
+                FROM core_property AS p, generate_series(0, 51) AS week
+                WHERE p.id BETWEEN %s AND %s AND (p.id + week) %% 3 = 0
+                """,
+                bounds,
+            )
+        analyze(Property._meta.db_table, PricingRule._meta.db_table, Booking._meta.db_table)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        require_postgresql()
+        stays = [
+            (date(2030, 3, 2), date(2030, 3, 4)),
+            (date(2030, 6, 1), date(2030, 6, 10)),
+            (date(2030, 7, 1), date(2030, 7, 31)),
+        ]
+        with rolled_back():
+            self.stdout.write(self.style.NOTICE(f'Seeding {options["properties"]} properties...'))
+            self.seed(options['properties'])
+
+            self.stdout.write(f'{"stay":<28}{"matches":>10}{"count [ms]":>14}{"page [ms]":>14}')
+            slowest = 0
+            for date_start, date_end in stays:
+                search = StayPriceSearch(date_start, date_end, max_total=5000)
+                count_timings, page_timings = [], []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    matches = search.count()
+                    count_timings.append((time.perf_counter() - started) * 1000)
+                    started = time.perf_counter()
+                    search[0:20]
+                    page_timings.append((time.perf_counter() - started) * 1000)
+                count_ms, page_ms = statistics.median(count_timings), statistics.median(page_timings)
+                slowest = max(slowest, count_ms + page_ms)
+                self.stdout.write(f'{f"{date_start} - {date_end}":<28}{matches:>10}{count_ms:>14.1f}{page_ms:>14.1f}')
+
+            if slowest > options['target_ms']:
+                raise CommandError(f'Slowest search took {slowest:.1f} ms, above the {options["target_ms"]} ms target.')
+            self.stdout.write(self.style.SUCCESS(f'Slowest search: {slowest:.1f} ms'))
@@ -0,0 +1,76 @@
+"""
+Django command to benchmark property name search with and without the trigram index
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from booking.filters import PropertyFilter
+from core.benchmark import (
+    analyze,
+    index_scans_disabled,
+    require_postgresql,
+    rolled_back,
+    scan_nodes,
+    time_queryset,
+)
+from core.models import Property
+
+
+WORDS = [
+    'Beach', 'Mountain', 'Lake', 'City', 'Forest', 'River', 'Desert', 'Island',
+    'House', 'Cabin', 'Flat', 'Villa', 'Loft', 'Studio', 'Cottage', 'Suite',
+]
+
+SEARCHES = [
+    {'name': 'beach villa'},
+    {'search': 'beach villa'},
+    {'search': 'mountin cabin'},
+    {'search': '4f2a'},
+]
+
+
+class Command(BaseCommand):
+    """Django command to benchmark property search"""
+
+    help = 'Seed properties (rolled back afterwards) and time name searches with and without the trigram index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of properties to seed.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the median is reported.')
+
+    def seed(self, rows: int) -> None:
+        """
+        Insert ``rows`` properties with names like ``Beach Villa 4f2a9c``.
+        """
+        words = ', '.join(f"'{word}'" for word in WORDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO core_property (name, base_price, created_at, updated_at)
+                SELECT
+                    (ARRAY[{words}])[1 + i %% 8] || ' ' || (ARRAY[{words}])[9 + (i / 8) %% 8]
+                        || ' ' || substr(md5(i::text), 1, 6),
+                    10 + i %% 200,
+                    now(),
+                    now()
+                FROM generate_series(1, %s) AS i
+                """,
+                [rows],
+            )
+        analyze(Property._meta.db_table)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        require_postgresql()
+        with rolled_back():
+            self.stdout.write(self.style.NOTICE(f'Seeding {options["rows"]} properties...'))
+            self.seed(options['rows'])
+
+            self.stdout.write(f'{"query":<28}{"no index [ms]":>16}{"trigram [ms]":>16}  plan')
+            for params in SEARCHES:
+                queryset = PropertyFilter(params, Property.objects.order_by('-created_at')).qs[:20]
+                with index_scans_disabled():
+                    before = time_queryset(queryset, options['repeat'])
+                after = time_queryset(queryset, options['repeat'])
+                label = '&'.join(f'{key}={value}' for key, value in params.items())
+                self.stdout.write(f'{label:<28}{before:>16.1f}{after:>16.1f}  {scan_nodes(queryset)}')
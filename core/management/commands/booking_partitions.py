@@ -0,0 +1,66 @@
+"""
+Django command to maintain the monthly partitions of the booking table
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.partitioning import (
+    ARCHIVE_SCHEMA,
+    add_months,
+    archive_partition,
+    create_partition,
+    is_partitioned,
+    list_partitions,
+    month_start,
+)
+
+
+class Command(BaseCommand):
+    """Django command to create upcoming booking partitions and archive old ones"""
+
+    help = (
+        'Create the monthly booking partitions for the coming months and, with --archive-after-months, '
+        f'detach the partitions of older stays into the "{ARCHIVE_SCHEMA}" schema (or drop them with --drop).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=12, help='Months to create partitions for.')
+        parser.add_argument(
+            '--archive-after-months',
+            type=int,
+            default=None,
+            help='Archive partitions whose month ended more than this many months ago.',
+        )
+        parser.add_argument('--drop', action='store_true', help='Drop archived partitions instead of keeping them.')
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS, help='Database (e.g. booking shard) to maintain partitions on.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        connection = connections[options['database']]
+        if not is_partitioned(connection):
+            raise CommandError('The booking table is not partitioned (PostgreSQL only, see core migration 0005).')
+
+        current = month_start(date.today())
+        with transaction.atomic(using=options['database']):
+            for months in range(options['months_ahead'] + 1):
+                month = add_months(current, months)
+                if create_partition(month, connection):
+                    self.stdout.write(f'Created partition for {month:%Y-%m}.')
+
+            if options['archive_after_months'] is not None:
+                cutoff = add_months(current, -options['archive_after_months'])
+                for partition in list_partitions(connection):
+                    if partition.end <= cutoff:
+                        archive_partition(partition, drop=options['drop'], connection=connection)
+                        action = 'Dropped' if options['drop'] else f'Archived to {ARCHIVE_SCHEMA}:'
+                        self.stdout.write(f'{action} {partition.name}.')
+
+        partitions = list_partitions(connection)
+        if partitions:
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(partitions)} partitions from {partitions[0].start:%Y-%m} to {partitions[-1].start:%Y-%m}.'
+            ))
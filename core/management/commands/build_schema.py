@@ -0,0 +1,56 @@
+"""
+Django command to pre-generate the OpenAPI schema as static files
+"""
+import glob
+import gzip
+import hashlib
+import json
+import os
+
+from django.core.management.base import BaseCommand
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+from reservations.schema import SCHEMA_MANIFEST, get_schema_dir
+
+
+class Command(BaseCommand):
+    """Django command to build the static OpenAPI schema"""
+
+    help = 'Generate the OpenAPI schema once and store it, gzipped and content-hashed, in STATIC_ROOT.'
+
+    def _write(self, path: str, content: bytes) -> None:
+        """
+        Write ``content`` to ``path`` along with a gzipped copy for nginx's gzip_static.
+        """
+        with open(path, 'wb') as schema_file:
+            schema_file.write(content)
+        with gzip.GzipFile(f'{path}.gz', 'wb', compresslevel=9, mtime=0) as gzip_file:
+            gzip_file.write(content)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+        schema = generator.get_schema(request=None, public=True)
+        json_content = OpenApiJsonRenderer().render(schema, renderer_context={})
+        yaml_content = OpenApiYamlRenderer().render(schema, renderer_context={})
+
+        schema_dir = get_schema_dir()
+        os.makedirs(schema_dir, exist_ok=True)
+
+        content_hash = hashlib.sha256(json_content).hexdigest()[:12]
+        hashed_name = f'schema.{content_hash}.json'
+
+        # Hashed copies from previous builds can no longer be referenced.
+        for stale_path in glob.glob(os.path.join(schema_dir, 'schema.*.json*')):
+            if not os.path.basename(stale_path).startswith(hashed_name):
+                os.remove(stale_path)
+
+        self._write(os.path.join(schema_dir, hashed_name), json_content)
+        self._write(os.path.join(schema_dir, 'schema.json'), json_content)
+        self._write(os.path.join(schema_dir, 'schema.yaml'), yaml_content)
+
+        with open(os.path.join(schema_dir, SCHEMA_MANIFEST), 'w') as manifest_file:
+            json.dump({'json': hashed_name}, manifest_file)
+
+        self.stdout.write(self.style.SUCCESS(f'OpenAPI schema written to {schema_dir}/{hashed_name}'))
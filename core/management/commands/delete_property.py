@@ -0,0 +1,37 @@
+"""
+Django command to delete a property with a large booking history
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.deletion import DEFAULT_CHUNK_SIZE, delete_property
+from core.models import Property
+
+
+class Command(BaseCommand):
+    """Django command to delete properties outside of a web worker, in short transactions"""
+
+    help = (
+        'Delete properties with their bookings, pricing rules and rollups, --chunk-size rows per transaction, '
+        'recording tombstones for the change feed and invalidating the cached catalog.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('property_ids', nargs='+', type=int, help='Ids of the properties to delete.')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Related rows deleted per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        properties = Property.objects.filter(id__in=options['property_ids'])
+        missing = set(options['property_ids']) - {property_obj.id for property_obj in properties}
+        if missing:
+            raise CommandError(f'Properties not found: {", ".join(map(str, sorted(missing)))}.')
+        for property_obj in properties:
+            property_id = property_obj.id
+            counts = delete_property(property_obj, options['chunk_size'])
+            summary = ', '.join(f'{label}: {count}' for label, count in counts.items())
+            self.stdout.write(self.style.SUCCESS(f'Deleted property {property_id} ({summary}).'))
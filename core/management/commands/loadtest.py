@@ -0,0 +1,184 @@
+"""
+Django command to load test a running server with a closed-loop request mix
+"""
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from booking.scenarios import SCENARIOS, VirtualUser, pick_scenario
+from core.loadtest import Stage, client_address, find_knee, is_error, is_throttled, json_request, percentile
+
+
+class Command(BaseCommand):
+    """Django command to ramp closed-loop virtual users against a running server"""
+
+    help = (
+        'Drive the booking API of a running server with a weighted mix of scenarios. Each virtual user sends '
+        'its next request as soon as the previous one is answered. Load is ramped through the given user '
+        'counts, reporting throughput and latency percentiles per endpoint and the knee where latency degrades.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the running server.')
+        parser.add_argument(
+            '--users',
+            default='1,2,4,8,16,32',
+            help='Comma-separated number of concurrent virtual users for each stage.',
+        )
+        parser.add_argument('--stage-duration', type=float, default=30, help='Seconds per stage.')
+        parser.add_argument('--think-time-ms', type=float, default=0, help='Pause between requests of a user.')
+        parser.add_argument(
+            '--properties',
+            type=int,
+            default=50,
+            help='Properties to spread requests over; missing ones are created through the API.',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable runs.')
+        parser.add_argument(
+            '--latency-factor',
+            type=float,
+            default=2.0,
+            help='The knee is where p99 exceeds this multiple of the first stage p99, or throughput stops growing.',
+        )
+
+    def prepare_properties(self, base_url: str, count: int, rng: random.Random) -> List[int]:
+        """
+        Return the ids of ``count`` properties, creating them with a few pricing rules if needed.
+        """
+        status, _, properties = json_request(f'{base_url}{reverse("booking:property-list")}')
+        if status != 200:
+            raise CommandError(f'Could not list properties at {base_url} ({status}).')
+        property_ids = [item['id'] for item in properties][:count]
+
+        for index in range(len(property_ids), count):
+            status, _, created = json_request(
+                f'{base_url}{reverse("booking:property-list")}',
+                'POST',
+                {'name': f'Load test property {index + 1}', 'base_price': rng.randrange(50, 300)},
+            )
+            if status != 201:
+                raise CommandError(f'Could not create a property ({status}): {created}')
+            property_ids.append(created['id'])
+            for rule in ({'min_stay_length': 7, 'price_modifier': -10}, {'min_stay_length': 30, 'price_modifier': -20}):
+                json_request(
+                    f'{base_url}{reverse("booking:pricingrule-list")}', 'POST', {'property': created['id'], **rule}
+                )
+        return property_ids
+
+    def run_user(
+        self,
+        base_url: str,
+        user: VirtualUser,
+        think_time: float,
+        stop: threading.Event,
+        results: List[Tuple[str, int, float]],
+    ) -> None:
+        """
+        Send requests back to back until the stage ends, from the user's own address.
+        """
+        headers = {'X-Forwarded-For': user.address}
+        while not stop.is_set():
+            scenario = pick_scenario(user)
+            request = scenario.build(user)
+            status, elapsed_ms, body = json_request(
+                f'{base_url}{request.path}', request.method, request.payload, headers
+            )
+            if not stop.is_set():
+                results.append((scenario.name, status, elapsed_ms))
+            if request.method == 'POST' and status == 201 and isinstance(body, dict):
+                user.booking_ids.append(body['id'])
+            if think_time:
+                time.sleep(think_time)
+
+    def run_stage(self, options, users: List[VirtualUser]) -> List[Tuple[str, int, float]]:
+        """
+        Run the given virtual users concurrently for one stage.
+        """
+        stop = threading.Event()
+        results: List[Tuple[str, int, float]] = []
+        with ThreadPoolExecutor(max_workers=len(users)) as executor:
+            for user in users:
+                executor.submit(
+                    self.run_user, options['url'], user, options['think_time_ms'] / 1000, stop, results
+                )
+            time.sleep(options['stage_duration'])
+            stop.set()
+        return results
+
+    def report_stage(self, user_count: int, duration: float, results: List[Tuple[str, int, float]]) -> Stage:
+        """
+        Print per-endpoint throughput and latency percentiles for one stage and return its summary.
+        """
+        by_scenario: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for name, status, elapsed_ms in results:
+            by_scenario[name].append((status, elapsed_ms))
+
+        self.stdout.write(self.style.NOTICE(f'\n{user_count} users'))
+        self.stdout.write(
+            f'{"endpoint":<22}{"req/s":>9}{"errors":>8}{"429":>8}{"p50 [ms]":>11}{"p95 [ms]":>11}{"p99 [ms]":>11}'
+        )
+        rows = [(scenario.name, by_scenario.get(scenario.name, [])) for scenario in SCENARIOS]
+        rows.append(('total', [(status, elapsed_ms) for _, status, elapsed_ms in results]))
+        for name, samples in rows:
+            latencies = [elapsed_ms for _, elapsed_ms in samples]
+            errors = sum(1 for status, _ in samples if is_error(status))
+            throttled = sum(1 for status, _ in samples if is_throttled(status))
+            self.stdout.write(
+                f'{name:<22}{len(samples) / duration:>9.1f}{errors:>8}{throttled:>8}{percentile(latencies, 50):>11.1f}'
+                f'{percentile(latencies, 95):>11.1f}{percentile(latencies, 99):>11.1f}'
+            )
+
+        failed = Counter(status for _, status, _ in results if is_error(status))
+        if failed:
+            breakdown = ', '.join(f'{status or "no response"}: {count}' for status, count in sorted(failed.items()))
+            self.stdout.write(self.style.WARNING(f'Errors by status: {breakdown}'))
+        if any(is_throttled(status) for _, status, _ in results):
+            self.stdout.write(self.style.WARNING(
+                'Some requests were throttled (429) and count as neither errors nor successful requests. '
+                'Behind nginx the virtual users share one bucket unless the server runs with NUM_PROXIES=2; '
+                'otherwise raise BOOKING_THROTTLE_CAPACITY to measure capacity.'
+            ))
+
+        successful = [elapsed_ms for _, status, elapsed_ms in results if 200 <= status < 300]
+        return Stage(user_count, len(successful) / duration, percentile(successful, 99))
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        options['url'] = options['url'].rstrip('/')
+        try:
+            user_counts = [int(users) for users in options['users'].split(',')]
+        except ValueError:
+            raise CommandError('--users must be a comma-separated list of integers.')
+
+        rng = random.Random(options['seed'])
+        property_ids = self.prepare_properties(options['url'], options['properties'], rng)
+        users = [
+            VirtualUser(property_ids, random.Random(options['seed'] * 1000 + index), address=client_address(index))
+            for index in range(max(user_counts))
+        ]
+
+        stages = []
+        for user_count in user_counts:
+            results = self.run_stage(options, users[:user_count])
+            stages.append(self.report_stage(user_count, options['stage_duration'], results))
+
+        self.stdout.write(self.style.NOTICE('\nSummary'))
+        self.stdout.write(f'{"users":>6}{"successful req/s":>18}{"p99 [ms]":>11}')
+        for stage in stages:
+            self.stdout.write(f'{stage.users:>6}{stage.throughput:>18.1f}{stage.p99:>11.1f}')
+
+        knee = find_knee(stages, options['latency_factor'])
+        if knee is None:
+            self.stdout.write(self.style.SUCCESS('No knee found: throughput kept growing with flat latency.'))
+        else:
+            sustained = stages[knee - 1]
+            self.stdout.write(self.style.SUCCESS(
+                f'Knee at {stages[knee].users} users; sustained capacity is about {sustained.throughput:.1f} req/s '
+                f'at {sustained.users} users (p99 {sustained.p99:.1f} ms).'
+            ))
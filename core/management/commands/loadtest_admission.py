@@ -0,0 +1,96 @@
+"""
+Django command to load test booking admission control against a running server
+"""
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Counter as CounterType, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import percentile, timed_request
+
+
+class Command(BaseCommand):
+    """Django command to compare normal traffic latency with and without an abusive client"""
+
+    help = (
+        'Measure the p99 latency of normal booking traffic against a running server, then again while '
+        'an abusive client sends bursts of multi-year bookings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the running server.')
+        parser.add_argument('--property', type=int, required=True, help='Id of the property to book.')
+        parser.add_argument('--duration', type=float, default=20, help='Seconds per phase.')
+        parser.add_argument('--clients', type=int, default=4, help='Concurrent normal clients.')
+        parser.add_argument('--abusive-threads', type=int, default=8, help='Concurrent abusive requests.')
+        parser.add_argument('--abusive-nights', type=int, default=3 * 365, help='Stay length of abusive bookings.')
+
+    def normal_client(self, options, client: int, stop: threading.Event, latencies: List[float]) -> None:
+        """
+        Book short stays and list bookings, each client from its own address.
+        """
+        headers = {'X-Forwarded-For': f'10.0.1.{client}'}
+        bookings_url = f'{options["url"]}/api/booking/bookings/'
+        day = date(2030, 1, 1) + timedelta(days=client)
+        while not stop.is_set():
+            payload = {
+                'property': options['property'],
+                'date_start': day.strftime('%m-%d-%Y'),
+                'date_end': (day + timedelta(days=3)).strftime('%m-%d-%Y'),
+            }
+            for method, url, body in (('POST', bookings_url, payload), ('GET', f'{bookings_url}?limit=20', None)):
+                _, ms = timed_request(url, method, body, headers)
+                latencies.append(ms)
+
+    def abusive_client(self, options, stop: threading.Event, statuses: CounterType[int]) -> None:
+        """
+        Send multi-year bookings in a tight loop from a single address.
+        """
+        payload = {
+            'property': options['property'],
+            'date_start': '01-01-2030',
+            'date_end': (date(2030, 1, 1) + timedelta(days=options['abusive_nights'] - 1)).strftime('%m-%d-%Y'),
+        }
+        while not stop.is_set():
+            status, _ = timed_request(
+                f'{options["url"]}/api/booking/bookings/', 'POST', payload, {'X-Forwarded-For': '10.0.2.1'}
+            )
+            statuses[status] += 1
+
+    def run_phase(self, options, abusive: bool):
+        """
+        Run the normal clients, plus the abusive ones if requested, for the phase duration.
+        """
+        stop = threading.Event()
+        latencies: List[float] = []
+        statuses: CounterType[int] = Counter()
+        workers = options['clients'] + (options['abusive_threads'] if abusive else 0)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for client in range(options['clients']):
+                executor.submit(self.normal_client, options, client, stop, latencies)
+            if abusive:
+                for _ in range(options['abusive_threads']):
+                    executor.submit(self.abusive_client, options, stop, statuses)
+            time.sleep(options['duration'])
+            stop.set()
+        return latencies, statuses
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        options['url'] = options['url'].rstrip('/')
+        status, _ = timed_request(f'{options["url"]}/api/booking/properties/{options["property"]}/')
+        if status != 200:
+            raise CommandError(f'Property {options["property"]} is not reachable at {options["url"]} ({status}).')
+
+        self.stdout.write(f'{"phase":<20}{"requests":>10}{"p50 [ms]":>12}{"p99 [ms]":>12}')
+        for name, abusive in (('normal', False), ('normal + abusive', True)):
+            latencies, statuses = self.run_phase(options, abusive)
+            self.stdout.write(
+                f'{name:<20}{len(latencies):>10}{percentile(latencies, 50):>12.1f}{percentile(latencies, 99):>12.1f}'
+            )
+        breakdown = ', '.join(f'{code}: {count}' for code, count in sorted(statuses.items()))
+        self.stdout.write(self.style.SUCCESS(f'Abusive client responses: {breakdown}'))
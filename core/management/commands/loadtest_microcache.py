@@ -0,0 +1,68 @@
+"""
+Django command to check the proxy micro-cache against a running stack
+"""
+import time
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core.loadtest import json_request
+
+
+class Command(BaseCommand):
+    """Django command to show a burst of identical GETs reaching Django once"""
+
+    help = (
+        'Send a burst of identical property list requests through the nginx proxy and count, from the '
+        'X-Cache-Status header, how many reached Django. Then create a property and check the cached list '
+        'picks it up once the micro-cache TTL is over.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost', help='Base URL of the nginx proxy.')
+        parser.add_argument('--host', default=None, help='Host header to send, if the URL host is not allowed.')
+        parser.add_argument('--burst', type=int, default=50, help='Number of concurrent identical requests.')
+
+    def get(self, url: str, host: Optional[str]) -> Tuple[int, str, str]:
+        """
+        Return the status, X-Cache-Status header and body of a GET request.
+        """
+        headers = {'Accept': 'application/json', **({'Host': host} if host else {})}
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.headers.get('X-Cache-Status', ''), response.read().decode()
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        base_url, host = options['url'].rstrip('/'), options['host']
+        # A query parameter Django ignores gives this run its own cache entry.
+        url = f'{base_url}{reverse("booking:property-list")}?run={uuid.uuid4().hex}'
+
+        with ThreadPoolExecutor(max_workers=options['burst']) as executor:
+            results = list(executor.map(lambda _: self.get(url, host), range(options['burst'])))
+        cache_statuses = Counter(cache_status or 'none' for _, cache_status, _ in results)
+        self.stdout.write(f'Burst of {options["burst"]} requests: {dict(cache_statuses)}')
+        upstream = sum(cache_statuses[name] for name in ('MISS', 'EXPIRED', 'BYPASS', 'none'))
+        if upstream != 1:
+            raise CommandError(f'{upstream} requests of the burst reached Django, expected 1.')
+
+        name = f'Micro-cache check {uuid.uuid4().hex[:8]}'
+        headers = {'Host': host} if host else {}
+        status, _, _ = json_request(
+            f'{base_url}{reverse("booking:property-list")}', 'POST', {'name': name, 'base_price': 1}, headers
+        )
+        if status != 201:
+            raise CommandError(f'Could not create a property ({status}).')
+        time.sleep(settings.API_CACHE_MAX_AGE + 1)
+        _, cache_status, body = self.get(url, host)
+        if name not in body:
+            raise CommandError(f'The cached list did not pick up the new property ({cache_status}).')
+        self.stdout.write(self.style.SUCCESS(
+            f'Only one request of the burst reached Django, and the list was refreshed after a write ({cache_status}).'
+        ))
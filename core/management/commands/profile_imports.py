@@ -0,0 +1,54 @@
+"""
+Django command to report the cold-import costs of the project
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.importtime import measure_imports, total_import_time_ms
+
+
+class Command(BaseCommand):
+    """Django command to profile startup imports"""
+
+    help = 'Report -X importtime cumulative costs for importing a module in a fresh interpreter.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--module',
+            default=settings.WSGI_APPLICATION.rsplit('.', 1)[0],
+            help='Module to import (defaults to the WSGI module).',
+        )
+        parser.add_argument('--limit', type=int, default=25, help='Number of rows to show.')
+        parser.add_argument(
+            '--by-package',
+            action='store_true',
+            help='Aggregate self time by top-level package instead of listing modules.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        timings = measure_imports(options['module'])
+
+        if options['by_package']:
+            totals = defaultdict(int)
+            for timing in timings:
+                totals[timing.name.split('.')[0]] += timing.self_us
+            rows = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        else:
+            rows = sorted(
+                ((timing.name, timing.cumulative_us) for timing in timings),
+                key=lambda item: item[1],
+                reverse=True,
+            )
+
+        header = 'self [ms]' if options['by_package'] else 'cumulative [ms]'
+        self.stdout.write(f'{header:>16}  name')
+        for name, micros in rows[:options['limit']]:
+            self.stdout.write(f'{micros / 1000:>16.1f}  {name}')
+
+        total = total_import_time_ms(timings)
+        budget = settings.IMPORT_TIME_BUDGET_MS
+        style = self.style.SUCCESS if total <= budget else self.style.ERROR
+        self.stdout.write(style(f'\nTotal import time: {total:.1f} ms (budget {budget} ms)'))
@@ -0,0 +1,22 @@
+"""
+Django command to delete expired idempotency keys
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    """Django command to purge idempotency keys older than IDEMPOTENCY_KEY_TTL"""
+
+    help = 'Delete the stored responses of Idempotency-Key requests older than IDEMPOTENCY_KEY_TTL seconds.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        expired_before = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expired_before).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys.'))
@@ -0,0 +1,24 @@
+"""
+Django command to delete booking throttle buckets that are full again
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import ThrottleBucket
+
+
+class Command(BaseCommand):
+    """Django command to purge the throttle buckets of clients idle long enough for them to refill"""
+
+    help = (
+        'Delete the booking throttle buckets not used for BOOKING_THROTTLE_CAPACITY / '
+        'BOOKING_THROTTLE_REFILL_RATE seconds. They are full again, like the bucket of a new client.'
+    )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        refilled_before = time.time() - settings.BOOKING_THROTTLE_CAPACITY / settings.BOOKING_THROTTLE_REFILL_RATE
+        deleted, _ = ThrottleBucket.objects.filter(updated_at__lt=refilled_before).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} full throttle buckets.'))
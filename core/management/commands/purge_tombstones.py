@@ -0,0 +1,24 @@
+"""
+Django command to delete tombstones the change feed no longer serves
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+from core.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    """Django command to purge tombstones older than CHANGE_FEED_TOMBSTONE_TTL"""
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        expired_before = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_TOMBSTONE_TTL)
+        deleted = sum(
+            Tombstone.objects.using(shard).filter(deleted_at__lt=expired_before).delete()[0]
+            for shard in shard_aliases()
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired tombstones.'))
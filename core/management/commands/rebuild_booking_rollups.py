@@ -0,0 +1,16 @@
+"""
+Django command to rebuild the booking rollups from the bookings
+"""
+from django.core.management.base import BaseCommand
+
+from booking.rollups import rebuild_rollups
+from core.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    """Django command to recompute the monthly revenue and occupancy rollups"""
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rows = sum(rebuild_rollups(using=shard) for shard in shard_aliases())
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} booking rollup rows.'))
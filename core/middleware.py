@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+
+
+class LoadSheddingMiddleware:
+    """
+    Reject requests that queued too long before reaching a worker.
+
+    nginx stamps each request with ``X-Request-Start: t=<seconds>``. When every
+    uWSGI worker is busy, requests pile up in the listen queue; once the wait
+    exceeds LOAD_SHEDDING_MAX_QUEUE_MS the client has likely given up or is about
+    to, so the request is answered right away with a 503 and ``Retry-After``
+    instead of occupying a worker.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def queue_time_ms(self, request) -> float:
+        """
+        Return how long the request waited since nginx received it, or 0 if unknown.
+        """
+        header = request.META.get('HTTP_X_REQUEST_START', '')
+        try:
+            started = float(header.removeprefix('t='))
+        except ValueError:
+            return 0
+        return max(0, (time.time() - started) * 1000)
+
+    def __call__(self, request):
+        max_queue_ms = settings.LOAD_SHEDDING_MAX_QUEUE_MS
+        if max_queue_ms and self.queue_time_ms(request) > max_queue_ms:
+            response = JsonResponse({'detail': 'Server is overloaded, retry later.'}, status=503)
+            response['Retry-After'] = str(settings.LOAD_SHEDDING_RETRY_AFTER)
+            return response
+        return self.get_response(request)
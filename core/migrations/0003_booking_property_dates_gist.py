@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-18 22:36
+
+import core.expressions
+import core.operations
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_property_name_trgm_idx'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        core.operations.PostgresOnlyAddIndex(
+            model_name='booking',
+            index=django.contrib.postgres.indexes.GistIndex(models.F('property'), core.expressions.DateRange('date_start', 'date_end', models.Value('[]')), name='booking_property_dates_gist'),
+        ),
+    ]
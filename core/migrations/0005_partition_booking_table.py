@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from core import partitioning
+
+
+def partition_booking_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        partitioning.partition_booking_table(connection=schema_editor.connection)
+
+
+def unpartition_booking_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        partitioning.unpartition_booking_table(connection=schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_booking_table, unpartition_booking_table),
+    ]
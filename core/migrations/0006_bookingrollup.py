@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-18 23:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_partition_booking_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('revenue', models.FloatField(default=0)),
+                ('nights', models.IntegerField(default=0)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='booking_rollup_month_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bookingrollup',
+            constraint=models.UniqueConstraint(fields=('property', 'month'), name='booking_rollup_property_month'),
+        ),
+    ]
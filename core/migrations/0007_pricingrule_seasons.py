@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-19 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_bookingrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricingrule',
+            name='date_end',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pricingrule',
+            name='date_start',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pricingrule',
+            name='weekdays',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.11 on 2026-10-18 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_pricingrule_seasons'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricingrule',
+            name='calendar_day',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='pricingrule',
+            constraint=models.UniqueConstraint(fields=('property', 'calendar_day'), name='pricing_rule_calendar_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='pricingrule',
+            constraint=models.CheckConstraint(check=models.Q(('calendar_day__isnull', True), ('calendar_day', models.F('specific_day')), _connector='OR'), name='pricing_rule_calendar_day_is_specific_day'),
+        ),
+    ]
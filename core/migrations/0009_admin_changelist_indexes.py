@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-18 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_pricingrule_calendar_day'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date_start'], name='booking_date_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricingrule',
+            index=models.Index(fields=['specific_day'], name='pricing_rule_specific_day_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.11 on 2026-10-18 23:08
+
+import core.models
+import core.operations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        core.operations.AddFieldInPlace(
+            model_name='property',
+            name='pricing_version',
+            field=models.BigIntegerField(default=core.models.new_pricing_version, editable=False),
+        ),
+    ]
@@ -1,19 +1,52 @@
+import secrets
+
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
 from django.db import models
+from django.db.models import F, Q, Value
+from django.db.models.functions import Upper
+
+from core.expressions import DateRange
+from core.sharding import ShardedQuerySet
 
 _property = property
 
 
+def new_pricing_version() -> int:
+    return secrets.randbits(62)
+
+
 class Property(models.Model):
     """
         Model that represents a property.
         A property could be a house, a flat, a hotel room, etc.
+        The pricing version is replaced whenever the property's pricing rules change, and keys its cached quotes.
     """
     name = models.CharField(max_length=255, blank=True)
     base_price = models.FloatField(null=True, blank=True)
+    pricing_version = models.BigIntegerField(default=new_pricing_version, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Trigram index on UPPER(name): serves `icontains` and similarity search (PostgreSQL only).
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='property_name_trgm_idx'),
+            # Keyset pagination of the change feed.
+            models.Index(fields=['updated_at', 'id'], name='property_updated_at_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # A save of a copy loaded before a pricing rule change must not restore the old version.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'pricing_version'
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f'{self.id} - {self.name}'
 
@@ -24,16 +57,52 @@ class PricingRule(models.Model):
         A rule can have a fixed price, or a percent modifier.
         Only one rule can apply per day.
         We can have multiple rules for the same day, but only the most relevant rule applies.
+        Seasonal rules apply to the nights between date_start and date_end (inclusive) and/or on
+        the weekdays of the weekdays bitmask (bit 0 is Monday), instead of one row per day.
+        Nightly prices uploaded through the pricing calendar also set calendar_day (equal to
+        specific_day), which keeps at most one calendar rule per property and day.
     """
     property = models.ForeignKey('core.Property', blank=False, null=False, on_delete=models.CASCADE)
     price_modifier = models.FloatField(null=True, blank=True)
     min_stay_length = models.IntegerField(null=True, blank=True)
     fixed_price = models.FloatField(null=True, blank=True)
     specific_day = models.DateField(null=True, blank=True)
+    date_start = models.DateField(null=True, blank=True)
+    date_end = models.DateField(null=True, blank=True)
+    weekdays = models.PositiveSmallIntegerField(null=True, blank=True)
+    calendar_day = models.DateField(null=True, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'calendar_day'], name='pricing_rule_calendar_day'),
+            models.CheckConstraint(
+                check=Q(calendar_day__isnull=True) | Q(calendar_day=F('specific_day')),
+                name='pricing_rule_calendar_day_is_specific_day',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['specific_day'], name='pricing_rule_specific_day_idx'),
+            # Keyset pagination of the change feed.
+            models.Index(fields=['updated_at', 'id'], name='pricing_rule_updated_at_id_idx'),
+        ]
+
+    @_property
+    def is_seasonal(self) -> bool:
+        return self.date_start is not None or self.weekdays is not None
+
+    def applies_on(self, day) -> bool:
+        """
+        Whether the night ``day`` is in the season of a seasonal rule.
+        """
+        if self.date_start is not None and not self.date_start <= day <= self.date_end:
+            return False
+        return self.weekdays is None or bool(self.weekdays & (1 << day.weekday()))
+
     def __str__(self) -> str:
         return f'Specific day:{self.specific_day} - Min stay length: {self.min_stay_length} ' \
                f'- Fixed price: {self.fixed_price} - Price modifier: {self.price_modifier}'
@@ -53,9 +122,105 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Range index for overlap and containment lookups on a property's stays (PostgreSQL only).
+            GistIndex(
+                F('property'),
+                DateRange('date_start', 'date_end', Value('[]')),
+                name='booking_property_dates_gist',
+            ),
+            # Date hierarchy and sorting of the admin changelist.
+            models.Index(fields=['date_start'], name='booking_date_start_idx'),
+            # Keyset pagination of the change feed.
+            models.Index(fields=['updated_at', 'id'], name='booking_updated_at_id_idx'),
+        ]
+
     @_property
     def stay_length(self):
         return (self.date_end - self.date_start).days + 1
 
     def __str__(self) -> str:
         return f'{self.property} - start: {self.date_start}, end: {self.date_end}, ${self.final_price}'
+
+
+class BookingRollup(models.Model):
+    """
+        Model that stores the revenue and occupied nights of a property in a month.
+        It is kept up to date incrementally when bookings are written through the API or the admin,
+        splitting stays that cross months by night.
+    """
+    property = models.ForeignKey('core.Property', blank=False, null=False, on_delete=models.CASCADE)
+    month = models.DateField()
+    revenue = models.FloatField(default=0)
+    nights = models.IntegerField(default=0)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'month'], name='booking_rollup_property_month'),
+        ]
+        indexes = [
+            models.Index(fields=['month'], name='booking_rollup_month_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.property_id} - {self.month:%Y-%m}: {self.nights} nights, ${self.revenue}'
+
+
+class IdempotencyKey(models.Model):
+    """
+        Model that stores the response to a request sent with an Idempotency-Key header.
+        Retries of the request with the same key get the stored response instead of being processed again.
+        Keys are scoped to the client that sent them, so clients cannot collide on or replay each other's keys.
+    """
+    scope = models.CharField(max_length=255, default='')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotency_key_scope_key'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.scope} {self.key} - {self.status_code}'
+
+
+class ThrottleBucket(models.Model):
+    """
+        Model that stores the token bucket of a client throttled by ``booking.throttling.BookingThrottle``.
+        ``updated_at`` is the Unix time at which ``tokens`` was last computed.
+    """
+    ident = models.CharField(max_length=255, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.FloatField(db_index=True)
+
+    def __str__(self) -> str:
+        return f'{self.ident}: {self.tokens:.1f} tokens'
+
+
+class Tombstone(models.Model):
+    """
+        Model that records the deletion of a property, pricing rule or booking for the change feed.
+        ``model`` is the label of the deleted object's model, e.g. ``core.Booking``.
+        Tombstones older than CHANGE_FEED_TOMBSTONE_TTL are purged.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at', 'object_id'], name='tombstone_model_deleted_at_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.model} {self.object_id} - deleted at {self.deleted_at}'
@@ -0,0 +1,44 @@
+"""
+Migration operations for PostgreSQL-only database features.
+
+The schema changes are skipped on other backends (e.g. SQLite when running the
+tests locally) while the migration state stays the same everywhere.
+"""
+from django.db import migrations
+
+
+class PostgresOnlyAddIndex(migrations.AddIndex):
+    """
+    Add an index that only PostgreSQL supports (GIN, GiST, operator classes...).
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddFieldInPlace(migrations.AddField):
+    """
+    Add a column with ``ALTER TABLE`` on SQLite as well.
+
+    For NOT NULL columns SQLite's schema editor rebuilds the whole table, and
+    with it the PostgreSQL-only indexes, which SQLite cannot create. Existing
+    rows get the field's default, evaluated once.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'sqlite':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        field = model._meta.get_field(self.name)
+        definition, params = schema_editor.column_sql(model, field, include_default=True)
+        schema_editor.execute(
+            f'ALTER TABLE {schema_editor.quote_name(model._meta.db_table)} '
+            f'ADD COLUMN {schema_editor.quote_name(field.column)} {definition}',
+            params,
+        )
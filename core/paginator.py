@@ -0,0 +1,35 @@
+"""
+Admin pagination that does not count every row of large tables.
+"""
+import json
+from typing import Optional
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset) -> Optional[int]:
+    """
+    Return the planner's estimate of the number of rows of ``queryset``, or None when the database has no estimate.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the planner's row estimate once it is above ``exact_count_limit``.
+
+    Smaller results, and databases without estimates, are counted exactly.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_count_limit:
+            return super().count
+        return estimate
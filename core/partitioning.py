@@ -0,0 +1,227 @@
+"""
+Monthly range partitioning of the booking table by ``date_start`` (PostgreSQL only).
+
+The ``Booking`` model is unchanged: Django keeps reading and writing
+``core_booking``, which becomes a partitioned table with one partition per
+month plus a default partition for dates no monthly partition covers yet.
+Queries filtering on ``date_start`` only scan the matching partitions, and past
+months can be detached and archived without touching the rest of the table.
+
+PostgreSQL requires the partition key in the primary key, so the table's
+primary key becomes ``(id, date_start)``. Ids still come from a single
+sequence, so ``id`` stays unique.
+"""
+import re
+from collections import namedtuple
+from datetime import date
+from typing import List, Optional
+
+from django.db import connection as default_connection
+
+
+BOOKING_TABLE = 'core_booking'
+DEFAULT_PARTITION = f'{BOOKING_TABLE}_default'
+ARCHIVE_SCHEMA = 'booking_archive'
+
+Partition = namedtuple('Partition', ['name', 'start', 'end'])
+
+BOUND_PATTERN = re.compile(r"FROM \('(?P<start>[\d-]+)'\) TO \('(?P<end>[\d-]+)'\)")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    Return the first day of the month ``months`` after the month of ``month``.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'{BOOKING_TABLE}_p{month:%Y_%m}'
+
+
+def parse_bound(bound: str) -> Optional[Partition]:
+    """
+    Parse the ``FOR VALUES FROM (...) TO (...)`` expression of a partition, or return None for the default partition.
+    """
+    match = BOUND_PATTERN.search(bound)
+    if not match:
+        return None
+    return Partition(None, date.fromisoformat(match['start']), date.fromisoformat(match['end']))
+
+
+def is_partitioned(connection=default_connection) -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [BOOKING_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection=default_connection) -> List[Partition]:
+    """
+    Return the monthly partitions of the booking table, oldest first. The default partition is left out.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [BOOKING_TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        parsed = parse_bound(bound)
+        if parsed:
+            partitions.append(parsed._replace(name=name))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def create_partition(month: date, connection=default_connection) -> bool:
+    """
+    Create the partition for ``month`` unless it exists, and return whether it was created.
+
+    Rows of that month already stored in the default partition are moved into
+    the new partition before it is attached.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    next_month = add_months(month, 1)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(
+            f'CREATE TABLE {quote(name)} (LIKE {quote(BOOKING_TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {quote(DEFAULT_PARTITION)} WHERE date_start >= %s AND date_start < %s RETURNING *
+            )
+            INSERT INTO {quote(name)} SELECT * FROM moved
+            """,
+            [month, next_month],
+        )
+        cursor.execute(
+            f'ALTER TABLE {quote(BOOKING_TABLE)} ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)',
+            [month, next_month],
+        )
+    return True
+
+
+def archive_partition(partition: Partition, drop: bool = False, connection=default_connection) -> None:
+    """
+    Detach a partition and move it to the archive schema, or drop it.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {quote(BOOKING_TABLE)} DETACH PARTITION {quote(partition.name)}')
+        if drop:
+            cursor.execute(f'DROP TABLE {quote(partition.name)}')
+        else:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {quote(ARCHIVE_SCHEMA)}')
+            cursor.execute(f'ALTER TABLE {quote(partition.name)} SET SCHEMA {quote(ARCHIVE_SCHEMA)}')
+
+
+def _table_definitions(cursor, table: str):
+    """
+    Return the definitions of the table's indexes and foreign keys, except the primary key.
+    """
+    cursor.execute(
+        """
+        SELECT indexdef FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s
+        """,
+        [table, f'{table}_pkey'],
+    )
+    indexes = [row[0].replace(' ON ONLY ', ' ON ') for row in cursor.fetchall()]
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype = 'f'
+        """,
+        [table],
+    )
+    return indexes, cursor.fetchall()
+
+
+def _replace_table(cursor, new_table: str, indexes, foreign_keys) -> None:
+    """
+    Copy the rows into ``new_table``, drop the booking table and put ``new_table`` in its place.
+    """
+    cursor.execute(f'INSERT INTO {new_table} SELECT * FROM {BOOKING_TABLE}')
+    cursor.execute(f'DROP TABLE {BOOKING_TABLE}')
+    cursor.execute(f'ALTER TABLE {new_table} RENAME TO {BOOKING_TABLE}')
+    cursor.execute(f'ALTER INDEX {new_table}_pkey RENAME TO {BOOKING_TABLE}_pkey')
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {BOOKING_TABLE} ADD CONSTRAINT {name} {definition}')
+    for definition in indexes:
+        cursor.execute(definition)
+
+
+def partition_booking_table(months_ahead: int = 12, connection=default_connection) -> None:
+    """
+    Convert the booking table into a partitioned table, with monthly partitions
+    from the oldest booking until ``months_ahead`` months from now.
+    """
+    new_table = f'{BOOKING_TABLE}_partitioned'
+    with connection.cursor() as cursor:
+        indexes, foreign_keys = _table_definitions(cursor, BOOKING_TABLE)
+        cursor.execute(f'SELECT MIN(date_start) FROM {BOOKING_TABLE}')
+        oldest = cursor.fetchone()[0]
+
+        # Identity columns are not supported on partitioned tables before PostgreSQL 17,
+        # so the id default comes from an owned sequence instead.
+        cursor.execute(
+            f'CREATE TABLE {new_table} (LIKE {BOOKING_TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (date_start)'
+        )
+        cursor.execute(f'ALTER TABLE {new_table} ADD PRIMARY KEY (id, date_start)')
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {new_table} DEFAULT')
+
+        current = month_start(date.today())
+        month = min(month_start(oldest), current) if oldest else current
+        while month <= add_months(current, months_ahead):
+            cursor.execute(
+                f'CREATE TABLE {partition_name(month)} PARTITION OF {new_table} FOR VALUES FROM (%s) TO (%s)',
+                [month, add_months(month, 1)],
+            )
+            month = add_months(month, 1)
+
+        _replace_table(cursor, new_table, indexes, foreign_keys)
+        cursor.execute(f'CREATE SEQUENCE {BOOKING_TABLE}_id_seq OWNED BY {BOOKING_TABLE}.id')
+        cursor.execute(
+            f"SELECT setval('{BOOKING_TABLE}_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM {BOOKING_TABLE}"
+        )
+        cursor.execute(
+            f"ALTER TABLE {BOOKING_TABLE} ALTER COLUMN id SET DEFAULT nextval('{BOOKING_TABLE}_id_seq')"
+        )
+
+
+def unpartition_booking_table(connection=default_connection) -> None:
+    """
+    Convert the partitioned booking table back into a plain table. Archived partitions are not restored.
+    """
+    new_table = f'{BOOKING_TABLE}_plain'
+    with connection.cursor() as cursor:
+        indexes, foreign_keys = _table_definitions(cursor, BOOKING_TABLE)
+        cursor.execute(f'CREATE TABLE {new_table} (LIKE {BOOKING_TABLE})')
+        cursor.execute(f'ALTER TABLE {new_table} ADD PRIMARY KEY (id)')
+        _replace_table(cursor, new_table, indexes, foreign_keys)
+        cursor.execute(f'ALTER TABLE {BOOKING_TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{BOOKING_TABLE}', 'id'), COALESCE(MAX(id), 0) + 1, false) "
+            f"FROM {BOOKING_TABLE}"
+        )
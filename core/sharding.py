@@ -0,0 +1,226 @@
+"""
+Horizontal sharding of properties, with their pricing rules, bookings and rollups.
+
+``SHARD_DATABASES`` lists the database aliases of the shards, the default
+database first. A property lives on one shard together with everything that
+belongs to it, so pricing and booking a property only touches its shard.
+
+Each shard hands out ids from its own range, ``shard index << SHARD_ID_BITS``
+on, so the shard of a property, pricing rule or booking is read from its id,
+and ids stay unique across shards. New properties go to a random shard.
+
+Routing:
+
+* Saves, creates and related managers go to the shard of the instance (``ShardRouter``).
+* Querysets filtered on ``pk`` or ``property`` go to the shard of those ids (``ShardedQuerySet``).
+* Other querysets of sharded models read the default database; ``fan_out``
+  runs them on every shard and merges the rows in the queryset's order.
+
+With a single database every query goes to the default database as before.
+"""
+import random
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from functools import cmp_to_key
+from heapq import merge
+from operator import attrgetter
+from typing import Iterator, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, models, router, transaction
+
+
+SHARD_ID_BITS = 48
+SHARDED_MODELS = ('core.Property', 'core.PricingRule', 'core.Booking', 'core.BookingRollup')
+
+
+def shard_aliases() -> List[str]:
+    return settings.SHARD_DATABASES
+
+
+def is_sharded() -> bool:
+    return len(shard_aliases()) > 1
+
+
+def shard_for(object_id) -> Optional[str]:
+    """
+    Return the alias of the shard of a property, pricing rule or booking id (or instance), or None if there is none.
+    """
+    try:
+        index = int(getattr(object_id, 'pk', object_id)) >> SHARD_ID_BITS
+    except (TypeError, ValueError):
+        return None
+    aliases = shard_aliases()
+    return aliases[index] if 0 <= index < len(aliases) else None
+
+
+def pick_shard() -> str:
+    """
+    Return the shard of a new property.
+    """
+    return random.choice(shard_aliases())
+
+
+def lookup_shard(model, lookups: dict) -> Optional[str]:
+    """
+    Return the shard that the ``filter()`` keyword lookups restrict ``model`` rows to, if they name a single one.
+    """
+    shards = set()
+    for lookup, value in lookups.items():
+        parts = lookup.split('__')
+        values = [value]
+        if parts[-1] == 'exact' and len(parts) > 1:
+            parts = parts[:-1]
+        elif parts[-1] == 'in' and len(parts) > 1:
+            parts, values = parts[:-1], value
+        if len(parts) > 1 and parts[-1] in ('pk', 'id'):
+            parts = parts[:-1]
+        name = '__'.join(parts)
+        on_property = name in ('property', 'property_id') and model._meta.label != 'core.Property'
+        if name not in ('pk', 'id') and not on_property:
+            continue
+        if isinstance(values, (models.QuerySet, str)):
+            # Subqueries run on the queryset's database.
+            continue
+        shards.update(shard_for(item) for item in values)
+    return shards.pop() if len(shards) == 1 else None
+
+
+class ShardedQuerySet(models.QuerySet):
+    """
+    Queryset of a sharded model that goes to the shard its ``pk`` or ``property`` lookups point to.
+    """
+
+    @property
+    def is_routed(self) -> bool:
+        return self._db is not None or 'shard' in self._hints
+
+    def _filter_or_exclude(self, negate, args, kwargs):
+        clone = super()._filter_or_exclude(negate, args, kwargs)
+        if not negate and not self.is_routed:
+            shard = lookup_shard(self.model, kwargs)
+            if shard is not None:
+                # The hints dict is shared with the queryset this one was cloned from.
+                clone._hints = {**clone._hints, 'shard': shard}
+        return clone
+
+    def create(self, **kwargs):
+        if self.is_routed:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+        return obj
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if self.is_routed:
+            return super().bulk_create(objs, *args, **kwargs)
+        objs = list(objs)
+        by_shard = defaultdict(list)
+        for obj in objs:
+            by_shard[router.db_for_write(self.model, instance=obj)].append(obj)
+        for shard, shard_objs in by_shard.items():
+            super(ShardedQuerySet, self.using(shard)).bulk_create(shard_objs, *args, **kwargs)
+        return objs
+
+    def shard_querysets(self) -> List['ShardedQuerySet']:
+        """
+        Return this queryset if it is routed to a shard, else a copy of it on each shard.
+        """
+        if self.is_routed:
+            return [self]
+        return [self.using(shard) for shard in shard_aliases()]
+
+
+class ShardRouter:
+    """
+    Send sharded models to the shard of the instance or of the queryset's lookups, everything else to the default.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        return self._db_for(model, **hints)
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        return self._db_for(model, **hints)
+
+    def _db_for(self, model, shard=None, instance=None, **hints) -> Optional[str]:
+        if model._meta.label not in SHARDED_MODELS:
+            return None
+        if shard is not None:
+            return shard
+        if instance is None or instance._meta.label not in SHARDED_MODELS:
+            return None
+        if instance._state.db:
+            return instance._state.db
+        if instance.pk is not None:
+            return shard_for(instance.pk)
+        if instance._meta.label == 'core.Property':
+            return pick_shard()
+        return shard_for(instance.property_id)
+
+
+def fan_out(queryset) -> Iterator[models.Model]:
+    """
+    Run the queryset on every shard unless it is routed to one, and merge the rows in its order.
+
+    The queryset must be ordered on field names, e.g. ``name, -created_at``.
+    """
+    querysets = queryset.shard_querysets() if isinstance(queryset, ShardedQuerySet) else [queryset]
+    if len(querysets) == 1:
+        return iter(querysets[0])
+    ordering = queryset.query.order_by or queryset.model._meta.ordering or ['pk']
+    fields = [queryset.model._meta.pk.attname if field == 'pk' else field.lstrip('-') for field in ordering]
+    getters = [attrgetter(field) for field in fields]
+    descending = [field.startswith('-') for field in ordering]
+
+    def compare(left: list, right: list) -> int:
+        for left_value, right_value, reverse in zip(left, right, descending):
+            if left_value == right_value:
+                continue
+            # NULLs sort after every value, as on PostgreSQL (so first in descending order).
+            if left_value is None or right_value is None:
+                less = right_value is None
+            else:
+                less = left_value < right_value
+            return (1 if less else -1) if reverse else (-1 if less else 1)
+        return 0
+
+    sort_key = cmp_to_key(compare)
+    return merge(*querysets, key=lambda row: sort_key([getter(row) for getter in getters]))
+
+
+@contextmanager
+def atomic_on_all_shards():
+    """
+    Run the block in a transaction on every shard; the default database commits last.
+    """
+    with ExitStack() as stack:
+        for shard in shard_aliases():
+            stack.enter_context(transaction.atomic(using=shard))
+        yield
+
+
+def reserve_id_ranges(using: str, **kwargs) -> None:
+    """
+    Start the ids of the sharded tables of shard ``using`` at its range, after ``migrate``.
+    """
+    if using not in shard_aliases() or not shard_aliases().index(using):
+        return
+    connection = connections[using]
+    first_id = shard_aliases().index(using) << SHARD_ID_BITS
+    with connection.cursor() as cursor:
+        for label in SHARDED_MODELS:
+            table = apps.get_model(label)._meta.db_table
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), GREATEST(%s, COALESCE(MAX(id), 0))) "
+                    f'FROM {connection.ops.quote_name(table)}',
+                    [table, first_id],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, %s) WHERE name = %s', [first_id, table])
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+                    'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                    [table, first_id, table],
+                )
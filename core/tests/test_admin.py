@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Booking, PricingRule, Property
+from core.paginator import EstimatedCountPaginator, estimate_count
+
+
+def seed(properties, rows_per_property):
+    property_objs = Property.objects.bulk_create(
+        Property(name=f'House {index}', base_price=10) for index in range(properties)
+    )
+    first_day = date(2024, 1, 1)
+    Booking.objects.bulk_create(
+        Booking(
+            property=property_obj,
+            date_start=first_day + timedelta(days=index),
+            date_end=first_day + timedelta(days=index + 2),
+            final_price=30,
+        )
+        for property_obj in property_objs for index in range(rows_per_property)
+    )
+    PricingRule.objects.bulk_create(
+        PricingRule(property=property_obj, fixed_price=20, specific_day=first_day + timedelta(days=index))
+        for property_obj in property_objs for index in range(rows_per_property)
+    )
+
+
+class ChangelistQueriesTests(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+
+    def changelist_queries(self, model_name, **params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(reverse(f'admin:core_{model_name}_changelist'), params)
+        self.assertEqual(res.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        seed(properties=10, rows_per_property=10)
+        small = {
+            model_name: self.changelist_queries(model_name) for model_name in ('property', 'pricingrule', 'booking')
+        }
+        seed(properties=100, rows_per_property=30)
+        for model_name, queries in small.items():
+            self.assertEqual(self.changelist_queries(model_name), queries, model_name)
+
+    def test_booking_changelist(self):
+        seed(properties=20, rows_per_property=30)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(reverse('admin:core_booking_changelist'), {'date_start__year': 2024})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.context['cl'].result_list), 50)
+        self.assertEqual(res.context['cl'].result_count, 600)
+        counts = [query['sql'] for query in queries if 'COUNT(' in query['sql']]
+        self.assertEqual(len(counts), 1)
+
+    def test_unindexed_columns_are_not_sortable(self):
+        seed(properties=1, rows_per_property=1)
+        res = self.client.get(reverse('admin:core_booking_changelist'))
+        self.assertEqual(res.context['cl'].sortable_by, ('id', 'date_start'))
+
+
+class EstimatedCountPaginatorTests(TestCase):
+
+    def test_small_results_are_counted(self):
+        seed(properties=3, rows_per_property=1)
+        paginator = EstimatedCountPaginator(Property.objects.order_by('id'), 50)
+        self.assertEqual(paginator.count, 3)
+
+    def test_large_estimates_are_used(self):
+        seed(properties=3, rows_per_property=1)
+        with mock.patch('core.paginator.estimate_count', return_value=2000000):
+            paginator = EstimatedCountPaginator(Property.objects.order_by('id'), 50)
+            self.assertEqual(paginator.count, 2000000)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Row estimates require PostgreSQL')
+    def test_estimate_count(self):
+        seed(properties=3, rows_per_property=1)
+        self.assertGreater(estimate_count(Property.objects.all()), 0)
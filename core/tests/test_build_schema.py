@@ -0,0 +1,65 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from reservations.schema import SCHEMA_MANIFEST
+
+
+class BuildSchemaCommandTests(SimpleTestCase):
+
+    def setUp(self):
+        self.static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.static_root.cleanup)
+        self.schema_dir = os.path.join(self.static_root.name, 'schema')
+
+    def build_schema(self):
+        with override_settings(STATIC_ROOT=self.static_root.name):
+            call_command('build_schema', stdout=StringIO())
+        with open(os.path.join(self.schema_dir, SCHEMA_MANIFEST)) as manifest_file:
+            return json.load(manifest_file)
+
+    def test_build_schema_writes_hashed_and_gzipped_files(self):
+        manifest = self.build_schema()
+        with open(os.path.join(self.schema_dir, manifest['json']), 'rb') as schema_file:
+            content = schema_file.read()
+        with gzip.open(os.path.join(self.schema_dir, f'{manifest["json"]}.gz')) as gzip_file:
+            self.assertEqual(gzip_file.read(), content)
+
+        self.assertEqual(manifest['json'], f'schema.{hashlib.sha256(content).hexdigest()[:12]}.json')
+        self.assertIn('/api/booking/bookings/', json.loads(content)['paths'])
+        for name in ['schema.json', 'schema.json.gz', 'schema.yaml', 'schema.yaml.gz']:
+            self.assertTrue(os.path.exists(os.path.join(self.schema_dir, name)))
+
+    def test_weekdays_are_documented_as_a_list_of_days(self):
+        manifest = self.build_schema()
+        with open(os.path.join(self.schema_dir, manifest['json'])) as schema_file:
+            weekdays = json.load(schema_file)['components']['schemas']['PricingRule']['properties']['weekdays']
+        self.assertEqual(weekdays['type'], 'array')
+        self.assertEqual(weekdays['items'], {'type': 'integer', 'minimum': 0, 'maximum': 6})
+
+    def test_build_schema_removes_stale_hashed_files(self):
+        os.makedirs(self.schema_dir)
+        stale_path = os.path.join(self.schema_dir, 'schema.000000000000.json')
+        open(stale_path, 'w').close()
+        self.build_schema()
+        self.assertFalse(os.path.exists(stale_path))
+
+    def test_docs_use_static_schema_when_enabled(self):
+        manifest = self.build_schema()
+        with override_settings(STATIC_ROOT=self.static_root.name, SERVE_STATIC_API_SCHEMA=True):
+            res = self.client.get(reverse('api-docs'))
+        self.assertContains(res, f'/static/static/schema/{manifest["json"]}')
+
+    def test_docs_use_dynamic_schema_when_disabled(self):
+        self.build_schema()
+        with override_settings(STATIC_ROOT=self.static_root.name, SERVE_STATIC_API_SCHEMA=False):
+            res = self.client.get(reverse('api-docs'))
+        self.assertContains(res, reverse('api-schema'))
+        self.assertNotContains(res, '/static/static/schema/')
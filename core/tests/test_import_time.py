@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.importtime import measure_imports, parse_importtime, total_import_time_ms
+
+
+class ImportTimeTests(SimpleTestCase):
+
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       100 |        100 |     django.utils\n'
+            'import time:       200 |        300 |   django.core\n'
+            'import time:        50 |        350 | reservations.wsgi\n'
+        )
+        timings = parse_importtime(output)
+        self.assertEqual([timing.name for timing in timings], ['django.utils', 'django.core', 'reservations.wsgi'])
+        self.assertEqual([timing.depth for timing in timings], [2, 1, 0])
+        self.assertEqual(total_import_time_ms(timings), 0.35)
+
+    def test_wsgi_cold_import_within_budget(self):
+        """
+        Test the cold-import time of the WSGI module stays within IMPORT_TIME_BUDGET_MS
+        """
+        timings = measure_imports('reservations.wsgi')
+        total = total_import_time_ms(timings)
+        self.assertLessEqual(
+            total,
+            settings.IMPORT_TIME_BUDGET_MS,
+            f'Cold import of reservations.wsgi took {total:.1f} ms'
+        )
+
+    def test_lazy_urlconf_defers_admin_and_schema_imports(self):
+        """
+        Test the production profile doesn't import admin or schema views with the URLconf
+        """
+        timings = measure_imports(
+            'reservations.wsgi, reservations.urls',
+            extra_env={'LAZY_LOAD_NON_HOT_PATH': '1'}
+        )
+        names = {timing.name for timing in timings}
+        self.assertIn('reservations.urls', names)
+        self.assertNotIn('drf_spectacular.views', names)
+        self.assertNotIn('core.admin', names)
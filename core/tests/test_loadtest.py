@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+
+from core.loadtest import Stage, client_address, find_knee, is_error, percentile
+
+
+class LoadTestHelperTests(SimpleTestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([], 99), 0)
+
+    def test_knee_where_latency_degrades(self):
+        stages = [Stage(1, 100, 10), Stage(2, 190, 12), Stage(4, 350, 25)]
+        self.assertEqual(find_knee(stages), 2)
+
+    def test_knee_where_throughput_stops_growing(self):
+        stages = [Stage(1, 100, 10), Stage(2, 190, 12), Stage(4, 192, 15)]
+        self.assertEqual(find_knee(stages), 2)
+
+    def test_no_knee(self):
+        stages = [Stage(1, 100, 10), Stage(2, 190, 12), Stage(4, 350, 15)]
+        self.assertIsNone(find_knee(stages))
+        self.assertIsNone(find_knee([]))
+
+    def test_client_addresses_are_distinct(self):
+        addresses = [client_address(index) for index in range(70000)]
+        self.assertEqual(len(set(addresses)), len(addresses))
+        self.assertEqual(client_address(0), '10.1.0.1')
+
+    def test_throttled_requests_are_not_errors(self):
+        self.assertFalse(is_error(201))
+        self.assertFalse(is_error(429))
+        self.assertTrue(is_error(500))
+        self.assertTrue(is_error(0))
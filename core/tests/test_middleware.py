@@ -0,0 +1,31 @@
+import time
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+
+
+PROPERTIES_URL = reverse('booking:property-list')
+
+
+@override_settings(LOAD_SHEDDING_MAX_QUEUE_MS=500, LOAD_SHEDDING_RETRY_AFTER=2)
+class LoadSheddingMiddlewareTests(TestCase):
+
+    def test_request_queued_too_long_is_shed(self):
+        res = self.client.get(PROPERTIES_URL, HTTP_X_REQUEST_START=f't={time.time() - 1:.3f}')
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '2')
+
+    def test_request_within_queue_budget_is_served(self):
+        res = self.client.get(PROPERTIES_URL, HTTP_X_REQUEST_START=f't={time.time():.3f}')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_request_without_timestamp_is_served(self):
+        res = self.client.get(PROPERTIES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(LOAD_SHEDDING_MAX_QUEUE_MS=0)
+    def test_shedding_disabled(self):
+        res = self.client.get(PROPERTIES_URL, HTTP_X_REQUEST_START=f't={time.time() - 10:.3f}')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Booking, Property
+from core.partitioning import (
+    DEFAULT_PARTITION,
+    add_months,
+    create_partition,
+    is_partitioned,
+    list_partitions,
+    parse_bound,
+    partition_name,
+)
+
+
+class PartitionHelperTests(SimpleTestCase):
+
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2024, 11, 15), 1), date(2024, 12, 1))
+        self.assertEqual(add_months(date(2024, 12, 1), 1), date(2025, 1, 1))
+        self.assertEqual(add_months(date(2024, 1, 31), -13), date(2022, 12, 1))
+
+    def test_partition_name(self):
+        self.assertEqual(partition_name(date(2024, 3, 1)), 'core_booking_p2024_03')
+
+    def test_parse_bound(self):
+        partition = parse_bound("FOR VALUES FROM ('2024-03-01') TO ('2024-04-01')")
+        self.assertEqual((partition.start, partition.end), (date(2024, 3, 1), date(2024, 4, 1)))
+        self.assertIsNone(parse_bound('DEFAULT'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning requires PostgreSQL')
+class BookingPartitioningTests(TestCase):
+
+    def setUp(self):
+        self.property = Property.objects.create(name='Big house', base_price=10)
+        self.month = add_months(date.today(), 1)
+
+    def partition_of(self, booking):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM core_booking WHERE id = %s', [booking.id])
+            return cursor.fetchone()[0]
+
+    def test_bookings_are_routed_to_monthly_partitions(self):
+        self.assertTrue(is_partitioned())
+        booking = Booking.objects.create(
+            property=self.property, date_start=self.month, date_end=self.month + timedelta(days=3)
+        )
+        self.assertEqual(self.partition_of(booking), partition_name(self.month))
+
+        next_month = add_months(self.month, 1)
+        Booking.objects.filter(pk=booking.pk).update(date_start=next_month, date_end=next_month)
+        self.assertEqual(self.partition_of(booking), partition_name(next_month))
+
+    def test_date_filter_prunes_partitions(self):
+        plan = Booking.objects.filter(
+            date_start__gte=self.month, date_start__lt=add_months(self.month, 1)
+        ).explain()
+        scanned = {partition.name for partition in list_partitions() if partition.name in plan}
+        self.assertEqual(scanned, {partition_name(self.month)})
+        self.assertNotIn(DEFAULT_PARTITION, plan)
+
+    def test_create_partition_moves_rows_out_of_default(self):
+        far_month = add_months(date.today(), 60)
+        booking = Booking.objects.create(property=self.property, date_start=far_month, date_end=far_month)
+        self.assertEqual(self.partition_of(booking), DEFAULT_PARTITION)
+
+        self.assertTrue(create_partition(far_month))
+        self.assertFalse(create_partition(far_month))
+        self.assertEqual(self.partition_of(booking), partition_name(far_month))
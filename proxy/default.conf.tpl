@@ -1,3 +1,12 @@
+# Micro-cache for API reads. Only responses Django marks cacheable with Cache-Control are stored,
+# i.e. the property and pricing rule list and detail endpoints (see booking/caching.py).
+uwsgi_cache_path /var/cache/nginx/api levels=1:2 keys_zone=api_cache:10m max_size=100m inactive=10m use_temp_path=off;
+
+map $arg_format $api_schema_file {
+    default schema.yaml;
+    json    schema.json;
+}
+
 server {
     listen ${LISTEN_PORT};
 
@@ -5,9 +14,56 @@ server {
         alias /vol/static;
     }
 
+    # Content-hashed OpenAPI schema written by the build_schema command.
+    location ~ ^/static/static/schema/schema\.[0-9a-f]+\.json$ {
+        root                    /vol;
+        gzip_static             on;
+        add_header              Cache-Control "public, max-age=31536000, immutable";
+    }
+
+    # Pre-generated OpenAPI schema, falling back to Django if it hasn't been built.
+    location = /api/schema/ {
+        root                    /vol/static/static/schema;
+        types {
+            application/vnd.oai.openapi         yaml;
+            application/vnd.oai.openapi+json    json;
+        }
+        gzip_static             on;
+        add_header              Cache-Control "no-cache";
+        try_files               /$api_schema_file @app;
+    }
+
+    location /api/booking/ {
+        uwsgi_pass              ${APP_HOST}:${APP_PORT};
+        include                 /etc/nginx/uwsgi_params;
+        uwsgi_param             HTTP_X_FORWARDED_FOR $proxy_add_x_forwarded_for;
+        uwsgi_param             HTTP_X_REQUEST_START t=$msec;
+        client_max_body_size    10M;
+
+        uwsgi_cache                     api_cache;
+        uwsgi_cache_key                 $scheme$request_method$host$request_uri;
+        # Identical requests for a missing or expired entry wait for the first one instead of reaching Django.
+        uwsgi_cache_lock                on;
+        uwsgi_cache_lock_timeout        5s;
+        uwsgi_cache_use_stale           updating error timeout http_500 http_503;
+        uwsgi_cache_background_update   on;
+        # Expired entries are revalidated with If-None-Match; Django answers 304 while the catalog is unchanged.
+        uwsgi_cache_revalidate          on;
+        add_header                      X-Cache-Status $upstream_cache_status always;
+    }
+
     location / {
         uwsgi_pass              ${APP_HOST}:${APP_PORT};
         include                 /etc/nginx/uwsgi_params;
+        uwsgi_param             HTTP_X_FORWARDED_FOR $proxy_add_x_forwarded_for;
+        uwsgi_param             HTTP_X_REQUEST_START t=$msec;
         client_max_body_size    10M;
     }
+
+    location @app {
+        uwsgi_pass              ${APP_HOST}:${APP_PORT};
+        include                 /etc/nginx/uwsgi_params;
+        uwsgi_param             HTTP_X_FORWARDED_FOR $proxy_add_x_forwarded_for;
+        uwsgi_param             HTTP_X_REQUEST_START t=$msec;
+    }
 }
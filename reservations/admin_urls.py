@@ -0,0 +1,14 @@
+"""
+Admin URLconf loaded lazily by the production profile.
+
+Admin modules are autodiscovered here instead of at startup, so the cost is
+paid by the first request to ``/admin/``.
+"""
+from django.contrib import admin
+
+
+admin.autodiscover()
+
+app_name = 'admin'
+
+urlpatterns = admin.site.get_urls()
@@ -0,0 +1,58 @@
+"""
+Helpers to defer importing views and URLconfs until they are first requested.
+
+Used by the production profile (``LAZY_LOAD_NON_HOT_PATH``) so that worker
+processes don't pay for admin or API schema imports on cold start.
+"""
+from typing import Callable
+
+from django.urls import URLResolver
+from django.urls.resolvers import RoutePattern
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+
+
+def lazy_view(dotted_path: str, **initkwargs) -> Callable:
+    """
+    Return a view that imports the class-based view at ``dotted_path`` on first call.
+
+    Args:
+        dotted_path: Import path of the class-based view.
+        initkwargs: Keyword arguments forwarded to ``as_view``.
+
+    Returns:
+        A view callable.
+    """
+    view = None
+
+    @csrf_exempt
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def lazy_include(route: str, urlconf: str, namespace: str) -> URLResolver:
+    """
+    Return a namespaced resolver whose URLconf module is imported on first use.
+
+    Unlike ``include``, the module is only imported when a URL under ``route``
+    is resolved or a name in ``namespace`` is reversed.
+
+    Args:
+        route: The route prefix, e.g. ``'admin/'``.
+        urlconf: Import path of the URLconf module.
+        namespace: Application and instance namespace of the included URLs.
+
+    Returns:
+        A URL resolver.
+    """
+    return URLResolver(
+        RoutePattern(route, is_endpoint=False),
+        urlconf,
+        app_name=namespace,
+        namespace=namespace,
+    )
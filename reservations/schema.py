@@ -0,0 +1,47 @@
+"""
+Access to the OpenAPI schema pre-generated by the build_schema command.
+"""
+import json
+import os
+from typing import Optional
+
+from django.conf import settings
+from django.templatetags.static import static
+from drf_spectacular.views import SpectacularSwaggerView
+
+
+SCHEMA_MANIFEST = 'manifest.json'
+
+
+def get_schema_dir() -> str:
+    """
+    Return the directory the pre-generated schema files are written to.
+    """
+    return os.path.join(settings.STATIC_ROOT, settings.API_SCHEMA_STATIC_DIR)
+
+
+def get_static_schema_url() -> Optional[str]:
+    """
+    Return the URL of the content-hashed JSON schema, if it has been generated.
+    """
+    try:
+        with open(os.path.join(get_schema_dir(), SCHEMA_MANIFEST)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+    return static(f'{settings.API_SCHEMA_STATIC_DIR}/{manifest["json"]}')
+
+
+class StaticSchemaSwaggerView(SpectacularSwaggerView):
+    """
+    Swagger UI pointing at the pre-generated schema when SERVE_STATIC_API_SCHEMA is on.
+
+    Falls back to the dynamic schema view when the schema hasn't been built.
+    """
+
+    def _get_schema_url(self, request):
+        if settings.SERVE_STATIC_API_SCHEMA:
+            static_url = get_static_schema_url()
+            if static_url:
+                return static_url
+        return super()._get_schema_url(request)
@@ -35,15 +35,24 @@ ALLOWED_HOSTS.extend(
 )
 
 
+# Production profile: defer loading of components that are not on the request
+# path (admin autodiscovery, API schema views) until their URLs are first hit.
+LAZY_LOAD_NON_HOT_PATH = bool(int(os.environ.get('LAZY_LOAD_NON_HOT_PATH', int(not DEBUG))))
+
+# Maximum cold-import time, in milliseconds, allowed for reservations.wsgi.
+IMPORT_TIME_BUDGET_MS = int(os.environ.get('IMPORT_TIME_BUDGET_MS', 1500))
+
+
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    'django.contrib.admin.apps.SimpleAdminConfig' if LAZY_LOAD_NON_HOT_PATH else 'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'drf_spectacular',
     'django_filters',
@@ -53,6 +62,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.LoadSheddingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -96,6 +106,35 @@ DATABASES = {
     }
 }
 
+# Extra databases that properties, with their pricing rules and bookings, are sharded across (the default database
+# is the first shard), e.g. DB_SHARD_NAMES=devdb_shard1,devdb_shard2 on the same server as the default database.
+DB_SHARD_NAMES = [name for name in os.environ.get('DB_SHARD_NAMES', '').split(',') if name]
+DATABASES.update({
+    f'shard{index}': {**DATABASES['default'], 'NAME': name} for index, name in enumerate(DB_SHARD_NAMES, start=1)
+})
+SHARD_DATABASES = list(DATABASES)
+DATABASE_ROUTERS = ['core.sharding.ShardRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Throttling state must be shared by all uWSGI workers, so production uses a shared backend.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    # Booking price quotes, kept in each worker's memory. Keys carry the property's pricing
+    # version, so the timeout and size only bound memory, not staleness.
+    'quotes': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'quotes',
+        'TIMEOUT': int(os.environ.get('QUOTE_CACHE_TIMEOUT', 600)),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('QUOTE_CACHE_MAX_ENTRIES', 10000))},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -129,7 +168,7 @@ USE_TZ = True
 
 DATE_FORMAT = '%m-%d-%Y'
 
-DATE_INPUT_FORMATS = '%m-%d-%Y'
+DATE_INPUT_FORMATS = ['%m-%d-%Y']
 
 
 # Static files (CSS, JavaScript, Images)
@@ -150,8 +189,50 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DATE_FORMAT': "%m-%d-%Y",
     'DATE_INPUT_FORMATS': ["%m-%d-%Y"],
+    # Clients are identified by the address nginx appends to X-Forwarded-For.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
 }
 
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True
 }
+
+# OpenAPI schema pre-generated by the build_schema command into STATIC_ROOT.
+# When enabled, Swagger UI loads the content-hashed file and the proxy serves /api/schema/.
+SERVE_STATIC_API_SCHEMA = bool(int(os.environ.get('SERVE_STATIC_API_SCHEMA', int(not DEBUG))))
+API_SCHEMA_STATIC_DIR = 'schema'
+
+# Admission control for booking requests, whose pricing cost grows with the stay length.
+BOOKING_MAX_STAY_LENGTH = int(os.environ.get('BOOKING_MAX_STAY_LENGTH', 365))
+BOOKING_THROTTLE_CAPACITY = int(os.environ.get('BOOKING_THROTTLE_CAPACITY', 300))
+BOOKING_THROTTLE_REFILL_RATE = float(os.environ.get('BOOKING_THROTTLE_REFILL_RATE', 5))
+BOOKING_THROTTLE_NIGHTS_PER_TOKEN = int(os.environ.get('BOOKING_THROTTLE_NIGHTS_PER_TOKEN', 30))
+
+# Reject requests that waited longer than this in the proxy and uWSGI queues (0 disables).
+LOAD_SHEDDING_MAX_QUEUE_MS = int(os.environ.get('LOAD_SHEDDING_MAX_QUEUE_MS', 0))
+LOAD_SHEDDING_RETRY_AFTER = int(os.environ.get('LOAD_SHEDDING_RETRY_AFTER', 1))
+
+# Seconds the proxy may serve property and pricing rule reads from its micro-cache.
+API_CACHE_MAX_AGE = int(os.environ.get('API_CACHE_MAX_AGE', 1))
+
+# How long, in seconds, responses to requests with an Idempotency-Key header are replayed.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+# Most nightly prices accepted by one pricing calendar upload.
+PRICING_CALENDAR_MAX_DAYS = int(os.environ.get('PRICING_CALENDAR_MAX_DAYS', 731))
+
+# Nights ahead covered by the per-worker price index (0 disables it), and how many properties it keeps.
+PRICE_INDEX_HORIZON_DAYS = int(os.environ.get('PRICE_INDEX_HORIZON_DAYS', 365))
+PRICE_INDEX_MAX_PROPERTIES = int(os.environ.get('PRICE_INDEX_MAX_PROPERTIES', 1000))
+# Directory of memory-mapped price index files shared by the workers of a host (empty keeps one index per worker).
+PRICE_INDEX_SHARED_DIR = os.environ.get('PRICE_INDEX_SHARED_DIR', '')
+
+# Most pricing rule changes in one what-if simulation, and most days of booking start dates it reprices.
+PRICING_SIMULATION_MAX_CHANGES = int(os.environ.get('PRICING_SIMULATION_MAX_CHANGES', 1000))
+PRICING_SIMULATION_MAX_DAYS = int(os.environ.get('PRICING_SIMULATION_MAX_DAYS', 1096))
+
+# Change feed: rows written in the last CHANGE_FEED_LAG_SECONDS are held back until their transactions have
+# committed, and deletions are remembered for CHANGE_FEED_TOMBSTONE_TTL seconds.
+CHANGE_FEED_LAG_SECONDS = int(os.environ.get('CHANGE_FEED_LAG_SECONDS', 5))
+CHANGE_FEED_TOMBSTONE_TTL = int(os.environ.get('CHANGE_FEED_TOMBSTONE_TTL', 30 * 24 * 60 * 60))
+CHANGE_FEED_MAX_LIMIT = int(os.environ.get('CHANGE_FEED_MAX_LIMIT', 1000))
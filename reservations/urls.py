@@ -13,20 +13,31 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from reservations.lazy import lazy_include, lazy_view
+
+
+if settings.LAZY_LOAD_NON_HOT_PATH:
+    admin_urls = lazy_include('admin/', 'reservations.admin_urls', namespace='admin')
+    schema_view = lazy_view('drf_spectacular.views.SpectacularAPIView')
+    docs_view = lazy_view('reservations.schema.StaticSchemaSwaggerView', url_name='api-schema')
+else:
+    from django.contrib import admin
+    from drf_spectacular.views import SpectacularAPIView
+
+    from reservations.schema import StaticSchemaSwaggerView
+
+    admin_urls = path('admin/', admin.site.urls)
+    schema_view = SpectacularAPIView.as_view()
+    docs_view = StaticSchemaSwaggerView.as_view(url_name='api-schema')
 
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
-    path(
-        'api/docs/',
-        SpectacularSwaggerView.as_view(url_name='api-schema'),
-        name='api-docs'
-    ),
+    admin_urls,
+    path('api/schema/', schema_view, name='api-schema'),
+    path('api/docs/', docs_view, name='api-docs'),
     path(
         'api/booking/',
         include('booking.urls')
@@ -0,0 +1,15 @@
+#!/bin/sh
+# Bring up the production stack and check that the nginx micro-cache lets only
+# one of a burst of identical GETs reach Django, and is refreshed after writes.
+
+set -e
+
+COMPOSE="docker compose -f docker-compose-prod.yml"
+HOST=$(grep '^DJANGO_ALLOWED_HOSTS=' .env | cut -d= -f2 | cut -d, -f1)
+
+$COMPOSE up -d --build
+trap '$COMPOSE down' EXIT
+until $COMPOSE exec -T proxy wget -q -O /dev/null --header "Host: $HOST" http://localhost:8000/api/booking/properties/; do
+    sleep 2
+done
+$COMPOSE exec -T app python manage.py loadtest_microcache --url http://proxy:8000 --host "$HOST"